@@ -0,0 +1,160 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from common import runner
+from common.arbiter import ArbiterModel, ArbiterClients
+from common.bench import BenchResults, bench_env
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, 10, units="ns").start())
+
+        self.model = ArbiterModel(
+            ports=len(dut.request),
+            round_robin=bool(int(os.getenv("PARAM_ARB_TYPE_ROUND_ROBIN"))),
+            block=bool(int(os.getenv("PARAM_ARB_BLOCK"))),
+            block_ack=bool(int(os.getenv("PARAM_ARB_BLOCK_ACK"))),
+            lsb_high_priority=bool(int(os.getenv("PARAM_ARB_LSB_HIGH_PRIORITY"))),
+        )
+
+        dut.request.setimmediatevalue(0)
+        dut.acknowledge.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.model.reset()
+
+
+async def run_bench(dut, load=0.5, max_hold=4, cycles=10000):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    await tb.cycle_reset()
+
+    clients = ArbiterClients(dut, tb.model, load=load, max_hold=max_hold)
+
+    await clients.run(cycles)
+
+    row = {"load": load, "max_hold": max_hold}
+    row.update(clients.row())
+
+    results.add(**row)
+
+    for cycle, request, acknowledge, expected, actual in clients.mismatches[:10]:
+        tb.log.error("cycle %d: request %#x acknowledge %#x: expected %s, got %s",
+            cycle, request, acknowledge, expected, actual)
+
+    assert not clients.mismatches
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("load", [0.05, 0.25, 0.5, 1.0])
+    factory.add_option("max_hold", [1, 4, 16])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("lsb_high_priority", [0, 1])
+@pytest.mark.parametrize("block, block_ack", [(0, 0), (1, 0), (1, 1)])
+@pytest.mark.parametrize("round_robin", [0, 1])
+@pytest.mark.parametrize("ports", [4, 16])
+def test_arbiter_bench(request, ports, round_robin, block, block_ack, lsb_high_priority):
+    dut = "arbiter"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, "priority_encoder.v"),
+    ]
+
+    parameters = {}
+
+    parameters['PORTS'] = ports
+    parameters['ARB_TYPE_ROUND_ROBIN'] = round_robin
+    parameters['ARB_BLOCK'] = block
+    parameters['ARB_BLOCK_ACK'] = block_ack
+    parameters['ARB_LSB_HIGH_PRIORITY'] = lsb_high_priority
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, ports=ports, round_robin=round_robin,
+        block=block, block_ack=block_ack, lsb_high_priority=lsb_high_priority))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
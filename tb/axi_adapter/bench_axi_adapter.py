@@ -0,0 +1,221 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import functools
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiBus, AxiMaster, AxiRam
+
+from common import runner
+from common.bench import BenchResults, ChannelProbe, HandshakeCounter, latency_columns, traffic_row, bench_env
+from common.traffic import TrafficGenerator, SequentialLocality
+
+
+CLOCK_PERIOD = 10
+
+# name: (CONVERT_BURST, CONVERT_NARROW_BURST, FORWARD_ID)
+CONVERSION_MODES = {
+    "full": (1, 1, 1),
+    "no_narrow": (1, 0, 1),
+    "no_burst": (0, 0, 1),
+    "no_id": (1, 1, 0),
+}
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axi_master = AxiMaster(AxiBus.from_prefix(dut, "s_axi"), dut.clk, dut.rst)
+        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.rst, size=2**16)
+
+        self.aw_probe = ChannelProbe(dut.clk, dut.s_axi_awvalid, dut.s_axi_awready, dut.m_axi_awvalid, dut.m_axi_awready)
+        self.ar_probe = ChannelProbe(dut.clk, dut.s_axi_arvalid, dut.s_axi_arready, dut.m_axi_arvalid, dut.m_axi_arready)
+
+        self.data_count = {}
+        for side in ["s", "m"]:
+            self.data_count[side] = [
+                HandshakeCounter(dut.clk, getattr(dut, f"{side}_axi_wvalid"), getattr(dut, f"{side}_axi_wready")),
+                HandshakeCounter(dut.clk, getattr(dut, f"{side}_axi_rvalid"), getattr(dut, f"{side}_axi_rready")),
+            ]
+
+    def data_beats(self, side):
+        return sum(c.beats for c in self.data_count[side])
+
+    def clear(self):
+        self.aw_probe.clear()
+        self.ar_probe.clear()
+        for counters in self.data_count.values():
+            for c in counters:
+                c.clear()
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, length=1024, narrow=False, workers=4, count=16):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    s_lanes = tb.axi_master.write_if.byte_lanes
+    m_lanes = tb.axi_ram.write_if.byte_lanes
+    wide = "m" if m_lanes >= s_lanes else "s"
+    wide_lanes = max(s_lanes, m_lanes)
+
+    # narrow bursts use a quarter of the slave interface width per beat
+    size = tb.axi_master.write_if.max_burst_size
+    if narrow:
+        size = max(0, size-2)
+
+    await tb.cycle_reset()
+
+    # write then read back and check, walking each worker's aperture in
+    # steps aligned to the wide side
+    traffic = TrafficGenerator(size=length, gap=0, read_ratio=None,
+        locality=functools.partial(SequentialLocality, align=wide_lanes), burst_size=size,
+        clock_period=CLOCK_PERIOD, log=tb.log)
+    traffic.add_workers(tb.axi_master, aperture=0x1000, workers=workers, count=count)
+
+    tb.clear()
+
+    stats = await traffic.run()
+
+    # minimum number of full width beats on the wide side
+    ideal_beats = len(stats.records) * -(-length // wide_lanes)
+
+    wide_beats = tb.data_beats(wide)
+    cycles = stats.elapsed() / CLOCK_PERIOD
+    moved = stats.bytes()
+
+    row = {
+        "length": length,
+        "narrow": int(narrow),
+        "beat_bytes": 2**size,
+        **traffic_row(stats, CLOCK_PERIOD),
+        "wide_side": wide,
+        "wide_busy": round(wide_beats / cycles / 2, 4),
+        "wide_lane_utilization": round(moved / (wide_beats*wide_lanes), 4) if wide_beats else None,
+        "wasted_beats": wide_beats - ideal_beats,
+        "wasted_beats_per_op": round((wide_beats - ideal_beats) / len(stats.records), 2),
+        "s_beats": tb.data_beats("s"),
+        "m_beats": tb.data_beats("m"),
+    }
+    for name, probe in [("aw_lat", tb.aw_probe), ("ar_lat", tb.ar_probe)]:
+        # address latency is only meaningful when bursts are not split
+        if probe.input.beats == probe.output.beats:
+            row.update(latency_columns(name, probe.latencies()))
+        else:
+            row.update(latency_columns(name, []))
+
+    results.add(**row)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("length", [64, 1024])
+    factory.add_option("narrow", [False, True])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("mode", list(CONVERSION_MODES))
+@pytest.mark.parametrize("s_data_width, m_data_width", [
+    (32, 32), (32, 128), (32, 512), (64, 256), (128, 32), (256, 64), (512, 32)])
+def test_axi_adapter_bench(request, s_data_width, m_data_width, mode):
+    dut = "axi_adapter"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    parameters['ADDR_WIDTH'] = 32
+    parameters['S_DATA_WIDTH'] = s_data_width
+    parameters['S_STRB_WIDTH'] = parameters['S_DATA_WIDTH'] // 8
+    parameters['M_DATA_WIDTH'] = m_data_width
+    parameters['M_STRB_WIDTH'] = parameters['M_DATA_WIDTH'] // 8
+    parameters['ID_WIDTH'] = 8
+    parameters['CONVERT_BURST'], parameters['CONVERT_NARROW_BURST'], parameters['FORWARD_ID'] = CONVERSION_MODES[mode]
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, s_data_width=s_data_width, m_data_width=m_data_width, mode=mode))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
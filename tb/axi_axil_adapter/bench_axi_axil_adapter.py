@@ -0,0 +1,191 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiBus, AxiLiteBus, AxiMaster, AxiLiteRam
+
+from common import runner
+from common.bench import BenchResults, HandshakeCounter, traffic_row, bench_env
+from common.latency import add_ram_latency
+from common.traffic import TrafficGenerator, percentile
+
+
+CLOCK_PERIOD = 10
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axi_master = AxiMaster(AxiBus.from_prefix(dut, "s_axi"), dut.clk, dut.rst)
+        self.axil_ram = AxiLiteRam(AxiLiteBus.from_prefix(dut, "m_axil"), dut.clk, dut.rst, size=2**16)
+
+        self.axil_count = {
+            "read": HandshakeCounter(dut.clk, dut.m_axil_arvalid, dut.m_axil_arready),
+            "write": HandshakeCounter(dut.clk, dut.m_axil_awvalid, dut.m_axil_awready),
+        }
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, direction="read", burst_len=16, narrow=False, latency=0, workers=2, count=16):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    add_ram_latency(tb.axil_ram, read_latency=latency, write_latency=latency, clock_period=CLOCK_PERIOD)
+
+    size = tb.axi_master.write_if.max_burst_size
+    if narrow:
+        size = max(0, size-1)
+    length = burst_len * 2**size
+
+    await tb.cycle_reset()
+
+    # back to back bursts in one direction, each worker streaming through
+    # its own aperture
+    traffic = TrafficGenerator(size=length, gap=0, read_ratio=1.0 if direction == "read" else 0.0,
+        locality="sequential", burst_size=size, clock_period=CLOCK_PERIOD, log=tb.log)
+    traffic.add_workers(tb.axi_master, aperture=0x4000, workers=workers, count=count)
+
+    tb.axil_count[direction].clear()
+    stats = await traffic.run()
+
+    bursts = len(stats.records)
+    cycles = stats.elapsed() / CLOCK_PERIOD
+    axil_ops = tb.axil_count[direction].beats
+    axil_per_burst = axil_ops / bursts
+    lat = stats.latencies()
+
+    # a slave accepting one AXI lite request per cycle would only expose
+    # its access latency once per burst instead of once per request
+    pipelined = axil_per_burst + latency + 1
+
+    row = {
+        "burst_len": burst_len,
+        "narrow": int(narrow),
+        "beat_bytes": 2**size,
+        "latency": latency,
+        **traffic_row(stats, CLOCK_PERIOD),
+        "axil_ops_per_burst": round(axil_per_burst, 2),
+        "axil_ops_per_cycle": round(axil_ops / cycles, 4),
+        "cycles_per_axil_op": round(percentile(lat, 50) / CLOCK_PERIOD / axil_per_burst, 2),
+        "pipelined_lat_est": round(pipelined, 2),
+        "pipelined_speedup_est": round(percentile(lat, 50) / CLOCK_PERIOD / pipelined, 2),
+    }
+
+    results.add(**row)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("direction", ["read", "write"])
+    factory.add_option("burst_len", [1, 4, 16, 64])
+    factory.add_option("narrow", [False, True])
+    factory.add_option("latency", [0, 4, 16])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("axi_data_width, axil_data_width", [
+    (16, 32), (32, 32), (64, 32), (128, 32), (32, 8)])
+def test_axi_axil_adapter_bench(request, axi_data_width, axil_data_width):
+    dut = "axi_axil_adapter"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    parameters['ADDR_WIDTH'] = 32
+    parameters['AXI_DATA_WIDTH'] = axi_data_width
+    parameters['AXI_STRB_WIDTH'] = parameters['AXI_DATA_WIDTH'] // 8
+    parameters['AXI_ID_WIDTH'] = 8
+    parameters['AXIL_DATA_WIDTH'] = axil_data_width
+    parameters['AXIL_STRB_WIDTH'] = parameters['AXIL_DATA_WIDTH'] // 8
+    parameters['CONVERT_BURST'] = 1
+    parameters['CONVERT_NARROW_BURST'] = 1
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, axi_data_width=axi_data_width, axil_data_width=axil_data_width))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
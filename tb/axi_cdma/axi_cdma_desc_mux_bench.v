@@ -0,0 +1,252 @@
+/*
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+*/
+
+// Language: Verilog 2001
+
+`resetall
+`timescale 1ns / 1ps
+`default_nettype none
+
+/*
+ * AXI CDMA with descriptor mux, for benchmarking multiple requesters
+ */
+module axi_cdma_desc_mux_bench #
+(
+    parameter PORTS = 2,
+    parameter AXI_DATA_WIDTH = 32,
+    parameter AXI_ADDR_WIDTH = 16,
+    parameter AXI_STRB_WIDTH = (AXI_DATA_WIDTH/8),
+    parameter AXI_ID_WIDTH = 8,
+    parameter AXI_MAX_BURST_LEN = 16,
+    parameter LEN_WIDTH = 20,
+    parameter S_TAG_WIDTH = 8,
+    parameter M_TAG_WIDTH = S_TAG_WIDTH+$clog2(PORTS),
+    parameter ENABLE_UNALIGNED = 0,
+    parameter ARB_TYPE_ROUND_ROBIN = 1,
+    parameter ARB_LSB_HIGH_PRIORITY = 1
+)
+(
+    input  wire                            clk,
+    input  wire                            rst,
+
+    /*
+     * Descriptor input
+     */
+    input  wire [PORTS*AXI_ADDR_WIDTH-1:0] s_axis_desc_read_addr,
+    input  wire [PORTS*AXI_ADDR_WIDTH-1:0] s_axis_desc_write_addr,
+    input  wire [PORTS*LEN_WIDTH-1:0]      s_axis_desc_len,
+    input  wire [PORTS*S_TAG_WIDTH-1:0]    s_axis_desc_tag,
+    input  wire [PORTS-1:0]                s_axis_desc_valid,
+    output wire [PORTS-1:0]                s_axis_desc_ready,
+
+    /*
+     * Descriptor status output
+     */
+    output wire [PORTS*S_TAG_WIDTH-1:0]    m_axis_desc_status_tag,
+    output wire [PORTS*4-1:0]              m_axis_desc_status_error,
+    output wire [PORTS-1:0]                m_axis_desc_status_valid,
+
+    /*
+     * AXI master interface
+     */
+    output wire [AXI_ID_WIDTH-1:0]         m_axi_awid,
+    output wire [AXI_ADDR_WIDTH-1:0]       m_axi_awaddr,
+    output wire [7:0]                      m_axi_awlen,
+    output wire [2:0]                      m_axi_awsize,
+    output wire [1:0]                      m_axi_awburst,
+    output wire                            m_axi_awlock,
+    output wire [3:0]                      m_axi_awcache,
+    output wire [2:0]                      m_axi_awprot,
+    output wire                            m_axi_awvalid,
+    input  wire                            m_axi_awready,
+    output wire [AXI_DATA_WIDTH-1:0]       m_axi_wdata,
+    output wire [AXI_STRB_WIDTH-1:0]       m_axi_wstrb,
+    output wire                            m_axi_wlast,
+    output wire                            m_axi_wvalid,
+    input  wire                            m_axi_wready,
+    input  wire [AXI_ID_WIDTH-1:0]         m_axi_bid,
+    input  wire [1:0]                      m_axi_bresp,
+    input  wire                            m_axi_bvalid,
+    output wire                            m_axi_bready,
+    output wire [AXI_ID_WIDTH-1:0]         m_axi_arid,
+    output wire [AXI_ADDR_WIDTH-1:0]       m_axi_araddr,
+    output wire [7:0]                      m_axi_arlen,
+    output wire [2:0]                      m_axi_arsize,
+    output wire [1:0]                      m_axi_arburst,
+    output wire                            m_axi_arlock,
+    output wire [3:0]                      m_axi_arcache,
+    output wire [2:0]                      m_axi_arprot,
+    output wire                            m_axi_arvalid,
+    input  wire                            m_axi_arready,
+    input  wire [AXI_ID_WIDTH-1:0]         m_axi_rid,
+    input  wire [AXI_DATA_WIDTH-1:0]       m_axi_rdata,
+    input  wire [1:0]                      m_axi_rresp,
+    input  wire                            m_axi_rlast,
+    input  wire                            m_axi_rvalid,
+    output wire                            m_axi_rready,
+
+    /*
+     * Configuration
+     */
+    input  wire                            enable
+);
+
+wire [AXI_ADDR_WIDTH-1:0]  desc_read_addr;
+wire [AXI_ADDR_WIDTH-1:0]  desc_write_addr;
+wire [LEN_WIDTH-1:0]       desc_len;
+wire [M_TAG_WIDTH-1:0]     desc_tag;
+wire                       desc_valid;
+wire                       desc_ready;
+
+wire [M_TAG_WIDTH-1:0]     desc_status_tag;
+wire [3:0]                 desc_status_error;
+wire                       desc_status_valid;
+
+axi_cdma_desc_mux #(
+    .PORTS(PORTS),
+    .AXI_ADDR_WIDTH(AXI_ADDR_WIDTH),
+    .LEN_WIDTH(LEN_WIDTH),
+    .S_TAG_WIDTH(S_TAG_WIDTH),
+    .M_TAG_WIDTH(M_TAG_WIDTH),
+    .ARB_TYPE_ROUND_ROBIN(ARB_TYPE_ROUND_ROBIN),
+    .ARB_LSB_HIGH_PRIORITY(ARB_LSB_HIGH_PRIORITY)
+)
+axi_cdma_desc_mux_inst (
+    .clk(clk),
+    .rst(rst),
+
+    /*
+     * Descriptor output (to AXI CDMA core)
+     */
+    .m_axis_desc_read_addr(desc_read_addr),
+    .m_axis_desc_write_addr(desc_write_addr),
+    .m_axis_desc_len(desc_len),
+    .m_axis_desc_tag(desc_tag),
+    .m_axis_desc_valid(desc_valid),
+    .m_axis_desc_ready(desc_ready),
+
+    /*
+     * Descriptor status input (from AXI CDMA core)
+     */
+    .s_axis_desc_status_tag(desc_status_tag),
+    .s_axis_desc_status_error(desc_status_error),
+    .s_axis_desc_status_valid(desc_status_valid),
+
+    /*
+     * Descriptor input
+     */
+    .s_axis_desc_read_addr(s_axis_desc_read_addr),
+    .s_axis_desc_write_addr(s_axis_desc_write_addr),
+    .s_axis_desc_len(s_axis_desc_len),
+    .s_axis_desc_tag(s_axis_desc_tag),
+    .s_axis_desc_valid(s_axis_desc_valid),
+    .s_axis_desc_ready(s_axis_desc_ready),
+
+    /*
+     * Descriptor status output
+     */
+    .m_axis_desc_status_tag(m_axis_desc_status_tag),
+    .m_axis_desc_status_error(m_axis_desc_status_error),
+    .m_axis_desc_status_valid(m_axis_desc_status_valid)
+);
+
+axi_cdma #(
+    .AXI_DATA_WIDTH(AXI_DATA_WIDTH),
+    .AXI_ADDR_WIDTH(AXI_ADDR_WIDTH),
+    .AXI_STRB_WIDTH(AXI_STRB_WIDTH),
+    .AXI_ID_WIDTH(AXI_ID_WIDTH),
+    .AXI_MAX_BURST_LEN(AXI_MAX_BURST_LEN),
+    .LEN_WIDTH(LEN_WIDTH),
+    .TAG_WIDTH(M_TAG_WIDTH),
+    .ENABLE_UNALIGNED(ENABLE_UNALIGNED)
+)
+axi_cdma_inst (
+    .clk(clk),
+    .rst(rst),
+
+    /*
+     * AXI descriptor input
+     */
+    .s_axis_desc_read_addr(desc_read_addr),
+    .s_axis_desc_write_addr(desc_write_addr),
+    .s_axis_desc_len(desc_len),
+    .s_axis_desc_tag(desc_tag),
+    .s_axis_desc_valid(desc_valid),
+    .s_axis_desc_ready(desc_ready),
+
+    /*
+     * AXI descriptor status output
+     */
+    .m_axis_desc_status_tag(desc_status_tag),
+    .m_axis_desc_status_error(desc_status_error),
+    .m_axis_desc_status_valid(desc_status_valid),
+
+    /*
+     * AXI master interface
+     */
+    .m_axi_awid(m_axi_awid),
+    .m_axi_awaddr(m_axi_awaddr),
+    .m_axi_awlen(m_axi_awlen),
+    .m_axi_awsize(m_axi_awsize),
+    .m_axi_awburst(m_axi_awburst),
+    .m_axi_awlock(m_axi_awlock),
+    .m_axi_awcache(m_axi_awcache),
+    .m_axi_awprot(m_axi_awprot),
+    .m_axi_awvalid(m_axi_awvalid),
+    .m_axi_awready(m_axi_awready),
+    .m_axi_wdata(m_axi_wdata),
+    .m_axi_wstrb(m_axi_wstrb),
+    .m_axi_wlast(m_axi_wlast),
+    .m_axi_wvalid(m_axi_wvalid),
+    .m_axi_wready(m_axi_wready),
+    .m_axi_bid(m_axi_bid),
+    .m_axi_bresp(m_axi_bresp),
+    .m_axi_bvalid(m_axi_bvalid),
+    .m_axi_bready(m_axi_bready),
+    .m_axi_arid(m_axi_arid),
+    .m_axi_araddr(m_axi_araddr),
+    .m_axi_arlen(m_axi_arlen),
+    .m_axi_arsize(m_axi_arsize),
+    .m_axi_arburst(m_axi_arburst),
+    .m_axi_arlock(m_axi_arlock),
+    .m_axi_arcache(m_axi_arcache),
+    .m_axi_arprot(m_axi_arprot),
+    .m_axi_arvalid(m_axi_arvalid),
+    .m_axi_arready(m_axi_arready),
+    .m_axi_rid(m_axi_rid),
+    .m_axi_rdata(m_axi_rdata),
+    .m_axi_rresp(m_axi_rresp),
+    .m_axi_rlast(m_axi_rlast),
+    .m_axi_rvalid(m_axi_rvalid),
+    .m_axi_rready(m_axi_rready),
+
+    /*
+     * Configuration
+     */
+    .enable(enable)
+);
+
+endmodule
+
+`resetall
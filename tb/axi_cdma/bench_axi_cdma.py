@@ -0,0 +1,367 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+from collections import deque
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.queue import Queue
+from cocotb.triggers import RisingEdge, Combine
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiBus, AxiRam
+from cocotbext.axi.stream import define_stream
+
+from common import patterns, runner
+from common.bench import BenchResults, HandshakeCounter, bench_env, jain_index
+from common.latency import add_ram_latency
+
+DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
+    signals=["read_addr", "write_addr", "len", "tag", "valid", "ready"]
+)
+
+DescStatusBus, DescStatusTransaction, DescStatusSource, DescStatusSink, DescStatusMonitor = define_stream("DescStatus",
+    signals=["tag", "error", "valid"]
+)
+
+CLOCK_PERIOD = 10
+
+# total bytes copied per benchmark run
+BENCH_BYTES = int(os.getenv("BENCH_BYTES", 256*1024))
+
+
+class DescPorts:
+    """
+    Drives the packed multi-port descriptor interface of axi_cdma_desc_mux
+
+    Each port presents its queued descriptors in order; status words are
+    demultiplexed from the packed status outputs into per-port queues.
+    """
+    def __init__(self, dut, ports):
+        self.dut = dut
+        self.ports = ports
+
+        self.addr_width = len(dut.s_axis_desc_read_addr) // ports
+        self.len_width = len(dut.s_axis_desc_len) // ports
+        self.tag_width = len(dut.s_axis_desc_tag) // ports
+
+        self.queue = [deque() for k in range(ports)]
+        self.status = [Queue() for k in range(ports)]
+
+        dut.s_axis_desc_valid.setimmediatevalue(0)
+
+        cocotb.start_soon(self._run())
+
+    def send_nowait(self, port, desc):
+        self.queue[port].append(desc)
+
+    async def recv_status(self, port):
+        return await self.status[port].get()
+
+    def _pack(self, cur, field, width):
+        value = 0
+        for k, desc in enumerate(cur):
+            if desc is not None:
+                value |= (int(getattr(desc, field)) & (2**width-1)) << (k*width)
+        return value
+
+    async def _run(self):
+        cur = [None]*self.ports
+
+        while True:
+            await RisingEdge(self.dut.clk)
+
+            ready = self.dut.s_axis_desc_ready.value
+            ready = int(ready) if ready.is_resolvable else 0
+            for k in range(self.ports):
+                if cur[k] is not None and ready & (1 << k):
+                    cur[k] = None
+
+            status_valid = self.dut.m_axis_desc_status_valid.value
+            if status_valid.is_resolvable and int(status_valid):
+                tags = int(self.dut.m_axis_desc_status_tag.value)
+                errors = int(self.dut.m_axis_desc_status_error.value)
+                for k in range(self.ports):
+                    if int(status_valid) & (1 << k):
+                        status = DescStatusTransaction(
+                            tag=(tags >> (k*self.tag_width)) & (2**self.tag_width-1),
+                            error=(errors >> (k*4)) & 0xf)
+                        self.status[k].put_nowait(status)
+
+            for k in range(self.ports):
+                if cur[k] is None and self.queue[k]:
+                    cur[k] = self.queue[k].popleft()
+
+            self.dut.s_axis_desc_read_addr.value = self._pack(cur, "read_addr", self.addr_width)
+            self.dut.s_axis_desc_write_addr.value = self._pack(cur, "write_addr", self.addr_width)
+            self.dut.s_axis_desc_len.value = self._pack(cur, "len", self.len_width)
+            self.dut.s_axis_desc_tag.value = self._pack(cur, "tag", self.tag_width)
+            self.dut.s_axis_desc_valid.value = sum(1 << k for k in range(self.ports) if cur[k] is not None)
+
+
+class SinglePort:
+    """Same interface as DescPorts for a bare axi_cdma"""
+    def __init__(self, dut):
+        self.ports = 1
+        self.desc_source = DescSource(DescBus.from_prefix(dut, "s_axis_desc"), dut.clk, dut.rst)
+        self.desc_status_sink = DescStatusSink(DescStatusBus.from_prefix(dut, "m_axis_desc_status"), dut.clk, dut.rst)
+        self.tag_width = len(self.desc_source.bus.tag)
+
+    def send_nowait(self, port, desc):
+        self.desc_source.send_nowait(desc)
+
+    async def recv_status(self, port):
+        return await self.desc_status_sink.recv()
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        # control interface, through axi_cdma_desc_mux if present
+        if hasattr(dut, "axi_cdma_desc_mux_inst"):
+            self.desc = DescPorts(dut, len(dut.s_axis_desc_valid))
+        else:
+            self.desc = SinglePort(dut)
+
+        # AXI interface
+        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.rst, size=2**len(dut.m_axi_araddr))
+
+        self.r_count = HandshakeCounter(dut.clk, dut.m_axi_rvalid, dut.m_axi_rready)
+        self.w_count = HandshakeCounter(dut.clk, dut.m_axi_wvalid, dut.m_axi_wready)
+
+        dut.enable.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, size=64, offset_mode="aligned", latency=0):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    ports = tb.desc.ports
+    tag_count = 2**tb.desc.tag_width
+    byte_lanes = tb.axi_ram.read_if.byte_lanes
+
+    count = min(max(4, BENCH_BYTES // size), 1024)
+    count = -(-count // ports)*ports
+
+    if offset_mode == "aligned":
+        read_offset, write_offset = 0, 0
+    else:
+        read_offset, write_offset = 1, 3
+
+    # sources in the lower half of the RAM, destinations in the upper half
+    half = tb.axi_ram.size // 2
+    stride = (size + 0x1fff) & ~0xfff
+    slots = max(1, (half - 0x1000) // stride)
+
+    test_data = patterns.incrementing(size)
+    for k in range(slots):
+        tb.axi_ram.write(0x1000 + k*stride + read_offset, test_data)
+
+    add_ram_latency(tb.axi_ram, latency, latency, CLOCK_PERIOD)
+
+    await tb.cycle_reset()
+
+    dut.enable.value = 1
+
+    await RisingEdge(dut.clk)
+
+    tb.r_count.clear()
+    tb.w_count.clear()
+
+    start_time = get_sim_time('ns')
+
+    # keep the descriptor inputs full, descriptors interleaved across ports
+    for k in range(count):
+        slot = k % slots
+        desc = DescTransaction(read_addr=0x1000 + slot*stride + read_offset,
+            write_addr=half + 0x1000 + slot*stride + write_offset, len=size, tag=(k // ports) % tag_count)
+        tb.desc.send_nowait(k % ports, desc)
+
+    done = [[] for k in range(ports)]
+
+    async def collect(port):
+        for k in range(count // ports):
+            status = await tb.desc.recv_status(port)
+            assert int(status.error) == 0
+            done[port].append(get_sim_time('ns'))
+
+    await Combine(*[cocotb.start_soon(collect(p)) for p in range(ports)])
+
+    elapsed = get_sim_time('ns') - start_time
+    cycles = elapsed / CLOCK_PERIOD
+
+    assert tb.axi_ram.read(half + 0x1000 + ((count-1) % slots)*stride + write_offset, size) == test_data
+
+    # fairness: share of descriptors each port had completed when the first port finished
+    first_done = min(times[-1] for times in done)
+    fairness = jain_index(sum(1 for t in times if t <= first_done) for times in done)
+
+    times = sorted(t for port in done for t in port)
+    intervals = [b-a for a, b in zip(times, times[1:])]
+
+    results.add(ports=ports, size=size, offset_mode=offset_mode, latency=latency,
+        descs=count, cycles=round(cycles),
+        copies_per_sec=round(count / (elapsed*1e-9)),
+        bytes_per_cycle=round(size*count/cycles, 4),
+        efficiency=round(size*count/cycles/byte_lanes, 4),
+        status_interval_mean=round(sum(intervals)/len(intervals)/CLOCK_PERIOD, 2) if intervals else None,
+        read_bubbles=tb.r_count.bubbles(),
+        write_bubbles=tb.w_count.bubbles(),
+        fairness=None if fairness is None else round(fairness, 4))
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories(unaligned):
+
+    factory = TestFactory(run_bench)
+    factory.add_option("size", [64, 4096, 1048576])
+    factory.add_option("offset_mode", ["aligned"] + (["unaligned"] if unaligned else []))
+    factory.add_option("latency", [0, 20])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories(int(os.getenv("PARAM_ENABLE_UNALIGNED"))):
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+def cdma_parameters(axi_data_width, unaligned):
+    parameters = {}
+
+    parameters['AXI_DATA_WIDTH'] = axi_data_width
+    parameters['AXI_ADDR_WIDTH'] = 22
+    parameters['AXI_STRB_WIDTH'] = parameters['AXI_DATA_WIDTH'] // 8
+    parameters['AXI_ID_WIDTH'] = 8
+    parameters['AXI_MAX_BURST_LEN'] = 16
+    parameters['LEN_WIDTH'] = 21
+    parameters['ENABLE_UNALIGNED'] = unaligned
+
+    return parameters
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("unaligned", [0, 1])
+@pytest.mark.parametrize("axi_data_width", [32, 128])
+def test_axi_cdma_bench(request, axi_data_width, unaligned):
+    dut = "axi_cdma"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+    ]
+
+    parameters = cdma_parameters(axi_data_width, unaligned)
+    parameters['TAG_WIDTH'] = 8
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, data_width=axi_data_width, unaligned=unaligned))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories(unaligned)),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("ports", [2, 4, 8])
+@pytest.mark.parametrize("axi_data_width", [32, 128])
+def test_axi_cdma_desc_mux_bench(request, axi_data_width, ports):
+    dut = "axi_cdma"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = f"{dut}_desc_mux_bench"
+
+    verilog_sources = [
+        os.path.join(tests_dir, f"{toplevel}.v"),
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_desc_mux.v"),
+        os.path.join(rtl_dir, "arbiter.v"),
+        os.path.join(rtl_dir, "priority_encoder.v"),
+    ]
+
+    parameters = cdma_parameters(axi_data_width, 0)
+    parameters['PORTS'] = ports
+    parameters['S_TAG_WIDTH'] = 8
+    parameters['M_TAG_WIDTH'] = parameters['S_TAG_WIDTH'] + (ports-1).bit_length()
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, f"{dut}_desc_mux", data_width=axi_data_width))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories(0)),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
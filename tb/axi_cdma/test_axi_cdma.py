@@ -26,7 +26,6 @@ import itertools
 import logging
 import os
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
@@ -37,6 +36,8 @@ from cocotb.regression import TestFactory
 from cocotbext.axi import AxiBus, AxiRam
 from cocotbext.axi.stream import define_stream
 
+from common import patterns, runner
+
 DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
     signals=["read_addr", "write_addr", "len", "tag", "valid", "ready"]
 )
@@ -111,10 +112,10 @@ async def run_test(dut, data_in=None, idle_inserter=None, backpressure_inserter=
                 tb.log.info("length %d, read_offset %d, write_offset %d", length, read_offset, write_offset)
                 read_addr = read_offset+0x1000
                 write_addr = 0x00008000+write_offset+0x1000
-                test_data = bytearray([x % 256 for x in range(length)])
+                test_data = patterns.incrementing(length)
 
                 tb.axi_ram.write(read_addr, test_data)
-                tb.axi_ram.write(write_addr & 0xffff80, b'\xaa'*(len(test_data)+256))
+                tb.axi_ram.write(write_addr & 0xffff80, patterns.fill(len(test_data)+256))
 
                 desc = DescTransaction(read_addr=read_addr, write_addr=write_addr, len=len(test_data), tag=cur_tag)
                 await tb.desc_source.send(desc)
@@ -127,7 +128,7 @@ async def run_test(dut, data_in=None, idle_inserter=None, backpressure_inserter=
 
                 tb.log.debug("%s", tb.axi_ram.hexdump_str((write_addr & ~0xf)-16, (((write_addr & 0xf)+length-1) & ~0xf)+48))
 
-                assert tb.axi_ram.read(write_addr-8, len(test_data)+16) == b'\xaa'*8+test_data+b'\xaa'*8
+                assert patterns.verify(tb.axi_ram, write_addr, test_data, guard=8)
 
                 cur_tag = (cur_tag + 1) % tag_count
 
@@ -139,13 +140,23 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     for test in [run_test]:
 
         factory = TestFactory(test)
         factory.add_option("idle_inserter", [None, cycle_pause])
         factory.add_option("backpressure_inserter", [None, cycle_pause])
+        factories.append(factory)
+
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
         factory.generate_tests()
 
 
@@ -182,7 +193,9 @@ def test_axi_cdma(request, axi_data_width, unaligned):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
@@ -0,0 +1,207 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+import random
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiBus, AxiRam
+from cocotbext.axi.memory import Memory
+from cocotbext.axi.stream import define_stream
+
+from common import runner
+from common.dma_model import AxiCdmaModel
+from common.latency import add_ram_latency
+
+DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
+    signals=["read_addr", "write_addr", "len", "tag", "valid", "ready"]
+)
+
+DescStatusBus, DescStatusTransaction, DescStatusSource, DescStatusSink, DescStatusMonitor = define_stream("DescStatus",
+    signals=["tag", "error", "valid"]
+)
+
+CLOCK_PERIOD = 10
+
+# cycles from an AR handshake to the first R beat and from the last W
+# beat to B of AxiRam without added latency (approximate)
+RAM_READ_LATENCY = 2
+RAM_WRITE_LATENCY = 2
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        # control interface
+        self.desc_source = DescSource(DescBus.from_prefix(dut, "s_axis_desc"), dut.clk, dut.rst)
+        self.desc_status_sink = DescStatusSink(DescStatusBus.from_prefix(dut, "m_axis_desc_status"), dut.clk, dut.rst)
+
+        # AXI interface
+        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.rst, size=2**16)
+
+        dut.enable.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_test_diff(dut, latency=0, count=64, seed=1):
+
+    tb = TB(dut)
+    rng = random.Random(seed)
+
+    params = {k[6:]: int(v) for k, v in os.environ.items() if k.startswith("PARAM_")}
+    byte_lanes = tb.axi_ram.read_if.byte_lanes
+    step_size = 1 if params["ENABLE_UNALIGNED"] else byte_lanes
+    tag_count = 2**len(tb.desc_source.bus.tag)
+    size = tb.axi_ram.size
+
+    # the model works on a copy of the RTL memory
+    tb.axi_ram.write(0, rng.randbytes(size))
+    mem = Memory(size)
+    mem.write(0, tb.axi_ram.read(0, size))
+
+    model = AxiCdmaModel(mem, params, RAM_READ_LATENCY+latency, RAM_WRITE_LATENCY+latency)
+
+    add_ram_latency(tb.axi_ram, latency, latency, CLOCK_PERIOD)
+
+    await tb.cycle_reset()
+
+    dut.enable.value = 1
+
+    rtl_cycles = 0
+    model_cycles = 0
+
+    for k in range(count):
+        length = rng.choice([rng.randint(1, byte_lanes*4), rng.randint(1, 1024)])
+        # source in the lower half, destination in the upper half
+        read_addr = rng.randrange(0x1000, size//2-length, step_size)
+        write_addr = rng.randrange(size//2, size-0x1000-length, step_size)
+        desc = DescTransaction(read_addr=read_addr, write_addr=write_addr, len=length, tag=k % tag_count)
+
+        tb.log.info("read_addr 0x%04x, write_addr 0x%04x, length %d", read_addr, write_addr, length)
+
+        start_time = get_sim_time('ns')
+        model_start = model.kernel.now
+
+        await tb.desc_source.send(desc)
+        status = await tb.desc_status_sink.recv()
+        rtl_cycles += (get_sim_time('ns') - start_time) / CLOCK_PERIOD
+
+        model_status = model.execute_copy(desc)
+        model_cycles += model.kernel.now - model_start
+
+        tb.log.info("status: %s, model: %s", status, model_status)
+
+        assert int(status.tag) == model_status.tag
+        assert int(status.error) == model_status.error
+        assert tb.axi_ram.read(0, size) == mem.read(0, size)
+
+    tb.log.info("RTL %d cycles, model %d cycles (%+.1f%%)", rtl_cycles,
+        model_cycles, (model_cycles / rtl_cycles - 1)*100)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_test_diff)
+    factory.add_option("latency", [0, 16])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.parametrize("unaligned", [0, 1])
+@pytest.mark.parametrize("axi_data_width", [8, 32])
+def test_axi_cdma_model(request, axi_data_width, unaligned):
+    dut = "axi_cdma"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+    ]
+
+    parameters = {}
+
+    parameters['AXI_DATA_WIDTH'] = axi_data_width
+    parameters['AXI_ADDR_WIDTH'] = 16
+    parameters['AXI_STRB_WIDTH'] = parameters['AXI_DATA_WIDTH'] // 8
+    parameters['AXI_ID_WIDTH'] = 8
+    parameters['AXI_MAX_BURST_LEN'] = 16
+    parameters['LEN_WIDTH'] = 20
+    parameters['TAG_WIDTH'] = 8
+    parameters['ENABLE_UNALIGNED'] = unaligned
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
@@ -0,0 +1,236 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+import subprocess
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiBus, AxiMaster, AxiRam
+
+from common import runner
+from common.bench import BenchResults, ROUTING_PATTERNS, TRAFFIC_MIXES, traffic_row, bench_env
+from common.crossbar_stats import CrossbarInstrument
+from common.trace import AxiTracer, open_trace
+from common.traffic import TrafficGenerator
+
+
+CLOCK_PERIOD = 10
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        s_count = len(dut.axi_crossbar_inst.s_axi_awvalid)
+        m_count = len(dut.axi_crossbar_inst.m_axi_awvalid)
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axi_master = [AxiMaster(AxiBus.from_prefix(dut, f"s{k:02d}_axi"), dut.clk, dut.rst) for k in range(s_count)]
+        self.axi_ram = [AxiRam(AxiBus.from_prefix(dut, f"m{k:02d}_axi"), dut.clk, dut.rst, size=2**16) for k in range(m_count)]
+
+        for ram in self.axi_ram:
+            # prevent X propagation from screwing things up - "anything but X!"
+            # (X on bid and rid can propagate X to ready/valid)
+            ram.write_if.b_channel.bus.bid.setimmediatevalue(0)
+            ram.read_if.r_channel.bus.rid.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, pattern="uniform", mix="mixed", size=256, workers=None, count=32):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    s_count = len(tb.axi_master)
+    m_count = len(tb.axi_ram)
+
+    params = {k[6:]: int(v) for k, v in os.environ.items() if k.startswith("PARAM_")}
+
+    if workers is None:
+        # each worker has one transaction in flight, so enough of them to
+        # exceed S_ACCEPT on both the read and write paths of every port
+        workers = 2*max(params.get(f"S{s:02d}_ACCEPT", 16) for s in range(s_count))
+    instrument = CrossbarInstrument(dut, params, dut.clk, dut.rst)
+
+    trace = open_trace(f"{pattern}_{mix}_{size}")
+    if trace:
+        for prefix in [f"s{k:02d}_axi" for k in range(s_count)] + [f"m{k:02d}_axi" for k in range(m_count)]:
+            AxiTracer(AxiBus.from_prefix(dut, prefix), dut.clk, trace, dut.rst, name=prefix)
+
+    await tb.cycle_reset()
+
+    instrument.clear()
+
+    # saturating load: several back-to-back workers per master, no idle gaps
+    traffic = TrafficGenerator(size=size, gap=0, read_ratio=TRAFFIC_MIXES[mix],
+        locality="sequential", clock_period=CLOCK_PERIOD, log=tb.log)
+
+    route = ROUTING_PATTERNS[pattern]
+    groups = {}
+    aperture = 2**16 // (s_count*workers)
+
+    for s in range(s_count):
+        regions = [m*0x1000000 for m in route(s, s_count, m_count)]
+        for k in range(workers):
+            w = traffic.add_worker(tb.axi_master[s], (s*workers+k)*aperture, aperture, regions, count)
+            groups[w.index] = s
+
+    stats = await traffic.run()
+
+    results.add(pattern=pattern, mix=mix, size=size, workers=workers, **traffic_row(stats, CLOCK_PERIOD, groups), **instrument.row())
+
+    # per-cycle depth series and latency histograms next to the results
+    if results.path:
+        depth_dir = os.path.join(os.path.dirname(results.path), "axi_crossbar_depth")
+        os.makedirs(depth_dir, exist_ok=True)
+        name = "_".join(str(v) for v in list(results.context.values()) + [pattern, mix, size])
+        instrument.write_csv(os.path.join(depth_dir, name))
+
+    if trace:
+        trace.close()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("pattern", list(ROUTING_PATTERNS))
+    factory.add_option("mix", list(TRAFFIC_MIXES))
+    factory.add_option("size", [16, 256])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("reg_type", [None, 0, 1, 2])
+@pytest.mark.parametrize("m_issue", [1, 4, 16])
+@pytest.mark.parametrize("s_accept", [2, 16])
+@pytest.mark.parametrize("s_threads", [1, 2, 4])
+@pytest.mark.parametrize("s_count, m_count, data_width", [(4, 4, 32)])
+def test_axi_crossbar_bench(request, s_count, m_count, data_width, s_threads, s_accept, m_issue, reg_type):
+    dut = "axi_crossbar"
+    wrapper = f"{dut}_wrap_{s_count}x{m_count}"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = wrapper
+
+    # generate wrapper
+    wrapper_file = os.path.join(tests_dir, f"{wrapper}.v")
+    if not os.path.exists(wrapper_file):
+        subprocess.Popen(
+            [os.path.join(rtl_dir, f"{dut}_wrap.py"), "-p", f"{s_count}", f"{m_count}"],
+            cwd=tests_dir
+        ).wait()
+
+    verilog_sources = [
+        wrapper_file,
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_addr.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+        os.path.join(rtl_dir, "axi_register_rd.v"),
+        os.path.join(rtl_dir, "axi_register_wr.v"),
+        os.path.join(rtl_dir, "arbiter.v"),
+        os.path.join(rtl_dir, "priority_encoder.v"),
+    ]
+
+    parameters = {}
+
+    parameters['S_COUNT'] = s_count
+    parameters['M_COUNT'] = m_count
+
+    parameters['DATA_WIDTH'] = data_width
+    parameters['ADDR_WIDTH'] = 32
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+    parameters['S_ID_WIDTH'] = 8
+    parameters['M_ID_WIDTH'] = parameters['S_ID_WIDTH'] + (s_count-1).bit_length()
+    parameters['M_REGIONS'] = 1
+
+    for k in range(s_count):
+        parameters[f'S{k:02d}_THREADS'] = s_threads
+        parameters[f'S{k:02d}_ACCEPT'] = s_accept
+
+    for k in range(m_count):
+        parameters[f'M{k:02d}_ISSUE'] = m_issue
+
+    # None keeps the wrapper defaults (skid buffers on the data channels)
+    if reg_type is not None:
+        for p, count in [('S', s_count), ('M', m_count)]:
+            for k in range(count):
+                for ch in ['AW', 'W', 'B', 'AR', 'R']:
+                    parameters[f'{p}{k:02d}_{ch}_REG_TYPE'] = reg_type
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, s_count=s_count, m_count=m_count, data_width=data_width,
+        s_threads=s_threads, s_accept=s_accept, m_issue=m_issue,
+        reg_type="default" if reg_type is None else reg_type))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
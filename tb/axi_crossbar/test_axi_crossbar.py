@@ -25,19 +25,22 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
-import random
 import subprocess
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiBus, AxiMaster, AxiRam
 
+from common import cycles, patterns, runner
+from common.monitor import attach_monitors
+from common.sweep import Sweep
+from common.traffic import TrafficGenerator
+
 
 class TB(object):
     def __init__(self, dut):
@@ -60,6 +63,10 @@ class TB(object):
             ram.write_if.b_channel.bus.bid.setimmediatevalue(0)
             ram.read_if.r_channel.bus.rid.setimmediatevalue(0)
 
+        # passive monitors on every port
+        self.s_monitor = list(attach_monitors(dut, [f"s{k:02d}_axi" for k in range(s_count)], dut.clk, dut.rst).values())
+        self.m_monitor = list(attach_monitors(dut, [f"m{k:02d}_axi" for k in range(m_count)], dut.clk, dut.rst).values())
+
     def set_idle_generator(self, generator=None):
         if generator:
             for master in self.axi_master:
@@ -107,22 +114,25 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in list(range(1, byte_lanes*2))+[1024]:
-        for offset in list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096)):
-            tb.log.info("length %d, offset %d, size %d", length, offset, size)
-            ram_addr = offset+0x1000
-            addr = ram_addr + m*0x1000000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = list(range(1, byte_lanes*2))+[1024]
+    offsets = list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096))
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, ram_addr):
+        tb.log.info("length %d, offset %d, size %d", length, offset, size)
+        addr = ram_addr + m*0x1000000
+        test_data = patterns.incrementing(length)
+
+        tb.axi_ram[m].write(ram_addr-128, patterns.fill(length+256))
 
-            tb.axi_ram[m].write(ram_addr-128, b'\xaa'*(length+256))
+        await tb.axi_master[s].write(addr, test_data, size=size)
 
-            await tb.axi_master[s].write(addr, test_data, size=size)
+        tb.log.debug("%s", tb.axi_ram[m].hexdump_str((ram_addr & ~0xf)-16, (((ram_addr & 0xf)+length-1) & ~0xf)+48))
 
-            tb.log.debug("%s", tb.axi_ram[m].hexdump_str((ram_addr & ~0xf)-16, (((ram_addr & 0xf)+length-1) & ~0xf)+48))
+        assert patterns.verify(tb.axi_ram[m], ram_addr, test_data, guard=1)
 
-            assert tb.axi_ram[m].read(ram_addr, length) == test_data
-            assert tb.axi_ram[m].read(ram_addr-1, 1) == b'\xaa'
-            assert tb.axi_ram[m].read(ram_addr+length, 1) == b'\xaa'
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -143,18 +153,23 @@ async def run_test_read(dut, data_in=None, idle_inserter=None, backpressure_inse
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in list(range(1, byte_lanes*2))+[1024]:
-        for offset in list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096)):
-            tb.log.info("length %d, offset %d, size %d", length, offset, size)
-            ram_addr = offset+0x1000
-            addr = ram_addr + m*0x1000000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = list(range(1, byte_lanes*2))+[1024]
+    offsets = list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096))
 
-            tb.axi_ram[m].write(ram_addr, test_data)
+    sweep = Sweep(lengths, offsets, base=0x1000)
 
-            data = await tb.axi_master[s].read(addr, length, size=size)
+    async def run_case(length, offset, ram_addr):
+        tb.log.info("length %d, offset %d, size %d", length, offset, size)
+        addr = ram_addr + m*0x1000000
+        test_data = patterns.incrementing(length)
 
-            assert data.data == test_data
+        tb.axi_ram[m].write(ram_addr, test_data)
+
+        data = await tb.axi_master[s].read(addr, length, size=size)
+
+        assert data.data == test_data
+
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -169,29 +184,48 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    async def worker(master, offset, aperture, count=16):
-        for k in range(count):
-            m = random.randrange(len(tb.axi_ram))
-            length = random.randint(1, min(512, aperture))
-            addr = offset+random.randint(0, aperture-length) + m*0x1000000
-            test_data = bytearray([x % 256 for x in range(length)])
+    traffic = TrafficGenerator(size=(1, 512), clock_period=10, log=tb.log)
+    traffic.add_workers(tb.axi_master, aperture=0x1000, workers=16, regions=[m*0x1000000 for m in range(len(tb.axi_ram))], count=16)
 
-            await Timer(random.randint(1, 100), 'ns')
+    await traffic.run()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+    for monitor in tb.s_monitor + tb.m_monitor:
+        tb.log.info("%s", monitor.summary())
+        assert monitor.outstanding_reads() == 0
+        assert monitor.outstanding_writes() == 0
+
+    # every beat crosses the crossbar exactly once
+    for ch in ["aw", "w", "b", "ar", "r"]:
+        assert sum(getattr(mon, ch).beats for mon in tb.s_monitor) == sum(getattr(mon, ch).beats for mon in tb.m_monitor)
 
-            await master.write(addr, test_data)
 
-            await Timer(random.randint(1, 100), 'ns')
+async def run_test_reference_ops(dut, s=0, m=0):
 
-            data = await master.read(addr, length)
-            assert data.data == test_data
+    tb = TB(dut)
+
+    byte_lanes = tb.axi_master[s].write_if.byte_lanes
 
-    workers = []
+    await tb.cycle_reset()
 
-    for k in range(16):
-        workers.append(cocotb.start_soon(worker(tb.axi_master[k % len(tb.axi_master)], k*0x1000, 0x1000, count=16)))
+    # fixed operations without idle cycles or backpressure, for cycle accounting
+    addr = 0x1000 + m*0x1000000
+    test_data = patterns.incrementing(4096)
 
-    while workers:
-        await workers.pop(0).join()
+    for k in range(4):
+        async with cycles.operation("write_4k"):
+            await tb.axi_master[s].write(addr, test_data)
+        async with cycles.operation("read_4k"):
+            data = await tb.axi_master[s].read(addr, 4096)
+        assert data.data == test_data
+
+        async with cycles.operation("write_beat"):
+            await tb.axi_master[s].write(addr, test_data[:byte_lanes])
+        async with cycles.operation("read_beat"):
+            data = await tb.axi_master[s].read(addr, byte_lanes)
+        assert data.data == test_data[:byte_lanes]
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -201,14 +235,9 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
-
-    s_count = len(cocotb.top.axi_crossbar_inst.s_axi_awvalid)
-    m_count = len(cocotb.top.axi_crossbar_inst.m_axi_awvalid)
+def build_factories(s_count, m_count):
 
-    data_width = len(cocotb.top.s00_axi_wdata)
-    byte_lanes = data_width // 8
-    max_burst_size = (byte_lanes-1).bit_length()
+    factories = []
 
     for test in [run_test_write, run_test_read]:
 
@@ -218,10 +247,24 @@ if cocotb.SIM_NAME:
         # factory.add_option("size", [None]+list(range(max_burst_size)))
         factory.add_option("s", range(min(s_count, 2)))
         factory.add_option("m", range(min(m_count, 2)))
-        factory.generate_tests()
+        factories.append(factory)
+
+    factories.append(TestFactory(run_stress_test))
+
+    factory = TestFactory(run_test_reference_ops)
+    factory.add_option("m", range(min(m_count, 2)))
+    factories.append(factory)
 
-    factory = TestFactory(run_stress_test)
-    factory.generate_tests()
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    s_count = len(cocotb.top.axi_crossbar_inst.s_axi_awvalid)
+    m_count = len(cocotb.top.axi_crossbar_inst.m_axi_awvalid)
+
+    for factory in build_factories(s_count, m_count):
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -286,7 +329,9 @@ def test_axi_crossbar(request, s_count, m_count, data_width):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories(s_count, m_count)),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
@@ -0,0 +1,241 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+import subprocess
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Combine
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiBus, AxiMaster, AxiRam
+
+from common import runner
+from common.bench import traffic_row
+from common.crossbar_model import make_workload, predict
+from common.traffic import TrafficStats
+
+
+CLOCK_PERIOD = 10
+
+# largest accepted relative error of the model's bandwidth prediction
+TOLERANCE = 0.25
+
+
+def rtl_parameters():
+    """Crossbar parameters of this simulation, as passed to the model"""
+    return {k[6:]: int(v) for k, v in os.environ.items() if k.startswith("PARAM_")}
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        s_count = len(dut.axi_crossbar_inst.s_axi_awvalid)
+        m_count = len(dut.axi_crossbar_inst.m_axi_awvalid)
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axi_master = [AxiMaster(AxiBus.from_prefix(dut, f"s{k:02d}_axi"), dut.clk, dut.rst) for k in range(s_count)]
+        self.axi_ram = [AxiRam(AxiBus.from_prefix(dut, f"m{k:02d}_axi"), dut.clk, dut.rst, size=2**16) for k in range(m_count)]
+
+        for ram in self.axi_ram:
+            # prevent X propagation from screwing things up - "anything but X!"
+            # (X on bid and rid can propagate X to ready/valid)
+            ram.write_if.b_channel.bus.bid.setimmediatevalue(0)
+            ram.read_if.r_channel.bus.rid.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_calibration(dut, pattern="uniform", mix="mixed", size=256, workers=4, count=32):
+
+    tb = TB(dut)
+
+    params = rtl_parameters()
+    ops = make_workload(params, pattern, mix, size, count)
+
+    await tb.cycle_reset()
+
+    stats = TrafficStats(CLOCK_PERIOD)
+
+    async def worker(s, index, queue):
+        master = tb.axi_master[s]
+        for kind, addr, length in queue:
+            start = get_sim_time('ns')
+            if kind == "read":
+                await master.read(addr, length)
+            else:
+                await master.write(addr, bytes(length))
+            stats.record(kind, length, start, get_sim_time('ns'), index)
+
+    stats.start_time = get_sim_time('ns')
+    tasks = []
+    for s, queue in enumerate(ops):
+        queue = iter(queue)
+        for k in range(workers):
+            tasks.append(cocotb.start_soon(worker(s, s*workers+k, queue)))
+    await Combine(*tasks)
+    stats.end_time = get_sim_time('ns')
+
+    rtl = traffic_row(stats, CLOCK_PERIOD)
+    model = predict(params, pattern, mix, size, count, workers)
+
+    error = model["bytes_per_cycle"] / rtl["bytes_per_cycle"] - 1
+
+    tb.log.info("RTL: %.3f bytes/cycle, read latency p50 %s cycles, write latency p50 %s cycles",
+        rtl["bytes_per_cycle"], rtl["read_lat_p50"], rtl["write_lat_p50"])
+    tb.log.info("model: %.3f bytes/cycle, read latency p50 %s cycles, write latency p50 %s cycles",
+        model["bytes_per_cycle"], model["read_lat_p50"], model["write_lat_p50"])
+    tb.log.info("bandwidth prediction error: %+.1f%%", error*100)
+
+    assert abs(error) <= TOLERANCE
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories(sweep=False):
+
+    factory = TestFactory(run_calibration)
+
+    # the full sweep is slow, by default only calibrate a single point
+    if sweep:
+        factory.add_option("pattern", ["hotspot", "permutation", "uniform"])
+        factory.add_option("mix", ["read", "write", "mixed"])
+        factory.add_option("size", [16, 256])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories(bool(int(os.getenv("CALIBRATION_SWEEP", "0")))):
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.parametrize("s_threads, s_accept, m_issue", [
+    (2, 16, 4),
+    pytest.param(1, 2, 1, marks=pytest.mark.bench),
+    pytest.param(4, 16, 16, marks=pytest.mark.bench),
+])
+@pytest.mark.parametrize("s_count, m_count", [(4, 4)])
+def test_axi_crossbar_model(request, s_count, m_count, s_threads, s_accept, m_issue):
+    dut = "axi_crossbar"
+    wrapper = f"{dut}_wrap_{s_count}x{m_count}"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = wrapper
+
+    # generate wrapper
+    wrapper_file = os.path.join(tests_dir, f"{wrapper}.v")
+    if not os.path.exists(wrapper_file):
+        subprocess.Popen(
+            [os.path.join(rtl_dir, f"{dut}_wrap.py"), "-p", f"{s_count}", f"{m_count}"],
+            cwd=tests_dir
+        ).wait()
+
+    verilog_sources = [
+        wrapper_file,
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_addr.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+        os.path.join(rtl_dir, "axi_register_rd.v"),
+        os.path.join(rtl_dir, "axi_register_wr.v"),
+        os.path.join(rtl_dir, "arbiter.v"),
+        os.path.join(rtl_dir, "priority_encoder.v"),
+    ]
+
+    parameters = {}
+
+    parameters['S_COUNT'] = s_count
+    parameters['M_COUNT'] = m_count
+
+    parameters['DATA_WIDTH'] = 32
+    parameters['ADDR_WIDTH'] = 32
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+    parameters['S_ID_WIDTH'] = 8
+    parameters['M_ID_WIDTH'] = parameters['S_ID_WIDTH'] + (s_count-1).bit_length()
+    parameters['AWUSER_ENABLE'] = 0
+    parameters['AWUSER_WIDTH'] = 1
+    parameters['WUSER_ENABLE'] = 0
+    parameters['WUSER_WIDTH'] = 1
+    parameters['BUSER_ENABLE'] = 0
+    parameters['BUSER_WIDTH'] = 1
+    parameters['ARUSER_ENABLE'] = 0
+    parameters['ARUSER_WIDTH'] = 1
+    parameters['RUSER_ENABLE'] = 0
+    parameters['RUSER_WIDTH'] = 1
+    parameters['M_REGIONS'] = 1
+
+    for k in range(s_count):
+        parameters[f'S{k:02d}_THREADS'] = s_threads
+        parameters[f'S{k:02d}_ACCEPT'] = s_accept
+
+    for k in range(m_count):
+        parameters[f'M{k:02d}_ISSUE'] = m_issue
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+
+    # full calibration sweep with --bench
+    sweep = request.config.getoption("bench")
+    extra_env['CALIBRATION_SWEEP'] = str(int(sweep))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories(sweep)),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
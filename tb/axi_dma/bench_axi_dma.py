@@ -0,0 +1,289 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiBus, AxiRam
+from cocotbext.axi import AxiStreamBus, AxiStreamFrame, AxiStreamSource, AxiStreamSink
+from cocotbext.axi.stream import define_stream
+
+from common import patterns, runner
+from common.bench import BenchResults, HandshakeCounter, bench_env
+from common.latency import add_ram_latency
+from common.trace import AxiStreamTracer, AxiTracer, DescriptorTracer, open_trace
+
+DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
+    signals=["addr", "len", "tag", "valid", "ready"],
+    optional_signals=["id", "dest", "user"]
+)
+
+DescStatusBus, DescStatusTransaction, DescStatusSource, DescStatusSink, DescStatusMonitor = define_stream("DescStatus",
+    signals=["tag", "error", "valid"],
+    optional_signals=["len", "id", "dest", "user"]
+)
+
+CLOCK_PERIOD = 10
+
+# total bytes moved per benchmark run (at least two descriptors)
+BENCH_BYTES = int(os.getenv("BENCH_BYTES", 512*1024))
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        # read interface
+        self.read_desc_source = DescSource(DescBus.from_prefix(dut, "s_axis_read_desc"), dut.clk, dut.rst)
+        self.read_desc_status_sink = DescStatusSink(DescStatusBus.from_prefix(dut, "m_axis_read_desc_status"), dut.clk, dut.rst)
+        self.read_data_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis_read_data"), dut.clk, dut.rst)
+
+        # write interface
+        self.write_desc_source = DescSource(DescBus.from_prefix(dut, "s_axis_write_desc"), dut.clk, dut.rst)
+        self.write_desc_status_sink = DescStatusSink(DescStatusBus.from_prefix(dut, "m_axis_write_desc_status"), dut.clk, dut.rst)
+        self.write_data_source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis_write_data"), dut.clk, dut.rst)
+
+        # AXI interface
+        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.rst, size=2**len(dut.m_axi_araddr))
+
+        # beat and burst counters
+        self.ar_count = HandshakeCounter(dut.clk, dut.m_axi_arvalid, dut.m_axi_arready)
+        self.aw_count = HandshakeCounter(dut.clk, dut.m_axi_awvalid, dut.m_axi_awready)
+        self.read_data_count = HandshakeCounter(dut.clk, dut.m_axis_read_data_tvalid,
+            dut.m_axis_read_data_tready, dut.m_axis_read_data_tlast)
+        self.write_data_count = HandshakeCounter(dut.clk, dut.s_axis_write_data_tvalid,
+            dut.s_axis_write_data_tready, dut.s_axis_write_data_tlast)
+
+        dut.read_enable.setimmediatevalue(0)
+        dut.write_enable.setimmediatevalue(0)
+        dut.write_abort.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+def desc_offset(mode, max_burst_bytes):
+    """Start offset within a 4 KiB page for each alignment mode"""
+    if mode == "aligned":
+        return 0
+    # start half a maximum-size burst before a 4 KiB boundary, so every
+    # page boundary falls in the middle of a burst and forces a split
+    offset = 0x1000 - min(max_burst_bytes, 0x1000)//2
+    if mode == "unaligned":
+        offset += 1
+    return offset
+
+
+async def run_bench(dut, direction="read", size=4096, offset_mode="aligned", latency=0):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    byte_lanes = tb.axi_ram.read_if.byte_lanes
+    max_burst_bytes = int(os.getenv("PARAM_AXI_MAX_BURST_LEN"))*byte_lanes
+    tag_count = 2**len(tb.read_desc_source.bus.tag)
+
+    count = max(2, BENCH_BYTES // size)
+    offset = desc_offset(offset_mode, max_burst_bytes)
+
+    # descriptors go to a ring of 4 KiB aligned slots
+    stride = (size + offset + 0x1fff) & ~0xfff
+    slots = max(1, (tb.axi_ram.size - 0x1000) // stride)
+    addrs = [0x1000 + (k % slots)*stride + offset for k in range(count)]
+
+    test_data = patterns.incrementing(size)
+
+    add_ram_latency(tb.axi_ram, latency, latency, CLOCK_PERIOD)
+
+    trace = open_trace(f"{direction}_{size}_{offset_mode}_{latency}")
+    if trace:
+        AxiTracer(AxiBus.from_prefix(dut, "m_axi"), dut.clk, trace, dut.rst, name="m_axi")
+        DescriptorTracer(tb.read_desc_source.bus, tb.read_desc_status_sink.bus, dut.clk, trace, dut.rst, name="read_desc")
+        DescriptorTracer(tb.write_desc_source.bus, tb.write_desc_status_sink.bus, dut.clk, trace, dut.rst, name="write_desc")
+        AxiStreamTracer(tb.read_data_sink.bus, dut.clk, trace, dut.rst, name="m_axis_read_data")
+        AxiStreamTracer(tb.write_data_source.bus, dut.clk, trace, dut.rst, name="s_axis_write_data")
+
+    await tb.cycle_reset()
+
+    if direction == "read":
+        for addr in set(addrs):
+            tb.axi_ram.write(addr, test_data)
+
+        dut.read_enable.value = 1
+        desc_source, status_sink = tb.read_desc_source, tb.read_desc_status_sink
+        data_count, burst_count = tb.read_data_count, tb.ar_count
+    else:
+        dut.write_enable.value = 1
+        desc_source, status_sink = tb.write_desc_source, tb.write_desc_status_sink
+        data_count, burst_count = tb.write_data_count, tb.aw_count
+
+    await RisingEdge(dut.clk)
+
+    data_count.clear()
+    burst_count.clear()
+
+    start_time = get_sim_time('ns')
+
+    # keep the descriptor and data inputs full
+    for k, addr in enumerate(addrs):
+        tag = k % tag_count
+        desc_source.send_nowait(DescTransaction(addr=addr, len=size, tag=tag, id=tag))
+        if direction == "write":
+            tb.write_data_source.send_nowait(AxiStreamFrame(bytes(test_data), tid=tag))
+
+    for k in range(count):
+        if direction == "read":
+            frame = await tb.read_data_sink.recv()
+            assert len(frame.tdata) == size
+        status = await status_sink.recv()
+        assert int(status.error) == 0
+
+    cycles = (get_sim_time('ns') - start_time) / CLOCK_PERIOD
+
+    if direction == "write":
+        assert tb.axi_ram.read(addrs[-1], size) == test_data
+    else:
+        assert frame.tdata == test_data
+
+    gaps = data_count.gaps()
+
+    results.add(direction=direction, size=size, offset_mode=offset_mode, offset=offset, latency=latency,
+        descs=count, cycles=round(cycles),
+        bytes_per_cycle=round(size*count/cycles, 4),
+        efficiency=round(size*count/cycles/byte_lanes, 4),
+        bursts_per_desc=round(burst_count.beats/count, 2),
+        min_bursts_per_desc=-(-size // max_burst_bytes),
+        gap_mean=round(sum(gaps)/len(gaps), 2) if gaps else None,
+        gap_max=max(gaps) if gaps else None)
+
+    if trace:
+        trace.close()
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories(unaligned):
+
+    factory = TestFactory(run_bench)
+    factory.add_option("direction", ["read", "write"])
+    factory.add_option("size", [4096, 65536, 1048576])
+    factory.add_option("offset_mode", ["aligned", "split"] + (["unaligned"] if unaligned else []))
+    factory.add_option("latency", [0, 20])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories(int(os.getenv("PARAM_ENABLE_UNALIGNED"))):
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("max_burst_len", [16, 64, 256])
+@pytest.mark.parametrize("unaligned", [0, 1])
+@pytest.mark.parametrize("axi_data_width", [32, 128])
+def test_axi_dma_bench(request, axi_data_width, unaligned, max_burst_len):
+    dut = "axi_dma"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    # axi_dma requires the AXI stream width to match the AXI width
+    axis_data_width = axi_data_width
+
+    parameters['AXI_DATA_WIDTH'] = axi_data_width
+    parameters['AXI_ADDR_WIDTH'] = 22
+    parameters['AXI_STRB_WIDTH'] = parameters['AXI_DATA_WIDTH'] // 8
+    parameters['AXI_ID_WIDTH'] = 8
+    parameters['AXI_MAX_BURST_LEN'] = max_burst_len
+    parameters['AXIS_DATA_WIDTH'] = axis_data_width
+    parameters['AXIS_KEEP_ENABLE'] = int(parameters['AXIS_DATA_WIDTH'] > 8)
+    parameters['AXIS_KEEP_WIDTH'] = parameters['AXIS_DATA_WIDTH'] // 8
+    parameters['AXIS_LAST_ENABLE'] = 1
+    parameters['AXIS_ID_ENABLE'] = 1
+    parameters['AXIS_ID_WIDTH'] = 8
+    parameters['AXIS_DEST_ENABLE'] = 0
+    parameters['AXIS_DEST_WIDTH'] = 8
+    parameters['AXIS_USER_ENABLE'] = 1
+    parameters['AXIS_USER_WIDTH'] = 1
+    parameters['LEN_WIDTH'] = 21
+    parameters['TAG_WIDTH'] = 8
+    parameters['ENABLE_SG'] = 0
+    parameters['ENABLE_UNALIGNED'] = unaligned
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, data_width=axi_data_width,
+        unaligned=unaligned, max_burst_len=max_burst_len))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories(unaligned)),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
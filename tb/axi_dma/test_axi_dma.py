@@ -26,7 +26,6 @@ import itertools
 import logging
 import os
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
@@ -39,6 +38,8 @@ from cocotbext.axi import AxiBus, AxiRam
 from cocotbext.axi import AxiStreamBus, AxiStreamFrame, AxiStreamSource, AxiStreamSink
 from cocotbext.axi.stream import define_stream
 
+from common import patterns, runner
+
 DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
     signals=["addr", "len", "tag", "valid", "ready"],
     optional_signals=["id", "dest", "user"]
@@ -128,15 +129,15 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
 
                 tb.log.info("length %d, offset %d, diff %d", length, offset, diff)
                 addr = offset+0x1000
-                test_data = bytearray([x % 256 for x in range(length)])
-                test_data2 = bytearray([x % 256 for x in range(length+diff)])
+                test_data = patterns.incrementing(length)
+                test_data2 = patterns.incrementing(length+diff)
 
-                tb.axi_ram.write(addr-128, b'\xaa'*(len(test_data)+256))
+                tb.axi_ram.write(addr-128, patterns.fill(len(test_data)+256))
 
                 desc = DescTransaction(addr=addr, len=len(test_data), tag=cur_tag)
                 await tb.write_desc_source.send(desc)
 
-                await tb.write_data_source.send(AxiStreamFrame(test_data2, tid=cur_tag))
+                await tb.write_data_source.send(AxiStreamFrame(bytes(test_data2), tid=cur_tag))
 
                 status = await tb.write_desc_status_sink.recv()
 
@@ -149,9 +150,9 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
                 tb.log.debug("%s", tb.axi_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
 
                 if len(test_data) <= len(test_data2):
-                    assert tb.axi_ram.read(addr-8, len(test_data)+16) == b'\xaa'*8+test_data+b'\xaa'*8
+                    assert patterns.verify(tb.axi_ram, addr, test_data, guard=8)
                 else:
-                    assert tb.axi_ram.read(addr-8, len(test_data2)+16) == b'\xaa'*8+test_data2+b'\xaa'*8
+                    assert patterns.verify(tb.axi_ram, addr, test_data2, guard=8)
 
                 cur_tag = (cur_tag + 1) % tag_count
 
@@ -180,9 +181,9 @@ async def run_test_read(dut, data_in=None, idle_inserter=None, backpressure_inse
         for offset in list(range(0, byte_lanes*2, step_size))+list(range(4096-byte_lanes*2, 4096, step_size)):
             tb.log.info("length %d, offset %d", length, offset)
             addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+            test_data = patterns.incrementing(length)
 
-            tb.axi_ram.write(addr-128, b'\xaa'*(len(test_data)+256))
+            tb.axi_ram.write(addr-128, patterns.fill(len(test_data)+256))
             tb.axi_ram.write(addr, test_data)
 
             tb.log.debug("%s", tb.axi_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
@@ -212,13 +213,23 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     for test in [run_test_write, run_test_read]:
 
         factory = TestFactory(test)
         factory.add_option("idle_inserter", [None, cycle_pause])
         factory.add_option("backpressure_inserter", [None, cycle_pause])
+        factories.append(factory)
+
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
         factory.generate_tests()
 
 
@@ -270,7 +281,9 @@ def test_axi_dma(request, axi_data_width, unaligned):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
@@ -0,0 +1,256 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+import random
+
+import pytest
+
+import cocotb
+
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiBus, AxiRam
+from cocotbext.axi import AxiStreamBus, AxiStreamFrame, AxiStreamSource, AxiStreamSink
+from cocotbext.axi.memory import Memory
+from cocotbext.axi.stream import define_stream
+
+from common import runner
+from common.dma_model import AxiDmaModel, frame_field
+from common.latency import add_ram_latency
+
+DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
+    signals=["addr", "len", "tag", "valid", "ready"],
+    optional_signals=["id", "dest", "user"]
+)
+
+DescStatusBus, DescStatusTransaction, DescStatusSource, DescStatusSink, DescStatusMonitor = define_stream("DescStatus",
+    signals=["tag", "error", "valid"],
+    optional_signals=["len", "id", "dest", "user"]
+)
+
+CLOCK_PERIOD = 10
+
+# cycles from an AR handshake to the first R beat and from the last W
+# beat to B of AxiRam without added latency (approximate)
+RAM_READ_LATENCY = 2
+RAM_WRITE_LATENCY = 2
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        # read interface
+        self.read_desc_source = DescSource(DescBus.from_prefix(dut, "s_axis_read_desc"), dut.clk, dut.rst)
+        self.read_desc_status_sink = DescStatusSink(DescStatusBus.from_prefix(dut, "m_axis_read_desc_status"), dut.clk, dut.rst)
+        self.read_data_sink = AxiStreamSink(AxiStreamBus.from_prefix(dut, "m_axis_read_data"), dut.clk, dut.rst)
+
+        # write interface
+        self.write_desc_source = DescSource(DescBus.from_prefix(dut, "s_axis_write_desc"), dut.clk, dut.rst)
+        self.write_desc_status_sink = DescStatusSink(DescStatusBus.from_prefix(dut, "m_axis_write_desc_status"), dut.clk, dut.rst)
+        self.write_data_source = AxiStreamSource(AxiStreamBus.from_prefix(dut, "s_axis_write_data"), dut.clk, dut.rst)
+
+        # AXI interface
+        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.rst, size=2**16)
+
+        dut.read_enable.setimmediatevalue(0)
+        dut.write_enable.setimmediatevalue(0)
+        dut.write_abort.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_test_diff(dut, direction="read", latency=0, count=64, seed=1):
+
+    tb = TB(dut)
+    rng = random.Random(seed)
+
+    params = {k[6:]: int(v) for k, v in os.environ.items() if k.startswith("PARAM_")}
+    byte_lanes = tb.axi_ram.read_if.byte_lanes
+    step_size = 1 if params["ENABLE_UNALIGNED"] else byte_lanes
+    tag_count = 2**len(tb.read_desc_source.bus.tag)
+    size = tb.axi_ram.size
+
+    # the model works on a copy of the RTL memory
+    tb.axi_ram.write(0, rng.randbytes(size))
+    mem = Memory(size)
+    mem.write(0, tb.axi_ram.read(0, size))
+
+    model = AxiDmaModel(mem, params, RAM_READ_LATENCY+latency, RAM_WRITE_LATENCY+latency)
+
+    add_ram_latency(tb.axi_ram, latency, latency, CLOCK_PERIOD)
+
+    await tb.cycle_reset()
+
+    dut.read_enable.value = 1
+    dut.write_enable.value = 1
+
+    rtl_cycles = 0
+    model_cycles = 0
+
+    for k in range(count):
+        length = rng.choice([rng.randint(1, byte_lanes*4), rng.randint(1, 1024)])
+        addr = rng.randrange(0x1000, size-0x1000-length, step_size)
+        desc = DescTransaction(addr=addr, len=length, tag=k % tag_count,
+            id=rng.randrange(256), user=rng.randrange(2))
+
+        tb.log.info("%s: addr 0x%04x, length %d", direction, addr, length)
+
+        start_time = get_sim_time('ns')
+        model_start = model.kernel.now
+
+        if direction == "read":
+            await tb.read_desc_source.send(desc)
+            status = await tb.read_desc_status_sink.recv()
+            frame = await tb.read_data_sink.recv()
+            rtl_cycles += (get_sim_time('ns') - start_time) / CLOCK_PERIOD
+
+            model_status, model_frame = model.execute_read(desc)
+
+            assert model_frame.tdata == frame.tdata
+            for field in ["tid", "tdest", "tuser"]:
+                assert frame_field(model_frame, field, length-1) == frame_field(frame, field, length-1)
+        else:
+            data = rng.randbytes(max(1, length + rng.choice([-8, -1, 0, 0, 1, 8])))
+            frame = AxiStreamFrame(data, tid=rng.randrange(256), tuser=rng.randrange(2))
+
+            await tb.write_desc_source.send(desc)
+            await tb.write_data_source.send(frame)
+            status = await tb.write_desc_status_sink.recv()
+            rtl_cycles += (get_sim_time('ns') - start_time) / CLOCK_PERIOD
+
+            model_status = model.execute_write(desc, frame)
+
+            assert int(status.len) == model_status.len
+            assert int(status.id) == model_status.id
+            assert int(status.user) == model_status.user
+            assert tb.axi_ram.read(0, size) == mem.read(0, size)
+
+        model_cycles += model.kernel.now - model_start
+
+        tb.log.info("status: %s, model: %s", status, model_status)
+
+        assert int(status.tag) == model_status.tag
+        assert int(status.error) == model_status.error
+
+    tb.log.info("%s: RTL %d cycles, model %d cycles (%+.1f%%)", direction, rtl_cycles,
+        model_cycles, (model_cycles / rtl_cycles - 1)*100)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_test_diff)
+    factory.add_option("direction", ["read", "write"])
+    factory.add_option("latency", [0, 16])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.parametrize("axi_data_width", [8, 32])
+@pytest.mark.parametrize("unaligned", [0, 1])
+def test_axi_dma_model(request, axi_data_width, unaligned):
+    dut = "axi_dma"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    axis_data_width = axi_data_width
+
+    parameters['AXI_DATA_WIDTH'] = axi_data_width
+    parameters['AXI_ADDR_WIDTH'] = 16
+    parameters['AXI_STRB_WIDTH'] = parameters['AXI_DATA_WIDTH'] // 8
+    parameters['AXI_ID_WIDTH'] = 8
+    parameters['AXI_MAX_BURST_LEN'] = 16
+    parameters['AXIS_DATA_WIDTH'] = axis_data_width
+    parameters['AXIS_KEEP_ENABLE'] = int(parameters['AXIS_DATA_WIDTH'] > 8)
+    parameters['AXIS_KEEP_WIDTH'] = parameters['AXIS_DATA_WIDTH'] // 8
+    parameters['AXIS_LAST_ENABLE'] = 1
+    parameters['AXIS_ID_ENABLE'] = 1
+    parameters['AXIS_ID_WIDTH'] = 8
+    parameters['AXIS_DEST_ENABLE'] = 0
+    parameters['AXIS_DEST_WIDTH'] = 8
+    parameters['AXIS_USER_ENABLE'] = 1
+    parameters['AXIS_USER_WIDTH'] = 1
+    parameters['LEN_WIDTH'] = 20
+    parameters['TAG_WIDTH'] = 8
+    parameters['ENABLE_SG'] = 0
+    parameters['ENABLE_UNALIGNED'] = unaligned
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
@@ -26,7 +26,6 @@ import itertools
 import logging
 import os
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
@@ -38,6 +37,8 @@ from cocotbext.axi import AxiReadBus, AxiRamRead
 from cocotbext.axi import AxiStreamBus, AxiStreamSink
 from cocotbext.axi.stream import define_stream
 
+from common import patterns, runner
+
 DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
     signals=["addr", "len", "tag", "valid", "ready"],
     optional_signals=["id", "dest", "user"]
@@ -111,9 +112,9 @@ async def run_test_read(dut, data_in=None, idle_inserter=None, backpressure_inse
         for offset in list(range(0, byte_lanes*2, step_size))+list(range(4096-byte_lanes*2, 4096, step_size)):
             tb.log.info("length %d, offset %d", length, offset)
             addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+            test_data = patterns.incrementing(length)
 
-            tb.axi_ram.write(addr-128, b'\xaa'*(len(test_data)+256))
+            tb.axi_ram.write(addr-128, patterns.fill(len(test_data)+256))
             tb.axi_ram.write(addr, test_data)
 
             tb.log.debug("%s", tb.axi_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
@@ -143,12 +144,22 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     factory = TestFactory(run_test_read)
     factory.add_option("idle_inserter", [None, cycle_pause])
     factory.add_option("backpressure_inserter", [None, cycle_pause])
-    factory.generate_tests()
+    factories.append(factory)
+
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -197,7 +208,9 @@ def test_axi_dma_rd(request, axi_data_width, unaligned):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
@@ -26,7 +26,6 @@ import itertools
 import logging
 import os
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
@@ -38,6 +37,8 @@ from cocotbext.axi import AxiWriteBus, AxiRamWrite
 from cocotbext.axi import AxiStreamBus, AxiStreamFrame, AxiStreamSource
 from cocotbext.axi.stream import define_stream
 
+from common import patterns, runner
+
 DescBus, DescTransaction, DescSource, DescSink, DescMonitor = define_stream("Desc",
     signals=["addr", "len", "tag", "valid", "ready"],
     optional_signals=["id", "dest", "user"]
@@ -116,15 +117,15 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
 
                 tb.log.info("length %d, offset %d, diff %d", length, offset, diff)
                 addr = offset+0x1000
-                test_data = bytearray([x % 256 for x in range(length)])
-                test_data2 = bytearray([x % 256 for x in range(length+diff)])
+                test_data = patterns.incrementing(length)
+                test_data2 = patterns.incrementing(length+diff)
 
-                tb.axi_ram.write(addr-128, b'\xaa'*(len(test_data)+256))
+                tb.axi_ram.write(addr-128, patterns.fill(len(test_data)+256))
 
                 desc = DescTransaction(addr=addr, len=len(test_data), tag=cur_tag)
                 await tb.write_desc_source.send(desc)
 
-                await tb.write_data_source.send(AxiStreamFrame(test_data2, tid=cur_tag))
+                await tb.write_data_source.send(AxiStreamFrame(bytes(test_data2), tid=cur_tag))
 
                 status = await tb.write_desc_status_sink.recv()
 
@@ -137,9 +138,9 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
                 tb.log.debug("%s", tb.axi_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
 
                 if len(test_data) <= len(test_data2):
-                    assert tb.axi_ram.read(addr-8, len(test_data)+16) == b'\xaa'*8+test_data+b'\xaa'*8
+                    assert patterns.verify(tb.axi_ram, addr, test_data, guard=8)
                 else:
-                    assert tb.axi_ram.read(addr-8, len(test_data2)+16) == b'\xaa'*8+test_data2+b'\xaa'*8
+                    assert patterns.verify(tb.axi_ram, addr, test_data2, guard=8)
 
                 cur_tag = (cur_tag + 1) % tag_count
 
@@ -151,12 +152,22 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     factory = TestFactory(run_test_write)
     factory.add_option("idle_inserter", [None, cycle_pause])
     factory.add_option("backpressure_inserter", [None, cycle_pause])
-    factory.generate_tests()
+    factories.append(factory)
+
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -205,7 +216,9 @@ def test_axi_dma_wr(request, axi_data_width, unaligned):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
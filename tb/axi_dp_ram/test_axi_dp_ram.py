@@ -25,18 +25,20 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
-import random
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiBus, AxiMaster
 
+from common import patterns, runner
+from common.sweep import Sweep
+from common.traffic import TrafficGenerator
+
 
 class TB(object):
     def __init__(self, dut):
@@ -98,19 +100,24 @@ async def run_test_write(dut, port=0, data_in=None, idle_inserter=None, backpres
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in list(range(1, byte_lanes*2))+[1024]:
-        for offset in list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096)):
-            tb.log.info("length %d, offset %d, size %d", length, offset, size)
-            addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = list(range(1, byte_lanes*2))+[1024]
+    offsets = list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096))
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d, size %d", length, offset, size)
+        test_data = patterns.incrementing(length)
+
+        await axi_master.write(addr-4, patterns.fill(length+8))
 
-            await axi_master.write(addr-4, b'\xaa'*(length+8))
+        await axi_master.write(addr, test_data, size=size)
 
-            await axi_master.write(addr, test_data, size=size)
+        data = await axi_master.read(addr-1, length+2)
 
-            data = await axi_master.read(addr-1, length+2)
+        assert patterns.verify(data.data, 1, test_data, guard=1)
 
-            assert data.data == b'\xaa'+test_data+b'\xaa'
+    await sweep.run(run_case)
 
     await RisingEdge(dut.a_clk)
     await RisingEdge(dut.a_clk)
@@ -132,17 +139,22 @@ async def run_test_read(dut, port=0, data_in=None, idle_inserter=None, backpress
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in list(range(1, byte_lanes*2))+[1024]:
-        for offset in list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096)):
-            tb.log.info("length %d, offset %d, size %d", length, offset, size)
-            addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = list(range(1, byte_lanes*2))+[1024]
+    offsets = list(range(byte_lanes, byte_lanes*2))+list(range(4096-byte_lanes, 4096))
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d, size %d", length, offset, size)
+        test_data = patterns.incrementing(length)
+
+        await axi_master.write(addr, test_data)
 
-            await axi_master.write(addr, test_data)
+        data = await axi_master.read(addr, length, size=size)
 
-            data = await axi_master.read(addr, length, size=size)
+        assert data.data == test_data
 
-            assert data.data == test_data
+    await sweep.run(run_case)
 
     await RisingEdge(dut.a_clk)
     await RisingEdge(dut.a_clk)
@@ -186,28 +198,10 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    async def worker(master, offset, aperture, count=16):
-        for k in range(count):
-            length = random.randint(1, min(512, aperture))
-            addr = offset+random.randint(0, aperture-length)
-            test_data = bytearray([x % 256 for x in range(length)])
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            await master.write(addr, test_data)
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            data = await master.read(addr, length)
-            assert data.data == test_data
-
-    workers = []
-
-    for k in range(16):
-        workers.append(cocotb.start_soon(worker(tb.axi_master[k % len(tb.axi_master)], k*0x1000, 0x1000, count=16)))
+    traffic = TrafficGenerator(size=(1, 512), clock_period=8, log=tb.log)
+    traffic.add_workers(tb.axi_master, aperture=0x1000, workers=16, count=16)
 
-    while workers:
-        await workers.pop(0).join()
+    await traffic.run()
 
     await RisingEdge(dut.a_clk)
     await RisingEdge(dut.a_clk)
@@ -217,12 +211,13 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories(data_width):
 
-    data_width = len(cocotb.top.s_axi_a_wdata)
     byte_lanes = data_width // 8
     max_burst_size = (byte_lanes-1).bit_length()
 
+    factories = []
+
     for test in [run_test_write, run_test_read]:
 
         factory = TestFactory(test)
@@ -230,15 +225,24 @@ if cocotb.SIM_NAME:
         factory.add_option("backpressure_inserter", [None, cycle_pause])
         factory.add_option("size", [None]+list(range(max_burst_size)))
         factory.add_option("port", [0, 1])
-        factory.generate_tests()
+        factories.append(factory)
 
     factory = TestFactory(run_test_arb)
     factory.add_option("idle_inserter", [None, cycle_pause])
     factory.add_option("backpressure_inserter", [None, cycle_pause])
-    factory.generate_tests()
+    factories.append(factory)
+
+    factories.append(TestFactory(run_stress_test))
 
-    factory = TestFactory(run_stress_test)
-    factory.generate_tests()
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    data_width = len(cocotb.top.s_axi_a_wdata)
+
+    for factory in build_factories(data_width):
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -273,7 +277,9 @@ def test_axi_dp_ram(request, data_width):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories(data_width)),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
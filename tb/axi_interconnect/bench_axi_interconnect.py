@@ -0,0 +1,227 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+import subprocess
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiBus, AxiMaster, AxiRam
+
+from common import runner
+from common.bench import BenchResults, ROUTING_PATTERNS, TRAFFIC_MIXES, traffic_row, bench_env
+from common.traffic import TrafficGenerator, Exponential
+
+
+CLOCK_PERIOD = 10
+
+# mean gap between operations of each worker, in ns, from light load to saturating
+LOAD_GAPS = [4000, 2000, 1000, 500, 250, 100, 0]
+
+
+def port_count(dut, prefix):
+    count = 0
+    while hasattr(dut, f"{prefix}{count:02d}_axi_awvalid"):
+        count += 1
+    return count
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        # same port naming for the axi_interconnect and axi_crossbar wrappers
+        s_count = port_count(dut, "s")
+        m_count = port_count(dut, "m")
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axi_master = [AxiMaster(AxiBus.from_prefix(dut, f"s{k:02d}_axi"), dut.clk, dut.rst) for k in range(s_count)]
+        self.axi_ram = [AxiRam(AxiBus.from_prefix(dut, f"m{k:02d}_axi"), dut.clk, dut.rst, size=2**16) for k in range(m_count)]
+
+        for ram in self.axi_ram:
+            # prevent X propagation from screwing things up - "anything but X!"
+            # (X on bid and rid can propagate X to ready/valid)
+            ram.write_if.b_channel.bus.bid.setimmediatevalue(0)
+            ram.read_if.r_channel.bus.rid.setimmediatevalue(0)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, pattern="uniform", mix="mixed", size=256, workers=2, count=16):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    s_count = len(tb.axi_master)
+    m_count = len(tb.axi_ram)
+    total_workers = s_count*workers
+
+    await tb.cycle_reset()
+
+    route = ROUTING_PATTERNS[pattern]
+    aperture = 2**16 // total_workers
+    saturation = None
+
+    for gap in LOAD_GAPS:
+        traffic = TrafficGenerator(size=size, gap=Exponential(gap) if gap else 0,
+            read_ratio=TRAFFIC_MIXES[mix], locality="sequential", clock_period=CLOCK_PERIOD, log=tb.log)
+
+        groups = {}
+        for s in range(s_count):
+            regions = [m*0x1000000 for m in route(s, s_count, m_count)]
+            for k in range(workers):
+                w = traffic.add_worker(tb.axi_master[s], (s*workers+k)*aperture, aperture, regions, count)
+                groups[w.index] = s
+
+        stats = await traffic.run()
+        row = traffic_row(stats, CLOCK_PERIOD, groups)
+
+        # load offered if every operation completed instantly; the DUT is
+        # saturated once it delivers less than 90% of that
+        offered = total_workers*size*CLOCK_PERIOD/gap if gap else None
+        saturated = offered is None or row["bytes_per_cycle"] < 0.9*offered
+
+        if saturated and saturation is None:
+            saturation = offered
+
+        results.add(pattern=pattern, mix=mix, size=size, gap_ns=gap,
+            offered_bytes_per_cycle=None if offered is None else round(offered, 4),
+            saturated=int(saturated), **row)
+
+    tb.log.info("Saturates at offered load %s bytes/cycle", "max" if saturation is None else f"{saturation:.3f}")
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("pattern", list(ROUTING_PATTERNS))
+    factory.add_option("mix", list(TRAFFIC_MIXES))
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("dut", ["axi_interconnect", "axi_crossbar"])
+@pytest.mark.parametrize("s_count, m_count, data_width", [(2, 2, 32), (4, 4, 32), (4, 4, 64)])
+def test_axi_interconnect_bench(request, s_count, m_count, data_width, dut):
+    wrapper = f"{dut}_wrap_{s_count}x{m_count}"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = wrapper
+
+    # generate wrapper
+    wrapper_file = os.path.join(tests_dir, f"{wrapper}.v")
+    if not os.path.exists(wrapper_file):
+        subprocess.Popen(
+            [os.path.join(rtl_dir, f"{dut}_wrap.py"), "-p", f"{s_count}", f"{m_count}"],
+            cwd=tests_dir
+        ).wait()
+
+    parameters = {}
+
+    parameters['S_COUNT'] = s_count
+    parameters['M_COUNT'] = m_count
+
+    parameters['DATA_WIDTH'] = data_width
+    parameters['ADDR_WIDTH'] = 32
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+    parameters['M_REGIONS'] = 1
+
+    if dut == "axi_interconnect":
+        verilog_sources = [
+            wrapper_file,
+            os.path.join(rtl_dir, f"{dut}.v"),
+            os.path.join(rtl_dir, "arbiter.v"),
+            os.path.join(rtl_dir, "priority_encoder.v"),
+        ]
+
+        parameters['ID_WIDTH'] = 8
+        parameters['FORWARD_ID'] = 1
+    else:
+        verilog_sources = [
+            wrapper_file,
+            os.path.join(rtl_dir, f"{dut}.v"),
+            os.path.join(rtl_dir, f"{dut}_addr.v"),
+            os.path.join(rtl_dir, f"{dut}_rd.v"),
+            os.path.join(rtl_dir, f"{dut}_wr.v"),
+            os.path.join(rtl_dir, "axi_register_rd.v"),
+            os.path.join(rtl_dir, "axi_register_wr.v"),
+            os.path.join(rtl_dir, "arbiter.v"),
+            os.path.join(rtl_dir, "priority_encoder.v"),
+        ]
+
+        parameters['S_ID_WIDTH'] = 8
+        parameters['M_ID_WIDTH'] = parameters['S_ID_WIDTH'] + (s_count-1).bit_length()
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, "axi_interconnect_vs_crossbar", dut=dut,
+        s_count=s_count, m_count=m_count, data_width=data_width))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
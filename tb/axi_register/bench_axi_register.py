@@ -0,0 +1,205 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiBus, AxiMaster, AxiRam
+
+from common import runner
+from common.bench import BenchResults, ChannelProbe, bench_env, random_pause
+from common.traffic import TrafficGenerator
+
+
+CLOCK_PERIOD = 10
+
+# channel name: (input prefix, output prefix); B and R flow from m_axi to s_axi
+CHANNELS = {
+    "aw": ("s_axi", "m_axi"),
+    "w": ("s_axi", "m_axi"),
+    "b": ("m_axi", "s_axi"),
+    "ar": ("s_axi", "m_axi"),
+    "r": ("m_axi", "s_axi"),
+}
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axi_master = AxiMaster(AxiBus.from_prefix(dut, "s_axi"), dut.clk, dut.rst)
+        self.axi_ram = AxiRam(AxiBus.from_prefix(dut, "m_axi"), dut.clk, dut.rst, size=2**16)
+
+        self.probes = {}
+        for ch, (src, dst) in CHANNELS.items():
+            self.probes[ch] = ChannelProbe(dut.clk,
+                getattr(dut, f"{src}_{ch}valid"), getattr(dut, f"{src}_{ch}ready"),
+                getattr(dut, f"{dst}_{ch}valid"), getattr(dut, f"{dst}_{ch}ready"))
+
+    def set_idle_generator(self, generator=None):
+        if generator:
+            self.axi_master.write_if.aw_channel.set_pause_generator(generator())
+            self.axi_master.write_if.w_channel.set_pause_generator(generator())
+            self.axi_master.read_if.ar_channel.set_pause_generator(generator())
+            self.axi_ram.write_if.b_channel.set_pause_generator(generator())
+            self.axi_ram.read_if.r_channel.set_pause_generator(generator())
+
+    def set_backpressure_generator(self, generator=None):
+        if generator:
+            self.axi_master.write_if.b_channel.set_pause_generator(generator())
+            self.axi_master.read_if.r_channel.set_pause_generator(generator())
+            self.axi_ram.write_if.aw_channel.set_pause_generator(generator())
+            self.axi_ram.write_if.w_channel.set_pause_generator(generator())
+            self.axi_ram.read_if.ar_channel.set_pause_generator(generator())
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, traffic="burst", pause=0.0):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    byte_lanes = tb.axi_master.write_if.byte_lanes
+
+    await tb.cycle_reset()
+
+    if pause:
+        tb.set_idle_generator(random_pause(pause, seed=1))
+        tb.set_backpressure_generator(random_pause(pause, seed=2))
+
+    # long bursts load the W and R channels, single beats the address and
+    # response channels
+    if traffic == "burst":
+        gen = TrafficGenerator(size=256*byte_lanes, gap=0, read_ratio=0.5,
+            locality="sequential", clock_period=CLOCK_PERIOD, log=tb.log)
+        gen.add_workers(tb.axi_master, aperture=0x1000, workers=4, count=8)
+    else:
+        gen = TrafficGenerator(size=byte_lanes, gap=0, read_ratio=0.5,
+            locality="sequential", clock_period=CLOCK_PERIOD, log=tb.log)
+        gen.add_workers(tb.axi_master, aperture=0x1000, workers=16, count=64)
+
+    for probe in tb.probes.values():
+        probe.clear()
+
+    await gen.run()
+
+    for ch, probe in tb.probes.items():
+        row = probe.row()
+        # only meaningful without stalls from the traffic source or sink
+        full_rate = (row["accept_rate"] is not None and row["accept_rate"] >= 0.99) if not pause else None
+        if full_rate is False:
+            tb.log.warning("%s channel does not sustain one beat per cycle (accept rate %s)", ch, row["accept_rate"])
+        results.add(channel=ch, traffic=traffic, pause=pause, **row,
+            full_rate=None if full_rate is None else int(full_rate))
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("traffic", ["burst", "single"])
+    factory.add_option("pause", [0.0, 0.25, 0.5])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("reg_type", [0, 1, 2])
+@pytest.mark.parametrize("data_width", [32])
+def test_axi_register_bench(request, data_width, reg_type):
+    dut = "axi_register"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    parameters['DATA_WIDTH'] = data_width
+    parameters['ADDR_WIDTH'] = 32
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+    parameters['ID_WIDTH'] = 8
+    parameters['AW_REG_TYPE'] = reg_type
+    parameters['W_REG_TYPE'] = reg_type
+    parameters['B_REG_TYPE'] = reg_type
+    parameters['AR_REG_TYPE'] = reg_type
+    parameters['R_REG_TYPE'] = reg_type
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, "register_slice", dut=dut, data_width=data_width, reg_type=reg_type))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
@@ -25,18 +25,20 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
-import random
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiLiteBus, AxiLiteMaster, AxiLiteRam
 
+from common import patterns, runner
+from common.sweep import Sweep
+from common.traffic import TrafficGenerator
+
 
 class TB(object):
     def __init__(self, dut):
@@ -89,21 +91,24 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
 
-            tb.axil_ram.write(addr-128, b'\xaa'*(length+256))
+        tb.axil_ram.write(addr-128, patterns.fill(length+256))
 
-            await tb.axil_master.write(addr, test_data)
+        await tb.axil_master.write(addr, test_data)
 
-            tb.log.debug("%s", tb.axil_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
+        tb.log.debug("%s", tb.axil_ram.hexdump_str((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
 
-            assert tb.axil_ram.read(addr, length) == test_data
-            assert tb.axil_ram.read(addr-1, 1) == b'\xaa'
-            assert tb.axil_ram.read(addr+length, 1) == b'\xaa'
+        assert patterns.verify(tb.axil_ram, addr, test_data, guard=1)
+
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -120,17 +125,22 @@ async def run_test_read(dut, data_in=None, idle_inserter=None, backpressure_inse
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
 
-            tb.axil_ram.write(addr, test_data)
+        tb.axil_ram.write(addr, test_data)
 
-            data = await tb.axil_master.read(addr, length)
+        data = await tb.axil_master.read(addr, length)
 
-            assert data.data == test_data
+        assert data.data == test_data
+
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -145,28 +155,10 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    async def worker(master, offset, aperture, count=16):
-        for k in range(count):
-            length = random.randint(1, min(32, aperture))
-            addr = offset+random.randint(0, aperture-length)
-            test_data = bytearray([x % 256 for x in range(length)])
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            await master.write(addr, test_data)
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            data = await master.read(addr, length)
-            assert data.data == test_data
+    traffic = TrafficGenerator(size=(1, 32), clock_period=10, log=tb.log)
+    traffic.add_workers(tb.axil_master, aperture=0x1000, workers=16, count=16)
 
-    workers = []
-
-    for k in range(16):
-        workers.append(cocotb.start_soon(worker(tb.axil_master, k*0x1000, 0x1000, count=16)))
-
-    while workers:
-        await workers.pop(0).join()
+    await traffic.run()
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -176,17 +168,26 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     for test in [run_test_write, run_test_read]:
 
         factory = TestFactory(test)
         factory.add_option("idle_inserter", [None, cycle_pause])
         factory.add_option("backpressure_inserter", [None, cycle_pause])
-        factory.generate_tests()
+        factories.append(factory)
+
+    factories.append(TestFactory(run_stress_test))
 
-    factory = TestFactory(run_stress_test)
-    factory.generate_tests()
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -221,7 +222,9 @@ def test_axil_adapter(request, s_data_width, m_data_width):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
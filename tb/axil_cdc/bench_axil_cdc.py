@@ -0,0 +1,172 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Timer
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiLiteBus, AxiLiteMaster, AxiLiteRam
+
+from common import runner
+from common.bench import BenchResults, TRAFFIC_MIXES, traffic_row, bench_env
+from common.traffic import TrafficGenerator
+
+
+# source (s_clk) period in ps, the master side clock is scaled from this
+S_PERIOD = 10000
+
+# m_clk period / s_clk period; 1.013 drifts slowly through all phase
+# relationships, 0.667 and 1.5 are non-integer ratios
+CLOCK_RATIOS = [0.125, 0.25, 0.5, 0.667, 1.0, 1.013, 1.5, 2.0, 4.0, 8.0]
+
+
+class TB(object):
+    def __init__(self, dut, ratio=1.0, phase=0.0):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        # whole picoseconds in each half period
+        self.m_period = 2*int(round(S_PERIOD*ratio/2))
+
+        cocotb.start_soon(Clock(dut.s_clk, S_PERIOD, units="ps").start())
+        cocotb.start_soon(self._start_m_clk(int(round(S_PERIOD*phase))))
+
+        self.axil_master = AxiLiteMaster(AxiLiteBus.from_prefix(dut, "s_axil"), dut.s_clk, dut.s_rst)
+        self.axil_ram = AxiLiteRam(AxiLiteBus.from_prefix(dut, "m_axil"), dut.m_clk, dut.m_rst, size=2**16)
+
+    async def _start_m_clk(self, delay):
+        self.dut.m_clk.setimmediatevalue(0)
+        if delay:
+            await Timer(delay, 'ps')
+        cocotb.start_soon(Clock(self.dut.m_clk, self.m_period, units="ps").start())
+
+    async def cycle_reset(self):
+        self.dut.s_rst.setimmediatevalue(0)
+        self.dut.m_rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.s_clk)
+        await RisingEdge(self.dut.s_clk)
+        self.dut.s_rst.value = 1
+        self.dut.m_rst.value = 1
+        # hold reset for a few cycles of the slower clock
+        await Timer(max(S_PERIOD, self.m_period)*4, 'ps')
+        await RisingEdge(self.dut.s_clk)
+        self.dut.s_rst.value = 0
+        self.dut.m_rst.value = 0
+        await Timer(max(S_PERIOD, self.m_period)*2, 'ps')
+        await RisingEdge(self.dut.s_clk)
+
+
+async def run_bench(dut, ratio=1.0, phase=0.0, mix="mixed", workers=4, count=32):
+
+    tb = TB(dut, ratio, phase)
+    results = BenchResults(log=tb.log)
+
+    byte_lanes = tb.axil_master.write_if.byte_lanes
+
+    await tb.cycle_reset()
+
+    s_period_ns = S_PERIOD/1000
+
+    traffic = TrafficGenerator(size=byte_lanes, gap=0, read_ratio=TRAFFIC_MIXES[mix],
+        locality="sequential", clock_period=s_period_ns, log=tb.log)
+    traffic.add_workers(tb.axil_master, aperture=0x1000, workers=workers, count=count)
+
+    stats = await traffic.run()
+
+    row = traffic_row(stats, s_period_ns)
+
+    results.add(ratio=ratio, m_period_ps=tb.m_period, phase=phase, mix=mix,
+        tx_per_src_cycle=round(row["ops"]/row["cycles"], 4) if row["cycles"] else None,
+        **row)
+
+    await RisingEdge(dut.s_clk)
+    await RisingEdge(dut.s_clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("ratio", CLOCK_RATIOS)
+    factory.add_option("phase", [0.0, 0.5])
+    factory.add_option("mix", list(TRAFFIC_MIXES))
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("data_width", [32])
+def test_axil_cdc_bench(request, data_width):
+    dut = "axil_cdc"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    parameters['DATA_WIDTH'] = data_width
+    parameters['ADDR_WIDTH'] = 32
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, data_width=data_width))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
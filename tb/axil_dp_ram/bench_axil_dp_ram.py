@@ -0,0 +1,228 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Combine
+from cocotb.regression import TestFactory
+from cocotb.utils import get_sim_time
+
+from cocotbext.axi import AxiLiteBus, AxiLiteMaster
+
+from common import patterns, runner
+from common.bench import BenchResults, HandshakeCounter, jain_index, latency_columns, bench_env
+from common.traffic import TrafficStats
+
+
+CLOCK_PERIOD = 10
+PORTS = "ab"
+
+# operation issued by each port, per traffic mix
+PORT_MIXES = {
+    "read": ("read", "read"),
+    "write": ("write", "write"),
+    "mixed": ("mixed", "mixed"),
+    "split": ("write", "read"),
+}
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.a_clk, CLOCK_PERIOD, units="ns").start())
+        cocotb.start_soon(Clock(dut.b_clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axil_master = []
+        self.data_count = []
+
+        for p in PORTS:
+            clk = getattr(dut, f"{p}_clk")
+            self.axil_master.append(AxiLiteMaster(AxiLiteBus.from_prefix(dut, f"s_axil_{p}"), clk, getattr(dut, f"{p}_rst")))
+            self.data_count.append([
+                HandshakeCounter(clk, getattr(dut, f"s_axil_{p}_wvalid"), getattr(dut, f"s_axil_{p}_wready")),
+                HandshakeCounter(clk, getattr(dut, f"s_axil_{p}_rvalid"), getattr(dut, f"s_axil_{p}_rready")),
+            ])
+
+    def clear(self):
+        for counters in self.data_count:
+            for c in counters:
+                c.clear()
+
+    async def cycle_reset(self):
+        self.dut.a_rst.setimmediatevalue(0)
+        self.dut.b_rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.a_clk)
+        await RisingEdge(self.dut.a_clk)
+        self.dut.a_rst.value = 1
+        self.dut.b_rst.value = 1
+        await RisingEdge(self.dut.a_clk)
+        await RisingEdge(self.dut.a_clk)
+        self.dut.a_rst.value = 0
+        await RisingEdge(self.dut.b_clk)
+        self.dut.b_rst.value = 0
+        await RisingEdge(self.dut.a_clk)
+        await RisingEdge(self.dut.a_clk)
+
+
+async def run_bench(dut, pattern="same", mix="mixed", words=16, workers=2, count=16):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    byte_lanes = tb.axil_master[0].write_if.byte_lanes
+    length = words*byte_lanes
+
+    await tb.cycle_reset()
+
+    # not TrafficGenerator: the port mixes give each port its own operation
+    # (e.g. port A writes while port B reads the same addresses), both ports
+    # overwrite each other's data in the "same" pattern so reads cannot be
+    # checked against a per-worker shadow, and all workers share one start
+    # time so the per-port bandwidth is comparable
+    stats = [TrafficStats(CLOCK_PERIOD) for p in PORTS]
+    test_data = patterns.incrementing(length)
+
+    async def worker(port, index):
+        master = tb.axil_master[port]
+        op = PORT_MIXES[mix][port]
+
+        # same: both ports walk the same addresses, disjoint: separate halves
+        base = index*0x1000
+        if pattern == "disjoint":
+            base += port*0x8000
+
+        for k in range(count):
+            addr = base + (k*length) % 0x1000
+
+            kinds = ["write", "read"] if op == "mixed" else [op]
+            for kind in kinds:
+                start = get_sim_time('ns')
+                if kind == "write":
+                    await master.write(addr, test_data)
+                else:
+                    await master.read(addr, length)
+                stats[port].record(kind, length, start, get_sim_time('ns'), index)
+
+    tb.clear()
+
+    start = get_sim_time('ns')
+    for s in stats:
+        s.start_time = start
+    await Combine(*[cocotb.start_soon(worker(p, k)) for p in range(len(PORTS)) for k in range(workers)])
+    end = get_sim_time('ns')
+    for s in stats:
+        s.end_time = end
+
+    cycles = (end - start) / CLOCK_PERIOD
+    port_bw = [s.bytes() / cycles for s in stats]
+
+    row = {
+        "pattern": pattern,
+        "mix": mix,
+        "words": words,
+        "cycles": round(cycles),
+        "bytes_per_cycle": round(sum(port_bw), 4),
+        "fairness": round(jain_index(port_bw), 4),
+    }
+
+    for p, name in enumerate(PORTS):
+        row[f"{name}_bytes_per_cycle"] = round(port_bw[p], 4)
+        row[f"{name}_read_bytes_per_cycle"] = round(stats[p].bytes("read") / cycles, 4)
+        row[f"{name}_write_bytes_per_cycle"] = round(stats[p].bytes("write") / cycles, 4)
+        row[f"{name}_beats_per_cycle"] = round(sum(c.beats for c in tb.data_count[p]) / cycles, 4)
+        row.update(latency_columns(f"{name}_read_lat", stats[p].latencies("read"), CLOCK_PERIOD))
+        row.update(latency_columns(f"{name}_write_lat", stats[p].latencies("write"), CLOCK_PERIOD))
+
+    results.add(**row)
+
+    await RisingEdge(dut.a_clk)
+    await RisingEdge(dut.a_clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("pattern", ["same", "disjoint"])
+    factory.add_option("mix", list(PORT_MIXES))
+    factory.add_option("words", [1, 16])
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("pipeline_output", [0, 1])
+def test_axil_dp_ram_bench(request, pipeline_output):
+    dut = "axil_dp_ram"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+    ]
+
+    parameters = {}
+
+    parameters['DATA_WIDTH'] = 32
+    parameters['ADDR_WIDTH'] = 16
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+    parameters['PIPELINE_OUTPUT'] = pipeline_output
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, pipeline_output=pipeline_output))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
@@ -25,18 +25,20 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
-import random
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiLiteBus, AxiLiteMaster
 
+from common import patterns, runner
+from common.sweep import Sweep
+from common.traffic import TrafficGenerator
+
 
 class TB(object):
     def __init__(self, dut):
@@ -94,19 +96,24 @@ async def run_test_write(dut, port=0, data_in=None, idle_inserter=None, backpres
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
+
+        await axil_master.write(addr-4, patterns.fill(length+8))
 
-            await axil_master.write(addr-4, b'\xaa'*(length+8))
+        await axil_master.write(addr, test_data)
 
-            await axil_master.write(addr, test_data)
+        data = await axil_master.read(addr-1, length+2)
 
-            data = await axil_master.read(addr-1, length+2)
+        assert patterns.verify(data.data, 1, test_data, guard=1)
 
-            assert data.data == b'\xaa'+test_data+b'\xaa'
+    await sweep.run(run_case)
 
     await RisingEdge(dut.a_clk)
     await RisingEdge(dut.a_clk)
@@ -124,17 +131,22 @@ async def run_test_read(dut, port=0, data_in=None, idle_inserter=None, backpress
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset+0x1000
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    sweep = Sweep(lengths, offsets, base=0x1000)
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
+
+        await axil_master.write(addr, test_data)
 
-            await axil_master.write(addr, test_data)
+        data = await axil_master.read(addr, length)
 
-            data = await axil_master.read(addr, length)
+        assert data.data == test_data
 
-            assert data.data == test_data
+    await sweep.run(run_case)
 
     await RisingEdge(dut.a_clk)
     await RisingEdge(dut.a_clk)
@@ -178,28 +190,10 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    async def worker(master, offset, aperture, count=16):
-        for k in range(count):
-            length = random.randint(1, min(32, aperture))
-            addr = offset+random.randint(0, aperture-length)
-            test_data = bytearray([x % 256 for x in range(length)])
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            await master.write(addr, test_data)
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            data = await master.read(addr, length)
-            assert data.data == test_data
-
-    workers = []
+    traffic = TrafficGenerator(size=(1, 32), clock_period=8, log=tb.log)
+    traffic.add_workers(tb.axil_master, aperture=0x1000, workers=16, count=16)
 
-    for k in range(16):
-        workers.append(cocotb.start_soon(worker(tb.axil_master[k%len(tb.axil_master)], k*0x1000, 0x1000, count=16)))
-
-    while workers:
-        await workers.pop(0).join()
+    await traffic.run()
 
     await RisingEdge(dut.a_clk)
     await RisingEdge(dut.a_clk)
@@ -209,7 +203,9 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     for test in [run_test_write, run_test_read]:
 
@@ -217,15 +213,22 @@ if cocotb.SIM_NAME:
         factory.add_option("idle_inserter", [None, cycle_pause])
         factory.add_option("backpressure_inserter", [None, cycle_pause])
         factory.add_option("port", [0, 1])
-        factory.generate_tests()
+        factories.append(factory)
 
     factory = TestFactory(run_test_arb)
     factory.add_option("idle_inserter", [None, cycle_pause])
     factory.add_option("backpressure_inserter", [None, cycle_pause])
-    factory.generate_tests()
+    factories.append(factory)
 
-    factory = TestFactory(run_stress_test)
-    factory.generate_tests()
+    factories.append(TestFactory(run_stress_test))
+
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -256,7 +259,9 @@ def test_axil_dp_ram(request, data_width):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
@@ -26,18 +26,20 @@ THE SOFTWARE.
 import itertools
 import logging
 import os
-import random
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiLiteBus, AxiLiteMaster, AxiLiteRam
 
+from common import patterns, runner
+from common.sweep import Sweep
+from common.traffic import TrafficGenerator
+
 
 class TB(object):
     def __init__(self, dut):
@@ -91,19 +93,26 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    addr_width = tb.axil_master.write_if.address_width
+
+    sweep = Sweep(lengths, offsets, base=0, limit=min(2**addr_width, 2**16), guard=0)
 
-            tb.axil_ram.write(addr, b'\xaa'*length)
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
 
-            await tb.axil_master.write(addr, test_data)
+        tb.axil_ram.write(addr, patterns.fill(length))
 
-            tb.log.debug("%s", tb.axil_ram.hexdump_str((addr & ~0xf), (((addr & 0xf)+length-1) & ~0xf)+64))
+        await tb.axil_master.write(addr, test_data)
 
-            assert tb.axil_ram.read(addr, length) == test_data
+        tb.log.debug("%s", tb.axil_ram.hexdump_str((addr & ~0xf), (((addr & 0xf)+length-1) & ~0xf)+64))
+
+        assert tb.axil_ram.read(addr, length) == test_data
+
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -121,17 +130,24 @@ async def run_test_read(dut, data_in=None, idle_inserter=None, backpressure_inse
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
 
-            tb.axil_ram.write(addr, test_data)
+    addr_width = tb.axil_master.write_if.address_width
 
-            data = await tb.axil_master.read(addr, length)
+    sweep = Sweep(lengths, offsets, base=0, limit=min(2**addr_width, 2**16), guard=0)
 
-            assert data.data == test_data
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
+
+        tb.axil_ram.write(addr, test_data)
+
+        data = await tb.axil_master.read(addr, length)
+
+        assert data.data == test_data
+
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -146,22 +162,6 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    async def worker(master, offset, aperture, count=16):
-        for k in range(count):
-            length = random.randint(1, min(32, aperture))
-            addr = offset+random.randint(0, aperture-length)
-            tb.log.info("worker offset 0x%x, aperture 0x%x, length %d, addr 0x%x", offset, aperture, length, addr)
-            test_data = bytearray([x % 256 for x in range(length)])
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            await master.write(addr, test_data)
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            data = await master.read(addr, length)
-            assert data.data == test_data
-
     addr_width = tb.axil_master.write_if.address_width
 
     assert addr_width >= 4
@@ -172,15 +172,14 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
 
     addr_bits = 1 << addr_width
     min_offset = 1 << min_offset_width
-    workers = []
+    traffic = TrafficGenerator(size=(1, 32), clock_period=10, log_ops=True, log=tb.log)
 
     for k in range(extra_offset_width):
         offset = min_offset * (2 ^ k)  # CAVEAT: << inside the loop leads to superfluous test failures
         aperture = min(min_offset, addr_bits - offset)
-        workers.append(cocotb.start_soon(worker(tb.axil_master, offset, aperture, count=16)))
+        traffic.add_worker(tb.axil_master, offset, aperture, count=16)
 
-    while workers:
-        await workers.pop(0).join()
+    await traffic.run()
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -190,17 +189,26 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     for test in [run_test_write, run_test_read]:
 
         factory = TestFactory(test)
         factory.add_option("idle_inserter", [None, cycle_pause])
         factory.add_option("backpressure_inserter", [None, cycle_pause])
-        factory.generate_tests()
+        factories.append(factory)
 
-    factory = TestFactory(run_stress_test)
-    factory.generate_tests()
+    factories.append(TestFactory(run_stress_test))
+
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -233,7 +241,9 @@ def test_axil_adapter(request, addr_width, data_width):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
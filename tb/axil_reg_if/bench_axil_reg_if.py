@@ -0,0 +1,201 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import functools
+import logging
+import os
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiLiteBus, AxiLiteMaster
+
+from common import runner
+from common.bench import BenchResults, TRAFFIC_MIXES, traffic_row, bench_env
+from common.reg_if import RegIfModel, RegRegion
+from common.traffic import TrafficGenerator, UniformLocality, Uniform, Exponential
+
+
+CLOCK_PERIOD = 10
+MEM_SIZE = 16384
+
+
+def profile_regions(profile):
+    """Wait-state profiles, as (default latency, default wait, regions)"""
+    if profile == "zero":
+        return 0, True, []
+    if profile == "fixed":
+        # the fixed 10 cycle wait of the functional test
+        return 10, True, []
+    if profile == "short_no_wait":
+        return Uniform(0, 6), False, []
+    if profile == "mixed":
+        return 0, True, [
+            RegRegion(0x1000, 0x1000, Uniform(1, 4), wait=False, name="status"),
+            RegRegion(0x2000, 0x1000, Exponential(8, hi=64), wait=True, name="fifo"),
+            RegRegion(0x3000, 0x1000, Uniform(16, 32), wait=False, name="slow"),
+        ]
+    raise ValueError(f"Unknown wait-state profile '{profile}'")
+
+
+PROFILES = ["zero", "fixed", "short_no_wait", "mixed"]
+
+
+class TB(object):
+    def __init__(self, dut, profile):
+        self.dut = dut
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axil_master = AxiLiteMaster(AxiLiteBus.from_prefix(dut, "s_axil"), dut.clk, dut.rst)
+
+        latency, wait, regions = profile_regions(profile)
+        self.reg_if = RegIfModel(dut, dut.clk, size=MEM_SIZE, regions=regions, latency=latency, wait=wait)
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, profile="fixed", mix="mixed", workers=4, count=64):
+
+    tb = TB(dut, profile)
+    results = BenchResults(log=tb.log)
+
+    byte_lanes = tb.axil_master.write_if.byte_lanes
+
+    await tb.cycle_reset()
+
+    # word accesses spread uniformly over the whole register space; not
+    # checked, since a timed out write leaves the memory unchanged
+    traffic = TrafficGenerator(size=byte_lanes, gap=0, read_ratio=TRAFFIC_MIXES[mix],
+        locality=functools.partial(UniformLocality, align=byte_lanes), verify=False,
+        clock_period=CLOCK_PERIOD, log=tb.log)
+    traffic.add_workers(tb.axil_master, aperture=MEM_SIZE//workers, workers=workers,
+        count=count, span=MEM_SIZE)
+
+    tb.reg_if.clear()
+
+    stats = await traffic.run()
+
+    ops = len(stats.records)
+    cycles = stats.elapsed() / CLOCK_PERIOD
+    accesses = sum(r.accesses for r in tb.reg_if.all_regions())
+    latency_cycles = sum(r.latency_cycles for r in tb.reg_if.all_regions())
+
+    row = {
+        "profile": profile,
+        "mix": mix,
+        **traffic_row(stats, CLOCK_PERIOD),
+        "ops_per_cycle": round(ops / cycles, 4),
+        "mean_wait_cycles": round(latency_cycles / accesses, 2) if accesses else None,
+        "timeouts": tb.reg_if.timeouts(),
+        "timeout_fraction": round(tb.reg_if.timeouts() / accesses, 4) if accesses else None,
+    }
+
+    for region in tb.reg_if.all_regions():
+        if region.accesses:
+            tb.log.info("region %s: %d accesses, %.2f mean latency, %d timeouts", region.name,
+                region.accesses, region.latency_cycles / region.accesses, region.timeouts)
+
+    results.add(**row)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("profile", PROFILES)
+    factory.add_option("mix", list(TRAFFIC_MIXES))
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("timeout", [2, 4, 8, 16, 32])
+def test_axil_reg_if_bench(request, timeout):
+    dut = "axil_reg_if"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = dut
+
+    verilog_sources = [
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    parameters['DATA_WIDTH'] = 32
+    parameters['ADDR_WIDTH'] = 16
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+    parameters['TIMEOUT'] = timeout
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, timeout=timeout))
+
+    extra_env['COCOTB_RESOLVE_X'] = 'RANDOM'
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
@@ -24,20 +24,22 @@ THE SOFTWARE.
 
 import itertools
 import logging
-import mmap
 import os
-import random
 
-import cocotb_test.simulator
 import pytest
 
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, Timer
+from cocotb.triggers import RisingEdge
 from cocotb.regression import TestFactory
 
 from cocotbext.axi import AxiLiteBus, AxiLiteMaster
 
+from common import patterns, runner
+from common.reg_if import RegIfModel
+from common.sweep import Sweep
+from common.traffic import TrafficGenerator
+
 
 class TB(object):
     def __init__(self, dut):
@@ -50,16 +52,8 @@ class TB(object):
 
         self.axil_master = AxiLiteMaster(AxiLiteBus.from_prefix(dut, "s_axil"), dut.clk, dut.rst)
 
-        dut.reg_wr_wait.setimmediatevalue(0)
-        dut.reg_wr_ack.setimmediatevalue(0)
-        dut.reg_rd_data.setimmediatevalue(0)
-        dut.reg_rd_wait.setimmediatevalue(0)
-        dut.reg_rd_ack.setimmediatevalue(0)
-
-        self.mem = mmap.mmap(-1, 16384)
-
-        cocotb.start_soon(self.run_reg_read())
-        cocotb.start_soon(self.run_reg_write())
+        self.reg_if = RegIfModel(dut, dut.clk, size=16384, latency=10)
+        self.mem = self.reg_if.mem
 
     def set_idle_generator(self, generator=None):
         if generator:
@@ -83,71 +77,11 @@ class TB(object):
         await RisingEdge(self.dut.clk)
         await RisingEdge(self.dut.clk)
 
-    async def run_reg_read(self):
-        byte_lanes = len(self.dut.reg_wr_strb)
-
-        while True:
-            self.dut.reg_rd_data.value = 0
-            self.dut.reg_rd_wait.value = 0
-            self.dut.reg_rd_ack.value = 0
-            await RisingEdge(self.dut.clk)
-
-            addr = (self.dut.reg_rd_addr.value.integer // byte_lanes) * byte_lanes
-
-            if self.dut.reg_rd_en.value.integer and addr < len(self.mem):
-                self.dut.reg_rd_wait.value = 1
-
-                for k in range(10):
-                    await RisingEdge(self.dut.clk)
-
-                self.mem.seek(addr)
-
-                data = self.mem.read(byte_lanes)
-
-                self.dut.reg_rd_data.value = int.from_bytes(data, 'little')
-                self.dut.reg_rd_wait.value = 0
-                self.dut.reg_rd_ack.value = 1
-                await RisingEdge(self.dut.clk)
-
-    async def run_reg_write(self):
-        byte_lanes = len(self.dut.reg_wr_strb)
-
-        while True:
-            self.dut.reg_wr_wait.value = 0
-            self.dut.reg_wr_ack.value = 0
-            await RisingEdge(self.dut.clk)
-
-            addr = (self.dut.reg_wr_addr.value.integer // byte_lanes) * byte_lanes
-            data = self.dut.reg_wr_data.value.integer
-            strb = self.dut.reg_wr_strb.value.integer
-
-            if self.dut.reg_wr_en.value.integer and addr < len(self.mem):
-                self.dut.reg_wr_wait.value = 1
-
-                for k in range(10):
-                    await RisingEdge(self.dut.clk)
-
-                self.mem.seek(addr)
-
-                data = data.to_bytes(byte_lanes, 'little')
-
-                for i in range(byte_lanes):
-                    if strb & (1 << i):
-                        self.mem.write(data[i:i+1])
-                    else:
-                        self.mem.seek(1, 1)
-
-                self.dut.reg_wr_wait.value = 0
-                self.dut.reg_wr_ack.value = 1
-                await RisingEdge(self.dut.clk)
-
     def mem_read(self, address, length):
-        self.mem.seek(address)
-        return self.mem.read(length)
+        return self.reg_if.mem_read(address, length)
 
     def mem_write(self, address, data):
-        self.mem.seek(address)
-        self.mem.write(bytes(data))
+        self.reg_if.mem_write(address, data)
 
 
 async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_inserter=None):
@@ -161,21 +95,24 @@ async def run_test_write(dut, data_in=None, idle_inserter=None, backpressure_ins
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset+0x100
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    sweep = Sweep(lengths, offsets, base=0x100, limit=len(tb.mem))
 
-            tb.mem_write(addr-128, b'\xaa'*(length+256))
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
 
-            await tb.axil_master.write(addr, test_data)
+        tb.mem_write(addr-128, patterns.fill(length+256))
 
-            tb.log.debug("%s", tb.mem_read((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
+        await tb.axil_master.write(addr, test_data)
 
-            assert tb.mem_read(addr, length) == test_data
-            assert tb.mem_read(addr-1, 1) == b'\xaa'
-            assert tb.mem_read(addr+length, 1) == b'\xaa'
+        tb.log.debug("%s", tb.mem_read((addr & ~0xf)-16, (((addr & 0xf)+length-1) & ~0xf)+48))
+
+        assert patterns.verify(tb.mem, addr, test_data, guard=1)
+
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -192,17 +129,22 @@ async def run_test_read(dut, data_in=None, idle_inserter=None, backpressure_inse
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    for length in range(1, byte_lanes*2):
-        for offset in range(byte_lanes):
-            tb.log.info("length %d, offset %d", length, offset)
-            addr = offset+0x100
-            test_data = bytearray([x % 256 for x in range(length)])
+    lengths = range(1, byte_lanes*2)
+    offsets = range(byte_lanes)
+
+    sweep = Sweep(lengths, offsets, base=0x100, limit=len(tb.mem))
+
+    async def run_case(length, offset, addr):
+        tb.log.info("length %d, offset %d", length, offset)
+        test_data = patterns.incrementing(length)
+
+        tb.mem_write(addr, test_data)
 
-            tb.mem_write(addr, test_data)
+        data = await tb.axil_master.read(addr, length)
 
-            data = await tb.axil_master.read(addr, length)
+        assert data.data == test_data
 
-            assert data.data == test_data
+    await sweep.run(run_case)
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -217,28 +159,10 @@ async def run_stress_test(dut, idle_inserter=None, backpressure_inserter=None):
     tb.set_idle_generator(idle_inserter)
     tb.set_backpressure_generator(backpressure_inserter)
 
-    async def worker(master, offset, aperture, count=16):
-        for k in range(count):
-            length = random.randint(1, min(32, aperture))
-            addr = offset+random.randint(0, aperture-length)
-            test_data = bytearray([x % 256 for x in range(length)])
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            await master.write(addr, test_data)
-
-            await Timer(random.randint(1, 100), 'ns')
-
-            data = await master.read(addr, length)
-            assert data.data == test_data
-
-    workers = []
+    traffic = TrafficGenerator(size=(1, 32), clock_period=10, log=tb.log)
+    traffic.add_workers(tb.axil_master, aperture=0x100, workers=16, count=16, span=len(tb.mem))
 
-    for k in range(16):
-        workers.append(cocotb.start_soon(worker(tb.axil_master, k*0x100, 0x100, count=16)))
-
-    while workers:
-        await workers.pop(0).join()
+    await traffic.run()
 
     await RisingEdge(dut.clk)
     await RisingEdge(dut.clk)
@@ -248,17 +172,26 @@ def cycle_pause():
     return itertools.cycle([1, 1, 1, 0])
 
 
-if cocotb.SIM_NAME:
+def build_factories():
+
+    factories = []
 
     for test in [run_test_write, run_test_read]:
 
         factory = TestFactory(test)
         factory.add_option("idle_inserter", [None, cycle_pause])
         factory.add_option("backpressure_inserter", [None, cycle_pause])
-        factory.generate_tests()
+        factories.append(factory)
+
+    factories.append(TestFactory(run_stress_test))
 
-    factory = TestFactory(run_stress_test)
-    factory.generate_tests()
+    return factories
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
 
 
 # cocotb-test
@@ -293,7 +226,9 @@ def test_axil_reg_if(request, data_width):
     sim_build = os.path.join(tests_dir, "sim_build",
         request.node.name.replace('[', '-').replace(']', ''))
 
-    cocotb_test.simulator.run(
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
         python_search=[tests_dir],
         verilog_sources=verilog_sources,
         toplevel=toplevel,
@@ -0,0 +1,223 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import functools
+import logging
+import os
+import random
+import subprocess
+
+import pytest
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge
+from cocotb.regression import TestFactory
+
+from cocotbext.axi import AxiLiteBus, AxiLiteMaster, AxiLiteRam
+
+from common import runner
+from common.bench import BenchResults, TRAFFIC_MIXES, latency_columns, traffic_row, bench_env
+from common.latency import add_latency
+from common.traffic import TrafficGenerator, UniformLocality, Fixed, Uniform, Exponential, percentile
+
+
+CLOCK_PERIOD = 10
+
+
+class SampledLatency:
+    """Latency distribution that keeps every value it returns"""
+    def __init__(self, dist, samples):
+        self.dist = dist
+        self.samples = samples
+
+    def sample(self, rng):
+        v = self.dist.sample(rng)
+        self.samples.append(v)
+        return v
+
+
+def slave_latency(skew, k, m_count):
+    """Access latency of slave k for each skew profile"""
+    if skew == "equal":
+        return Fixed(4)
+    if skew == "one_slow":
+        return Fixed(32 if k == m_count-1 else 4)
+    if skew == "linear":
+        return Fixed(4 + 28*k // (m_count-1))
+    if skew == "jitter":
+        return Uniform(2, 16)
+    if skew == "heavy_tail":
+        return Exponential(4, hi=128)
+    raise ValueError(f"Unknown latency skew '{skew}'")
+
+
+SKEWS = ["equal", "one_slow", "linear", "jitter", "heavy_tail"]
+
+
+class TB(object):
+    def __init__(self, dut):
+        self.dut = dut
+
+        self.m_count = len(dut.axil_simd_inst.m_axil_awvalid)
+
+        self.log = logging.getLogger("cocotb.tb")
+        self.log.setLevel(logging.INFO)
+
+        cocotb.start_soon(Clock(dut.clk, CLOCK_PERIOD, units="ns").start())
+
+        self.axil_master = AxiLiteMaster(AxiLiteBus.from_prefix(dut, "s_axil"), dut.clk, dut.rst)
+        self.axil_ram = [
+            AxiLiteRam(AxiLiteBus.from_prefix(dut, f"m{k:02d}_axil"), dut.clk, dut.rst, size=2**16) for k in range(self.m_count)
+        ]
+
+        self.slave_samples = []
+
+    def set_skew(self, skew):
+        for k, ram in enumerate(self.axil_ram):
+            latency = SampledLatency(slave_latency(skew, k, self.m_count), self.slave_samples)
+            add_latency(ram.read_if.ar_channel, latency, CLOCK_PERIOD, rng=random.Random(2*k))
+            add_latency(ram.write_if.aw_channel, latency, CLOCK_PERIOD, rng=random.Random(2*k+1))
+
+    async def cycle_reset(self):
+        self.dut.rst.setimmediatevalue(0)
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 1
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+        self.dut.rst.value = 0
+        await RisingEdge(self.dut.clk)
+        await RisingEdge(self.dut.clk)
+
+
+async def run_bench(dut, skew="equal", mix="mixed", workers=2, count=64):
+
+    tb = TB(dut)
+    results = BenchResults(log=tb.log)
+
+    tb.set_skew(skew)
+
+    byte_lanes = tb.axil_master.write_if.byte_lanes
+
+    await tb.cycle_reset()
+
+    # word accesses spread uniformly over the slave address space, each
+    # broadcast to all m_count slaves
+    traffic = TrafficGenerator(size=byte_lanes, gap=0, read_ratio=TRAFFIC_MIXES[mix],
+        locality=functools.partial(UniformLocality, align=byte_lanes),
+        clock_period=CLOCK_PERIOD, log=tb.log)
+    traffic.add_workers(tb.axil_master, aperture=2**16//workers, workers=workers,
+        count=count, span=2**16)
+
+    tb.slave_samples.clear()
+
+    stats = await traffic.run()
+
+    lat = [v / CLOCK_PERIOD for v in stats.latencies()]
+    slave_lat = sorted(tb.slave_samples)
+
+    row = {"skew": skew, "mix": mix, **traffic_row(stats, CLOCK_PERIOD)}
+    row["tx_per_cycle"] = round(row["ops"] / row["cycles"], 4) if row["cycles"] else None
+    # completion waits for the slowest of m_count slaves: completion over
+    # single slave access latency at the same percentile, both in cycles
+    for p in [50, 99]:
+        s_p = percentile(slave_lat, p)
+        row[f"amplification_p{p}"] = round(percentile(lat, p) / s_p, 2) if s_p else None
+    row.update(latency_columns("slave_lat", slave_lat))
+    row.update(latency_columns("lat", lat))
+
+    results.add(**row)
+
+    await RisingEdge(dut.clk)
+    await RisingEdge(dut.clk)
+
+
+def build_factories():
+
+    factory = TestFactory(run_bench)
+    factory.add_option("skew", SKEWS)
+    factory.add_option("mix", list(TRAFFIC_MIXES))
+
+    return [factory]
+
+
+if cocotb.SIM_NAME:
+
+    for factory in build_factories():
+        factory.generate_tests()
+
+
+# cocotb-test
+
+tests_dir = os.path.abspath(os.path.dirname(__file__))
+rtl_dir = os.path.abspath(os.path.join(tests_dir, '..', '..', 'rtl'))
+
+
+@pytest.mark.bench
+@pytest.mark.parametrize("m_count", [2, 4, 8, 16, 32, 48, 64])
+def test_axil_simd_bench(request, m_count):
+    dut = "axil_simd"
+    wrapper = f"{dut}_wrap_{m_count}"
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    toplevel = wrapper
+
+    # generate wrapper
+    wrapper_file = os.path.join(tests_dir, f"{wrapper}.v")
+    if not os.path.exists(wrapper_file):
+        subprocess.Popen(
+            [os.path.join(rtl_dir, f"{dut}_wrap.py"), "-p", f"{m_count}"],
+            cwd=tests_dir
+        ).wait()
+
+    verilog_sources = [
+        wrapper_file,
+        os.path.join(rtl_dir, f"{dut}.v"),
+        os.path.join(rtl_dir, f"{dut}_rd.v"),
+        os.path.join(rtl_dir, f"{dut}_wr.v"),
+    ]
+
+    parameters = {}
+
+    parameters['ADDR_WIDTH'] = 16
+    parameters['DATA_WIDTH'] = 32
+    parameters['STRB_WIDTH'] = parameters['DATA_WIDTH'] // 8
+
+    extra_env = {f'PARAM_{k}': str(v) for k, v in parameters.items()}
+    extra_env.update(bench_env(request, dut, m_count=m_count))
+
+    sim_build = os.path.join(tests_dir, "sim_build",
+        request.node.name.replace('[', '-').replace(']', ''))
+
+    runner.run(
+        request,
+        testcases=runner.factory_test_names(build_factories()),
+        python_search=[tests_dir],
+        verilog_sources=verilog_sources,
+        toplevel=toplevel,
+        module=module,
+        parameters=parameters,
+        sim_build=sim_build,
+        extra_env=extra_env,
+    )
@@ -0,0 +1,202 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import random
+
+from cocotb.triggers import FallingEdge, RisingEdge, ReadOnly
+
+from common.bench import jain_index, latency_columns
+
+
+class ArbiterModel:
+    """
+    Cycle-accurate reference model of rtl/arbiter.v
+
+    step() takes the request and acknowledge vectors sampled at a clock
+    edge and returns the registered (grant, grant_valid, grant_encoded)
+    outputs after that edge.
+    """
+    def __init__(self, ports=4, round_robin=False, block=False, block_ack=True, lsb_high_priority=False):
+        self.ports = ports
+        self.round_robin = round_robin
+        self.block = block
+        self.block_ack = block_ack
+        self.lsb_high_priority = lsb_high_priority
+
+        self.all_ports = (1 << ports) - 1
+        self.reset()
+
+    def reset(self):
+        self.grant = 0
+        self.grant_valid = 0
+        self.grant_encoded = 0
+        self.mask = 0
+
+    def priority(self, request):
+        """Index of the highest priority bit set in request, or None"""
+        if not request:
+            return None
+        if self.lsb_high_priority:
+            return (request & -request).bit_length() - 1
+        return request.bit_length() - 1
+
+    def step(self, request, acknowledge):
+        request &= self.all_ports
+
+        if self.block and not self.block_ack and self.grant & request:
+            # granted request still asserted; hold it
+            pass
+        elif self.block and self.block_ack and self.grant_valid and not self.grant & acknowledge:
+            # granted request not yet acknowledged; hold it
+            pass
+        else:
+            index = self.priority(request)
+
+            if index is None:
+                self.grant, self.grant_valid, self.grant_encoded = 0, 0, 0
+            else:
+                if self.round_robin:
+                    masked = self.priority(request & self.mask)
+                    if masked is not None:
+                        index = masked
+                    if self.lsb_high_priority:
+                        self.mask = (self.all_ports << (index + 1)) & self.all_ports
+                    else:
+                        self.mask = self.all_ports >> (self.ports - index)
+
+                self.grant, self.grant_valid, self.grant_encoded = 1 << index, 1, index
+
+        return self.grant, self.grant_valid, self.grant_encoded
+
+
+class ArbiterClients:
+    """
+    Randomized requesters for an arbiter instance, checked against ArbiterModel
+
+    Each idle port raises its request with probability load per cycle and
+    keeps it asserted until granted.  A granted port holds the resource for
+    a random number of cycles up to max_hold (acknowledging on the last one
+    when the arbiter blocks on acknowledge), then drops its request.
+    Without blocking, a port is served by a single grant.
+
+    Every cycle the grant outputs are compared with the model, and the
+    grant latency (cycles from request to grant) is recorded per port.
+    """
+    def __init__(self, dut, model, load=0.5, max_hold=4, seed=0):
+        self.dut = dut
+        self.model = model
+        self.load = load
+        self.max_hold = max_hold
+        self.rng = random.Random(seed)
+
+        self.ports = model.ports
+
+        self.cycles = 0
+        self.mismatches = []
+        self.grants = [0]*self.ports
+        self.latencies = [[] for k in range(self.ports)]
+
+        self.request = 0
+        self.wait_start = [None]*self.ports
+        self.hold = [0]*self.ports
+
+        dut.request.setimmediatevalue(0)
+        dut.acknowledge.setimmediatevalue(0)
+
+    async def run(self, cycles):
+        for k in range(cycles):
+            await FallingEdge(self.dut.clk)
+
+            acknowledge = 0
+
+            for p in range(self.ports):
+                bit = 1 << p
+                if self.hold[p]:
+                    self.hold[p] -= 1
+                    if not self.hold[p]:
+                        # release
+                        if self.model.block and self.model.block_ack:
+                            acknowledge |= bit
+                        self.request &= ~bit
+                elif not self.request & bit and self.rng.random() < self.load:
+                    self.request |= bit
+                    self.wait_start[p] = self.cycles
+
+            self.dut.request.value = self.request
+            self.dut.acknowledge.value = acknowledge
+
+            await RisingEdge(self.dut.clk)
+            await ReadOnly()
+
+            expected = self.model.step(self.request, acknowledge)
+            actual = (self.dut.grant.value.integer, self.dut.grant_valid.value.integer,
+                self.dut.grant_encoded.value.integer)
+
+            if actual != expected:
+                self.mismatches.append((self.cycles, self.request, acknowledge, expected, actual))
+
+            self.cycles += 1
+
+            grant, grant_valid, index = expected
+            if grant_valid and self.wait_start[index] is not None:
+                self.grants[index] += 1
+                self.latencies[index].append(self.cycles - self.wait_start[index])
+                self.wait_start[index] = None
+
+                if self.model.block:
+                    self.hold[index] = self.rng.randint(1, self.max_hold)
+                else:
+                    # served; drop the request before the next edge
+                    self.hold[index] = 1
+
+        await FallingEdge(self.dut.clk)
+        self.dut.request.value = 0
+        self.dut.acknowledge.value = 0
+
+    def starvation_bound(self):
+        """Longest grant latency seen on any port, in cycles"""
+        return max((max(lat) for lat in self.latencies if lat), default=None)
+
+    def pending(self):
+        """Longest current wait of a request that was never granted"""
+        waits = [self.cycles - start for start in self.wait_start if start is not None]
+        return max(waits, default=0)
+
+    def row(self):
+        latencies = sorted(v for lat in self.latencies for v in lat)
+
+        row = {
+            "cycles": self.cycles,
+            "grants": sum(self.grants),
+            "grants_per_cycle": round(sum(self.grants) / self.cycles, 4) if self.cycles else None,
+            "mismatches": len(self.mismatches),
+            "starvation_bound": self.starvation_bound(),
+            "max_pending": self.pending(),
+            "fairness": round(jain_index(self.grants), 4) if any(self.grants) else None,
+        }
+        row.update(latency_columns("grant_lat", latencies))
+        row["min_port_grants"] = min(self.grants)
+        row["max_port_grants"] = max(self.grants)
+
+        return row
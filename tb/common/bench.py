@@ -0,0 +1,307 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import csv
+import fcntl
+import json
+import logging
+import os
+import random
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+from common.traffic import percentile
+
+
+# traffic routing patterns for multi-port DUTs, as lists of destination
+# ports for each source port
+
+def route_hotspot(s, s_count, m_count):
+    """All sources to port 0"""
+    return [0]
+
+
+def route_permutation(s, s_count, m_count):
+    """Each source to a different port (while there are enough ports)"""
+    return [(s+1) % m_count]
+
+
+def route_uniform(s, s_count, m_count):
+    """Each operation to a uniformly chosen port"""
+    return list(range(m_count))
+
+
+ROUTING_PATTERNS = {
+    "hotspot": route_hotspot,
+    "permutation": route_permutation,
+    "uniform": route_uniform,
+}
+
+# read probability for each traffic mix
+TRAFFIC_MIXES = {
+    "read": 1.0,
+    "write": 0.0,
+    "mixed": 0.5,
+}
+
+
+def jain_index(values):
+    """Jain's fairness index, 1.0 when all values are equal, 1/n when one takes everything"""
+    values = list(values)
+    if not values or not any(values):
+        return None
+    return sum(values)**2 / (len(values) * sum(v*v for v in values))
+
+
+def latency_columns(prefix, latencies, scale=1):
+    """Percentile columns for a sorted list of latencies, divided by scale"""
+    row = {}
+    for p in [50, 90, 99, 100]:
+        v = percentile(latencies, p)
+        row[f"{prefix}_p{p}" if p < 100 else f"{prefix}_max"] = None if v is None else round(v/scale, 2)
+    return row
+
+
+def traffic_row(stats, clock_period, groups=None):
+    """
+    Benchmark columns for a TrafficStats run
+
+    Bandwidth is in bytes per clock cycle over the whole run, latencies are
+    in cycles.  groups maps worker index to the port the worker drives;
+    when given, fairness is Jain's index over the bytes moved per port.
+    """
+    elapsed = stats.elapsed()
+    cycles = elapsed / clock_period if clock_period else 0
+
+    row = {
+        "ops": len(stats.records),
+        "cycles": round(cycles),
+        "bytes_per_cycle": round(stats.bytes() / cycles, 4) if cycles else 0,
+        "read_bytes_per_cycle": round(stats.bytes("read") / cycles, 4) if cycles else 0,
+        "write_bytes_per_cycle": round(stats.bytes("write") / cycles, 4) if cycles else 0,
+    }
+
+    if groups is not None:
+        per_group = {g: 0 for g in set(groups.values())}
+        for kind, length, start, end, worker in stats.records:
+            per_group[groups[worker]] += length
+        fairness = jain_index(per_group.values())
+        row["fairness"] = None if fairness is None else round(fairness, 4)
+
+    row.update(latency_columns("read_lat", stats.latencies("read"), clock_period))
+    row.update(latency_columns("write_lat", stats.latencies("write"), clock_period))
+
+    return row
+
+
+class HandshakeCounter:
+    """
+    Counts valid/ready handshakes on one channel, cycle by cycle
+
+    Records the first and last cycle of each frame (delimited by last, or
+    one frame per beat without it), so that throughput and the idle gaps
+    between frames can be computed after the run.
+    """
+    def __init__(self, clock, valid, ready=None, last=None, record=False):
+        self.clock = clock
+        self.valid = valid
+        self.ready = ready
+        self.last = last
+        self.record = record
+
+        self.cycle = 0
+        self.beats = 0
+        self.valid_cycles = 0
+        self.frames = []
+        self.beat_cycles = []
+
+        self._run_cr = cocotb.start_soon(self._run())
+
+    def clear(self):
+        self.beats = 0
+        self.valid_cycles = 0
+        self.frames = []
+        self.beat_cycles = []
+
+    def accept_rate(self):
+        """Fraction of cycles with valid asserted in which the beat was accepted"""
+        return self.beats / self.valid_cycles if self.valid_cycles else None
+
+    def gaps(self):
+        """Idle cycles between the end of each frame and the start of the next"""
+        return [b[0]-a[1]-1 for a, b in zip(self.frames, self.frames[1:])]
+
+    def span(self):
+        """Cycles from the first beat to the last beat, inclusive"""
+        if not self.frames:
+            return 0
+        return self.frames[-1][1] - self.frames[0][0] + 1
+
+    def bubbles(self):
+        """Cycles without a beat between the first and the last beat"""
+        return self.span() - self.beats if self.frames else 0
+
+    def stop(self):
+        self._run_cr.kill()
+
+    async def _run(self):
+        start = None
+        while True:
+            await RisingEdge(self.clock)
+            self.cycle += 1
+
+            if not self.valid.value.is_resolvable or not int(self.valid.value):
+                continue
+            self.valid_cycles += 1
+            if self.ready is not None and (not self.ready.value.is_resolvable or not int(self.ready.value)):
+                continue
+
+            self.beats += 1
+            if self.record:
+                self.beat_cycles.append(self.cycle)
+            if start is None:
+                start = self.cycle
+            if self.last is None or int(self.last.value):
+                self.frames.append((start, self.cycle))
+                start = None
+
+
+class ChannelProbe:
+    """
+    Throughput and latency of one valid/ready channel through a pipeline stage
+
+    Beats are assumed to leave the stage in the order they entered it, so
+    the latency of each beat is the number of cycles between its input and
+    output handshakes.  accept_rate is the fraction of cycles with valid
+    asserted at the input in which the stage accepted the beat; a stage
+    that sustains one beat per cycle has an accept rate of 1 when its
+    output is never stalled.
+    """
+    def __init__(self, clock, in_valid, in_ready, out_valid, out_ready):
+        self.input = HandshakeCounter(clock, in_valid, in_ready, record=True)
+        self.output = HandshakeCounter(clock, out_valid, out_ready, record=True)
+
+    def clear(self):
+        self.input.clear()
+        self.output.clear()
+
+    def latencies(self):
+        return sorted(b-a for a, b in zip(self.input.beat_cycles, self.output.beat_cycles))
+
+    def row(self):
+        cycles = self.input.span()
+        accept_rate = self.input.accept_rate()
+        row = {
+            "beats": self.input.beats,
+            "beats_per_cycle": round(self.input.beats / cycles, 4) if cycles else None,
+            "accept_rate": None if accept_rate is None else round(accept_rate, 4),
+        }
+        row.update(latency_columns("lat", self.latencies()))
+        return row
+
+
+def random_pause(probability, seed=0):
+    """
+    Pause generator factory, pausing each cycle with the given probability
+
+    Each generator created by the factory has its own seeded stream, so
+    channels do not pause in lockstep.
+    """
+    seeds = random.Random(seed)
+
+    def generator():
+        rng = random.Random(seeds.getrandbits(64))
+        while True:
+            yield rng.random() < probability
+    return generator
+
+
+# results
+
+def get_context():
+    """Configuration columns passed from the pytest side in BENCH_CONTEXT"""
+    return json.loads(os.getenv("BENCH_CONTEXT", "{}"))
+
+
+class BenchResults:
+    """
+    Appends benchmark rows to a CSV file
+
+    Rows are prefixed with the configuration columns from BENCH_CONTEXT and
+    written to BENCH_CSV (if set).  Several simulator processes may append
+    to the same file concurrently, so the file is locked for each row and
+    the header is only written to an empty file.  Appending rows with other
+    columns than the existing header, for example after columns were added
+    to a benchmark, raises ValueError rather than dropping them.
+    """
+    def __init__(self, path=None, context=None, log=None):
+        self.path = path or os.getenv("BENCH_CSV")
+        self.context = get_context() if context is None else context
+        self.log = log or logging.getLogger("cocotb.tb")
+        self.rows = []
+
+    def add(self, **columns):
+        row = dict(self.context)
+        row.update(columns)
+        self.rows.append(row)
+
+        self.log.info("Result: %s", ", ".join(f"{k}={v}" for k, v in row.items()))
+
+        if not self.path:
+            return row
+
+        with open(self.path, 'a+', newline='') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                header = next(csv.reader(f), None)
+                if header is None:
+                    header = list(row)
+                    csv.writer(f).writerow(header)
+                elif set(header) != set(row):
+                    raise ValueError(f"Columns of {self.path} do not match the results "
+                        f"(new {sorted(set(row)-set(header))}, missing {sorted(set(header)-set(row))}), "
+                        "remove the file or use another --bench-dir")
+                csv.DictWriter(f, header).writerow(row)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+        return row
+
+
+def bench_env(request, name, **context):
+    """
+    Environment for a benchmark simulation run from pytest
+
+    Results go to <bench dir>/<name>.csv, with the configuration given as
+    keyword arguments prepended to each row.
+    """
+    bench_dir = os.path.abspath(request.config.getoption("bench_dir"))
+    os.makedirs(bench_dir, exist_ok=True)
+
+    return {
+        "BENCH_CSV": os.path.join(bench_dir, f"{name}.csv"),
+        "BENCH_CONTEXT": json.dumps(context),
+    }
@@ -0,0 +1,460 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import argparse
+import csv
+import itertools
+import random
+import sys
+
+from common.bench import ROUTING_PATTERNS, TRAFFIC_MIXES, traffic_row
+from common.tlm import Kernel, Condition, Mutex, RoundRobinArbiter, Timeout
+from common.traffic import TrafficStats
+
+
+# (latency, cycles per transfer) of axi_register_rd/wr channels for each REG_TYPE:
+# bypass, simple register (bubble cycles), skid buffer
+REG_TIMING = {0: (0, 1), 1: (1, 2), 2: (1, 1)}
+
+# axi_crossbar_wrap defaults
+DEFAULTS = {
+    "THREADS": 2,
+    "ACCEPT": 16,
+    "ISSUE": 4,
+    "ADDR_WIDTH": 24,
+    "S_REG_TYPE": {"AW": 0, "W": 0, "B": 1, "AR": 0, "R": 2},
+    "M_REG_TYPE": {"AW": 1, "W": 2, "B": 0, "AR": 1, "R": 0},
+}
+
+
+def calc_base_addrs(addr_widths, addr_width=32):
+    """Base addresses assigned by axi_crossbar_addr when M_BASE_ADDR is 0"""
+    bases = []
+    base = 0
+    for width in addr_widths:
+        if width:
+            size = 1 << width
+            mask = size - 1
+            if base & mask:
+                base = base + size - (base & mask)
+            bases.append(base)
+            base += size
+        else:
+            bases.append(0)
+    return bases
+
+
+class CrossbarConfig:
+    """
+    axi_crossbar configuration, from the parameters of axi_crossbar_wrap
+
+    params uses the per-port names of the wrapper (S00_THREADS, M01_ISSUE,
+    M00_BASE_ADDR, S02_R_REG_TYPE, ...); missing entries take the wrapper
+    defaults.  Only one region per master port is modelled.
+    """
+    def __init__(self, params):
+        self.s_count = int(params.get("S_COUNT", 4))
+        self.m_count = int(params.get("M_COUNT", 4))
+        self.data_width = int(params.get("DATA_WIDTH", 32))
+        self.addr_width = int(params.get("ADDR_WIDTH", 32))
+        self.id_width = int(params.get("S_ID_WIDTH", 8))
+        self.byte_lanes = self.data_width // 8
+
+        def s_param(k, name):
+            return int(params.get(f"S{k:02d}_{name}", DEFAULTS[name]))
+
+        def m_param(k, name):
+            return int(params.get(f"M{k:02d}_{name}", DEFAULTS[name]))
+
+        threads = [s_param(k, "THREADS") for k in range(self.s_count)]
+        self.s_accept = [s_param(k, "ACCEPT") for k in range(self.s_count)]
+        self.s_threads = [min(t, a) for t, a in zip(threads, self.s_accept)]
+        self.m_issue = [m_param(k, "ISSUE") for k in range(self.m_count)]
+
+        self.m_addr_width = [m_param(k, "ADDR_WIDTH") for k in range(self.m_count)]
+        base = [int(params.get(f"M{k:02d}_BASE_ADDR", 0)) for k in range(self.m_count)]
+        if not any(base):
+            base = calc_base_addrs(self.m_addr_width, self.addr_width)
+        self.m_base_addr = base
+
+        self.s_reg = [{ch: int(params.get(f"S{k:02d}_{ch}_REG_TYPE", v))
+            for ch, v in DEFAULTS["S_REG_TYPE"].items()} for k in range(self.s_count)]
+        self.m_reg = [{ch: int(params.get(f"M{k:02d}_{ch}_REG_TYPE", v))
+            for ch, v in DEFAULTS["M_REG_TYPE"].items()} for k in range(self.m_count)]
+
+    def decode(self, addr):
+        """Index of the master port addr maps to, or None (decode error)"""
+        for m in range(self.m_count):
+            width = self.m_addr_width[m]
+            if width and addr >> width == self.m_base_addr[m] >> width:
+                return m
+        return None
+
+    def latency(self, s, m, ch):
+        return REG_TIMING[self.s_reg[s][ch]][0] + REG_TIMING[self.m_reg[m][ch]][0]
+
+    def interval(self, s, m, ch):
+        return max(REG_TIMING[self.s_reg[s][ch]][1], REG_TIMING[self.m_reg[m][ch]][1])
+
+
+class AddrPort:
+    """S_THREADS/S_ACCEPT admission of one axi_crossbar_addr instance"""
+    def __init__(self, kernel, threads, accept):
+        self.accept = accept
+        self.count = 0
+        self.threads = [[None, None, 0] for k in range(threads)]
+        self.lock = Mutex(kernel)
+        self.cond = Condition(kernel)
+        self.stall_cycles = 0
+
+    def can_admit(self, tid, m):
+        if self.count >= self.accept:
+            return False
+        match = [t for t in self.threads if t[2] and t[0] == tid]
+        if match:
+            # same ID must go to the same destination
+            return match[0][1] == m
+        return any(not t[2] for t in self.threads)
+
+    def admit(self, tid, m):
+        for t in self.threads:
+            if t[2] and t[0] == tid:
+                break
+        else:
+            t = next(t for t in self.threads if not t[2])
+            t[0], t[1] = tid, m
+        t[2] += 1
+        self.count += 1
+
+    def complete(self, tid):
+        for t in self.threads:
+            if t[2] and t[0] == tid:
+                t[2] -= 1
+                break
+        self.count -= 1
+        self.cond.notify()
+
+
+class MasterPort:
+    """Output port of one direction: address arbiter, M_ISSUE limit, slave model"""
+    def __init__(self, kernel, s_count, issue):
+        self.issue = issue
+        self.outstanding = 0
+        self.w_busy = False
+        self.arb = RoundRobinArbiter(kernel, s_count, self.available)
+        self.slave = Mutex(kernel)
+
+    def available(self):
+        return self.outstanding < self.issue and not self.w_busy
+
+    def complete(self):
+        self.outstanding -= 1
+        self.arb.kick()
+
+
+class AxiCrossbarModel:
+    """
+    Event-driven transaction-level model of axi_crossbar
+
+    Models, per transaction: address decode from M_BASE_ADDR/M_ADDR_WIDTH,
+    the serial address path of each slave port (about four cycles per
+    address, as axi_crossbar_addr), S_THREADS/S_ACCEPT admission, M_ISSUE
+    limits, registered round robin arbitration of addresses at each master
+    port and of R and B responses at each slave port, W bursts holding the
+    write path of both ports, and register slice latency and bubble cycles
+    per channel.  Slaves are in-order memories with slave_read_latency
+    cycles from AR to the first R beat and slave_write_latency cycles from
+    the last W beat to B.  Decode errors are not modelled (the address is
+    dropped after the address phase).
+
+    Times are in clock cycles.  read() and write() are generators for use
+    as (part of) a Kernel process; run_workload() replays per-master lists
+    of operations with a number of concurrent workers per master.
+    """
+    def __init__(self, params, slave_read_latency=2, slave_write_latency=2, kernel=None):
+        self.config = params if isinstance(params, CrossbarConfig) else CrossbarConfig(params)
+        self.kernel = kernel or Kernel()
+        self.slave_read_latency = slave_read_latency
+        self.slave_write_latency = slave_write_latency
+
+        cfg = self.config
+        k = self.kernel
+
+        self.s_rd = [AddrPort(k, cfg.s_threads[s], cfg.s_accept[s]) for s in range(cfg.s_count)]
+        self.s_wr = [AddrPort(k, cfg.s_threads[s], cfg.s_accept[s]) for s in range(cfg.s_count)]
+        self.s_w_busy = [False]*cfg.s_count
+        self.s_r_arb = [RoundRobinArbiter(k, cfg.m_count) for s in range(cfg.s_count)]
+        self.s_b_arb = [RoundRobinArbiter(k, cfg.m_count) for s in range(cfg.s_count)]
+
+        self.m_rd = [MasterPort(k, cfg.s_count, cfg.m_issue[m]) for m in range(cfg.m_count)]
+        self.m_wr = [MasterPort(k, cfg.s_count, cfg.m_issue[m]) for m in range(cfg.m_count)]
+
+        self.beats = [0]*cfg.m_count
+
+    def _admit(self, port, tid, m):
+        start = self.kernel.now
+        yield from port.cond.wait_for(lambda: port.can_admit(tid, m))
+        port.stall_cycles += self.kernel.now - start
+        port.admit(tid, m)
+
+    def read(self, s, tid, addr, beats):
+        cfg = self.config
+        m = cfg.decode(addr)
+        port = self.s_rd[s]
+
+        if m is None:
+            yield Timeout(4)
+            return self.kernel.now
+
+        yield Timeout(REG_TIMING[cfg.s_reg[s]["AR"]][0])
+
+        # address decode, one transaction at a time per slave port
+        yield port.lock.acquire()
+        yield Timeout(1)
+        yield from self._admit(port, tid, m)
+
+        mp = self.m_rd[m]
+        yield mp.arb.acquire(s)
+        mp.outstanding += 1
+        self.kernel.call_at(self.kernel.now+1, lambda v: mp.arb.release())
+        done = self.kernel.spawn(self._read_data(s, m, tid, beats, self.kernel.now))
+
+        # ready returned to the slave port the cycle after the handshake
+        yield Timeout(2)
+        port.lock.release()
+
+        yield done.join()
+        yield Timeout(REG_TIMING[cfg.s_reg[s]["R"]][0])
+        return self.kernel.now
+
+    def _read_data(self, s, m, tid, beats, ar_time):
+        cfg = self.config
+        mp = self.m_rd[m]
+
+        # slaves return bursts in order
+        yield mp.slave.acquire()
+        ready = ar_time + REG_TIMING[cfg.m_reg[m]["AR"]][0] + self.slave_read_latency + REG_TIMING[cfg.m_reg[m]["R"]][0]
+        yield Timeout(ready - self.kernel.now)
+
+        arb = self.s_r_arb[s]
+        yield arb.acquire(m)
+        yield Timeout(beats*cfg.interval(s, m, "R"))
+        self.beats[m] += beats
+        arb.release()
+        mp.slave.release()
+
+        mp.complete()
+        self.s_rd[s].complete(tid)
+
+    def write(self, s, tid, addr, beats):
+        cfg = self.config
+        m = cfg.decode(addr)
+        port = self.s_wr[s]
+
+        if m is None:
+            yield Timeout(4 + beats)
+            return self.kernel.now
+
+        yield Timeout(REG_TIMING[cfg.s_reg[s]["AW"]][0])
+
+        yield port.lock.acquire()
+        yield Timeout(1)
+        yield from self._admit(port, tid, m)
+
+        # the write command is only accepted once the previous burst's
+        # write data has passed through the slave port
+        yield from port.cond.wait_for(lambda: not self.s_w_busy[s])
+        self.s_w_busy[s] = True
+
+        mp = self.m_wr[m]
+        yield mp.arb.acquire(s)
+        mp.outstanding += 1
+        mp.w_busy = True
+        self.kernel.call_at(self.kernel.now+1, lambda v: mp.arb.release())
+        done = self.kernel.spawn(self._write_data(s, m, tid, beats))
+
+        yield Timeout(2)
+        port.lock.release()
+
+        yield done.join()
+        yield Timeout(REG_TIMING[cfg.s_reg[s]["B"]][0])
+        return self.kernel.now
+
+    def _write_data(self, s, m, tid, beats):
+        cfg = self.config
+        mp = self.m_wr[m]
+
+        yield Timeout(1 + cfg.latency(s, m, "W"))
+        yield Timeout(beats*cfg.interval(s, m, "W"))
+        self.beats[m] += beats
+
+        self.s_w_busy[s] = False
+        self.s_wr[s].cond.notify()
+        mp.w_busy = False
+        mp.arb.kick()
+
+        yield Timeout(self.slave_write_latency + REG_TIMING[cfg.m_reg[m]["B"]][0])
+
+        arb = self.s_b_arb[s]
+        yield arb.acquire(m)
+        yield Timeout(1)
+        arb.release()
+
+        mp.complete()
+        self.s_wr[s].complete(tid)
+
+    def run_workload(self, ops, workers=1, id_width=None):
+        """
+        Replay ops[s], a list of (kind, addr, length) per slave port
+
+        Each slave port runs workers processes that take operations from
+        its list in order and wait for each to complete, like TrafficWorker
+        on an AxiMaster; IDs rotate per operation as in AxiMaster.  Returns
+        TrafficStats with times in cycles.
+        """
+        cfg = self.config
+        stats = TrafficStats(1)
+        id_count = 2**(cfg.id_width if id_width is None else id_width)
+        stats.start_time = self.kernel.now
+
+        def worker(s, index, queue, ids):
+            for kind, addr, length in queue:
+                start = self.kernel.now
+                tid = next(ids[kind]) % id_count
+                beats = -(-length // cfg.byte_lanes)
+                if kind == "read":
+                    yield from self.read(s, tid, addr, beats)
+                else:
+                    yield from self.write(s, tid, addr, beats)
+                stats.record(kind, length, start, self.kernel.now, index)
+
+        for s, queue in enumerate(ops):
+            queue = iter(queue)
+            ids = {"read": itertools.count(), "write": itertools.count()}
+            for k in range(workers):
+                self.kernel.spawn(worker(s, s*workers+k, queue, ids))
+
+        self.kernel.run()
+        stats.end_time = self.kernel.now
+
+        return stats
+
+
+def make_workload(config, pattern="uniform", mix="mixed", size=256, count=64, seed=0):
+    """
+    Deterministic operation lists for run_workload() and for RTL replay
+
+    Each slave port issues count operations of size bytes, to master
+    ports chosen by the routing pattern (see common.bench), reading with
+    the probability given by the traffic mix.  Operations walk a private
+    aperture of each master port's address range and never cross a 4 KB
+    boundary.
+    """
+    cfg = config if isinstance(config, CrossbarConfig) else CrossbarConfig(config)
+    rng = random.Random(seed)
+    route = ROUTING_PATTERNS[pattern]
+    read_ratio = TRAFFIC_MIXES[mix]
+    size = -(-size // cfg.byte_lanes) * cfg.byte_lanes
+    stride = 1 << (size-1).bit_length()
+    aperture = min(1 << min(cfg.m_addr_width), 2**16) // cfg.s_count
+
+    ops = []
+    for s in range(cfg.s_count):
+        dests = route(s, cfg.s_count, cfg.m_count)
+        queue = []
+        for k in range(count):
+            m = rng.choice(dests)
+            offset = s*aperture + (k*stride) % aperture
+            kind = "read" if rng.random() < read_ratio else "write"
+            queue.append((kind, cfg.m_base_addr[m] + offset, size))
+        ops.append(queue)
+
+    return ops
+
+
+def predict(params, pattern="uniform", mix="mixed", size=256, count=64, workers=4, seed=0, **kwargs):
+    """Benchmark columns (as common.bench.traffic_row) predicted by the model"""
+    model = AxiCrossbarModel(params, **kwargs)
+    ops = make_workload(model.config, pattern, mix, size, count, seed)
+    stats = model.run_workload(ops, workers)
+    groups = {s*workers+k: s for s in range(model.config.s_count) for k in range(workers)}
+    return traffic_row(stats, 1, groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep axi_crossbar configurations with the transaction-level model")
+    parser.add_argument('-s', '--s-count', type=int, nargs='+', default=[4], help="slave port counts")
+    parser.add_argument('-m', '--m-count', type=int, nargs='+', default=[4], help="master port counts")
+    parser.add_argument('-w', '--data-width', type=int, nargs='+', default=[32], help="data widths")
+    parser.add_argument('--threads', type=int, nargs='+', default=[2], help="S_THREADS values")
+    parser.add_argument('--accept', type=int, nargs='+', default=[16], help="S_ACCEPT values")
+    parser.add_argument('--issue', type=int, nargs='+', default=[4], help="M_ISSUE values")
+    parser.add_argument('--reg-type', type=int, nargs='+', default=[None], help="REG_TYPE for all channels (default: wrapper defaults)")
+    parser.add_argument('--pattern', nargs='+', default=["uniform"], choices=list(ROUTING_PATTERNS))
+    parser.add_argument('--mix', nargs='+', default=["mixed"], choices=list(TRAFFIC_MIXES))
+    parser.add_argument('--size', type=int, nargs='+', default=[256], help="operation sizes in bytes")
+    parser.add_argument('--workers', type=int, nargs='+', default=[4], help="concurrent operations per slave port")
+    parser.add_argument('--count', type=int, default=64, help="operations per slave port")
+    parser.add_argument('--read-latency', type=int, default=2, help="slave read latency in cycles")
+    parser.add_argument('--write-latency', type=int, default=2, help="slave write latency in cycles")
+    parser.add_argument('-o', '--output', type=str, help="output CSV file (default: stdout)")
+
+    args = parser.parse_args()
+
+    f = open(args.output, 'w', newline='') if args.output else sys.stdout
+    writer = None
+
+    for (s_count, m_count, data_width, threads, accept, issue, reg_type, pattern, mix, size, workers) in itertools.product(
+            args.s_count, args.m_count, args.data_width, args.threads, args.accept, args.issue,
+            args.reg_type, args.pattern, args.mix, args.size, args.workers):
+
+        params = {"S_COUNT": s_count, "M_COUNT": m_count, "DATA_WIDTH": data_width}
+        for k in range(s_count):
+            params[f"S{k:02d}_THREADS"] = threads
+            params[f"S{k:02d}_ACCEPT"] = accept
+        for k in range(m_count):
+            params[f"M{k:02d}_ISSUE"] = issue
+        if reg_type is not None:
+            for p, count in [("S", s_count), ("M", m_count)]:
+                for k in range(count):
+                    for ch in ["AW", "W", "B", "AR", "R"]:
+                        params[f"{p}{k:02d}_{ch}_REG_TYPE"] = reg_type
+
+        row = {"s_count": s_count, "m_count": m_count, "data_width": data_width, "s_threads": threads,
+            "s_accept": accept, "m_issue": issue, "reg_type": "default" if reg_type is None else reg_type,
+            "pattern": pattern, "mix": mix, "size": size, "workers": workers}
+        row.update(predict(params, pattern, mix, size, args.count, workers,
+            slave_read_latency=args.read_latency, slave_write_latency=args.write_latency))
+
+        if writer is None:
+            writer = csv.DictWriter(f, list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+    if args.output:
+        f.close()
+
+
+if __name__ == "__main__":
+    main()
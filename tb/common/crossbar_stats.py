@@ -0,0 +1,250 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import csv
+from array import array
+
+from cocotbext.axi import AxiBus
+
+from common.crossbar_model import CrossbarConfig
+from common.monitor import AxiMonitor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+KINDS = ["read", "write"]
+
+
+class LatencyHistogram:
+    """
+    Fixed-width latency histograms, one per (kind, source, destination)
+
+    Bin k counts latencies in [k*bin_width, (k+1)*bin_width) cycles; the
+    last bin also counts everything longer.  A destination of None is a
+    decode error.
+    """
+    def __init__(self, bin_width=4, bins=64):
+        self.bin_width = bin_width
+        self.bins = bins
+        self.counts = {}
+
+    def add(self, key, latency):
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = array('L', [0])*self.bins
+        counts[min(latency // self.bin_width, self.bins-1)] += 1
+
+    def rows(self):
+        """Non-empty bins as dicts (kind, s, m, bin_start, count)"""
+        for (kind, s, m), counts in sorted(self.counts.items(), key=lambda i: (i[0][0], i[0][1], -1 if i[0][2] is None else i[0][2])):
+            for k, count in enumerate(counts):
+                if count:
+                    yield {"kind": kind, "s": s, "m": "decerr" if m is None else m,
+                        "bin_start": k*self.bin_width, "count": count}
+
+
+class _SlavePortInstrument(AxiMonitor):
+    """AxiMonitor on one slave port, recording depth series and admission stalls"""
+    def __init__(self, bus, clock, reset, instrument, s, per_id):
+        super().__init__(bus, clock, reset, name=f"s{s:02d}_axi")
+
+        self.instrument = instrument
+        self.config = instrument.config
+        self.s = s
+        self.per_id = per_id
+
+        self.series = {}
+        for kind, tracker, ch, addr_bus, prefix in [
+                ("read", self.reads, self.ar, bus.read.ar, "ar"),
+                ("write", self.writes, self.aw, bus.write.aw, "aw")]:
+            self.series[kind] = _DepthSeries(tracker, ch, addr_bus, prefix)
+
+        self.on_cycle = self._sample
+
+    def _addr_dest(self, bus, prefix):
+        value = getattr(bus, f"{prefix}addr").value
+        return self.config.decode(value.integer) if value.is_resolvable else None
+
+    def _issue_info(self, bus, prefix):
+        return self._addr_dest(bus, prefix)
+
+    def _completed(self, kind, latency, m):
+        self.instrument.histogram.add((kind, self.s, m), latency)
+
+    def _blocked(self, series):
+        """Whether admission control holds back the address waiting on the channel"""
+        tracker = series.tracker
+        if tracker.count >= self.config.s_accept[self.s]:
+            return True
+        q = tracker.ids.get(self._id(getattr(series.bus, f"{series.prefix}id", None)))
+        if q:
+            # an ID may only have transactions to one destination at a time
+            m = self._addr_dest(series.bus, series.prefix)
+            return any(info != m for start, info in q)
+        return len(tracker.ids) >= self.config.s_threads[self.s]
+
+    def _sample(self, cycle):
+        for series in self.series.values():
+            tracker = series.tracker
+            series.depth.append(min(tracker.count, 0xffff))
+            series.ids.append(min(len(tracker.ids), 0xffff))
+
+            stalled = series.channel.stalls != series.last_stalls
+            series.last_stalls = series.channel.stalls
+            series.stall.append(1 if stalled and self._blocked(series) else 0)
+
+            if self.per_id:
+                n = len(series.depth)
+                for tid in tracker.ids:
+                    if tid not in series.id_depth:
+                        series.id_depth[tid] = array('H', [0])*(n-1)
+                for tid, values in series.id_depth.items():
+                    values.append(tracker.depth(tid))
+
+
+class _DepthSeries:
+    def __init__(self, tracker, channel, bus, prefix):
+        self.tracker = tracker
+        self.channel = channel
+        self.bus = bus
+        self.prefix = prefix
+        self.last_stalls = channel.stalls
+        self.clear()
+
+    def clear(self):
+        self.depth = array('H')
+        self.ids = array('H')
+        self.stall = array('B')
+        self.id_depth = {}
+
+
+class CrossbarInstrument:
+    """
+    Outstanding depth and latency instrumentation for axi_crossbar
+
+    Monitors every slave port (s00_axi, ...) of an axi_crossbar wrapper
+    and records, every cycle and for reads and writes separately:
+
+    * depth: transactions outstanding at the port (address handshake to
+      last R beat or B)
+    * ids: number of IDs with transactions outstanding (threads in use)
+    * stall: 1 when the address was held off while admission control
+      (S_ACCEPT, S_THREADS, or an ID busy with another destination)
+      would block it, as judged from the transactions outstanding at the
+      port; completions are seen a few cycles after axi_crossbar_addr
+      sees them, so flags around completions are approximate
+    * per ID depth, with per_id=True
+
+    Series are arrays of 16 bit (8 bit for stall) values, one entry per
+    cycle since the instrument was created or cleared.  Latencies go to a
+    LatencyHistogram keyed by kind, slave port and master port (address
+    decoded with params, as common.crossbar_model.CrossbarConfig).
+    """
+    def __init__(self, dut, params, clock, reset=None, per_id=False, bin_width=4, bins=64):
+        self.config = params if isinstance(params, CrossbarConfig) else CrossbarConfig(params)
+        self.histogram = LatencyHistogram(bin_width, bins)
+
+        self.ports = [_SlavePortInstrument(AxiBus.from_prefix(dut, f"s{s:02d}_axi"), clock, reset, self, s, per_id)
+            for s in range(self.config.s_count)]
+
+    def clear(self):
+        for port in self.ports:
+            port.clear()
+            for series in port.series.values():
+                series.clear()
+        self.histogram = LatencyHistogram(self.histogram.bin_width, self.histogram.bins)
+
+    def stop(self):
+        for port in self.ports:
+            port.stop()
+
+    def cycles(self):
+        return len(self.ports[0].series["read"].depth) if self.ports else 0
+
+    def row(self):
+        """Summary columns: peak depth and IDs over all ports, and admission stall cycles"""
+        row = {}
+        for kind in KINDS:
+            series = [port.series[kind] for port in self.ports]
+            row[f"{kind}_max_depth"] = max((max(s.depth, default=0) for s in series), default=0)
+            row[f"{kind}_max_ids"] = max((max(s.ids, default=0) for s in series), default=0)
+            row[f"{kind}_admission_stalls"] = sum(sum(s.stall) for s in series)
+        return row
+
+    def write_csv(self, prefix):
+        """
+        Write <prefix>_depth.csv (one row per cycle, columns per port and
+        kind), <prefix>_latency.csv (non-empty histogram bins) and, with
+        per_id, <prefix>_id_depth.csv (kind, s, id, cycle, depth for
+        cycles with transactions outstanding)
+        """
+        columns = [(f"s{port.s:02d}_{kind}_{name}", getattr(port.series[kind], name))
+            for port in self.ports for kind in KINDS for name in ["depth", "ids", "stall"]]
+
+        with open(f"{prefix}_depth.csv", 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(["cycle"] + [name for name, values in columns])
+            for k, values in enumerate(zip(*(values for name, values in columns))):
+                w.writerow((k,) + values)
+
+        with open(f"{prefix}_latency.csv", 'w', newline='') as f:
+            w = csv.DictWriter(f, ["kind", "s", "m", "bin_start", "count"])
+            w.writeheader()
+            w.writerows(self.histogram.rows())
+
+        if any(port.per_id for port in self.ports):
+            with open(f"{prefix}_id_depth.csv", 'w', newline='') as f:
+                w = csv.writer(f)
+                w.writerow(["kind", "s", "id", "cycle", "depth"])
+                for port in self.ports:
+                    for kind in KINDS:
+                        for tid, values in sorted(port.series[kind].id_depth.items(), key=lambda i: str(i[0])):
+                            w.writerows((kind, port.s, tid, k, v) for k, v in enumerate(values) if v)
+
+    def to_numpy(self):
+        """
+        Series as NumPy arrays: <kind>_depth, <kind>_ids and <kind>_stall
+        of shape (S_COUNT, cycles), and <kind>_latency_hist of shape
+        (S_COUNT, M_COUNT+1, bins), the last destination being decode
+        errors; save with numpy.savez()
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for to_numpy(), use write_csv() instead")
+
+        cfg = self.config
+        data = {}
+        for kind in KINDS:
+            for name, dtype in [("depth", np.uint16), ("ids", np.uint16), ("stall", np.uint8)]:
+                data[f"{kind}_{name}"] = np.array([getattr(port.series[kind], name) for port in self.ports], dtype=dtype)
+
+            hist = np.zeros((cfg.s_count, cfg.m_count+1, self.histogram.bins), dtype=np.uint64)
+            for (k, s, m), counts in self.histogram.counts.items():
+                if k == kind:
+                    hist[s, cfg.m_count if m is None else m] = counts
+            data[f"{kind}_latency_hist"] = hist
+        data["latency_bin_width"] = np.array(self.histogram.bin_width)
+        return data
@@ -0,0 +1,156 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from contextlib import asynccontextmanager
+
+from common.results import load_results
+
+# operations measured in the current test, name -> list of cycle counts
+_ops = {}
+
+
+@asynccontextmanager
+async def operation(name, clock_period=10):
+    """
+    Count the simulated cycles of a reference operation
+
+        async with cycles.operation("write_4k"):
+            await tb.axi_master.write(addr, data)
+
+    Each use appends one count to name, reported with the test when cycle
+    accounting is enabled (see install()) and compared by its median.
+    """
+    from cocotb.utils import get_sim_time
+
+    start = get_sim_time('ns')
+    yield
+    record(name, (get_sim_time('ns') - start) / clock_period)
+
+
+def record(name, cycles):
+    """Record a cycle count for a reference operation of the current test"""
+    _ops.setdefault(name, []).append(cycles)
+
+
+def install(output_dir=None, clock_period=10):
+    """
+    Write the cycle accounting of each test to <output_dir>/<test>.json
+
+    Installed in the simulator process by common.sim_hooks when the runner
+    enables cycle accounting, output_dir defaults to CYCLES_DIR.
+    Each file holds the total simulated cycles of the test, the random seed
+    (totals are only comparable between runs with the same seed) and the
+    cycle counts of the reference operations of the test.
+    """
+    import cocotb
+    from cocotb.regression import RegressionManager
+
+    output_dir = output_dir or os.getenv("CYCLES_DIR")
+
+    start_test = RegressionManager._start_test
+    record_result = RegressionManager._record_result
+
+    def accounted_start_test(manager):
+        _ops.clear()
+        return start_test(manager)
+
+    def accounted_record_result(manager, test, outcome, wall_time_s, sim_time_ns):
+        if outcome is not None:
+            result = {
+                "test": test.__qualname__,
+                "seed": cocotb.RANDOM_SEED,
+                "sim_time_ns": sim_time_ns,
+                "cycles": round(sim_time_ns / clock_period),
+                "ops": {name: [round(c, 1) for c in counts] for name, counts in sorted(_ops.items())},
+            }
+            os.makedirs(output_dir, exist_ok=True)
+            with open(os.path.join(output_dir, f"{test.__qualname__}.json"), 'w') as f:
+                json.dump(result, f, indent=1)
+        return record_result(manager, test, outcome, wall_time_s, sim_time_ns)
+
+    RegressionManager._start_test = accounted_start_test
+    RegressionManager._record_result = accounted_record_result
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Messages for cycle counts that grew by more than tolerance
+
+    Compares the median of each reference operation, and the total cycles of
+    tests run with the same seed as the baseline.  Tests and operations
+    missing from the baseline are not checked.
+    """
+    messages = []
+
+    def check(what, value, base):
+        if base and value / base - 1 > tolerance:
+            messages.append(f"{what}: {value:.0f} cycles, baseline {base:.0f} ({value/base-1:+.0%})")
+
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if not base:
+            continue
+        if result.get("seed") == base.get("seed"):
+            check(key, result["cycles"], base.get("cycles"))
+        for name, counts in sorted(result.get("ops", {}).items()):
+            if base.get("ops", {}).get(name) and counts:
+                check(f"{key} {name}", statistics.median(counts), statistics.median(base["ops"][name]))
+
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize, merge and compare simulated cycle counts")
+    parser.add_argument('path', type=str, help="cycle directory (--cycles-dir) or merged file")
+    parser.add_argument('-o', '--output', type=str, help="write the merged results to this file (for use as a baseline)")
+    parser.add_argument('-b', '--baseline', type=str, help="baseline directory or merged file to compare with")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.1, help="largest accepted relative increase in cycles")
+
+    args = parser.parse_args()
+
+    results = load_results(args.path)
+
+    for key, result in sorted(results.items()):
+        ops = ", ".join(f"{name} {statistics.median(counts):.0f}" for name, counts in result["ops"].items() if counts)
+        print(f"{key}: {result['cycles']} cycles" + (f" ({ops})" if ops else ""))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        messages = compare(results, load_results(args.baseline), args.tolerance)
+        for msg in messages:
+            print(f"regression: {msg}")
+        if messages:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from cocotbext.axi import AxiStreamFrame
+
+from common.tlm import Kernel, Condition, Mutex, Timeout
+
+
+# status error codes, as DMA_ERROR_* in the RTL
+DMA_ERROR_NONE = 0
+DMA_ERROR_AXI_RD_SLVERR = 4
+DMA_ERROR_AXI_RD_DECERR = 5
+DMA_ERROR_AXI_WR_SLVERR = 6
+DMA_ERROR_AXI_WR_DECERR = 7
+
+# axi_dma/axi_cdma defaults
+DEFAULTS = {
+    "AXI_DATA_WIDTH": 32,
+    "AXI_MAX_BURST_LEN": 16,
+    "AXIS_ID_ENABLE": 0,
+    "AXIS_DEST_ENABLE": 0,
+    "AXIS_USER_ENABLE": 1,
+    "ENABLE_UNALIGNED": 0,
+}
+
+
+class DmaStatus:
+    """Descriptor status, with the fields of m_axis_*_desc_status"""
+    def __init__(self, tag=0, error=DMA_ERROR_NONE, len=0, id=0, dest=0, user=0):
+        self.tag = tag
+        self.error = error
+        self.len = len
+        self.id = id
+        self.dest = dest
+        self.user = user
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(tag={self.tag}, error={self.error}, len={self.len}, "
+            f"id={self.id}, dest={self.dest}, user={self.user})")
+
+
+def desc_field(desc, name, default=0):
+    """Integer field of a descriptor transaction, dict or object, default if absent"""
+    if isinstance(desc, dict):
+        value = desc.get(name, default)
+    else:
+        value = getattr(desc, name, default)
+    return default if value is None else int(value)
+
+
+def frame_field(frame, name, index):
+    """Sideband value of an AxiStreamFrame at byte index (tid etc. may be per byte)"""
+    value = getattr(frame, name, None)
+    if value is None:
+        return 0
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return 0
+        value = value[min(index, len(value)-1)]
+    return int(value)
+
+
+class DmaTiming:
+    """
+    Burst splitting and approximate cycle costs of the AXI DMA engines
+
+    Bursts are split as in the RTL: at most AXI_MAX_BURST_LEN beats, the
+    first burst shortened by the start offset within a maximum size burst,
+    and never crossing a 4 KB boundary.  Without ENABLE_UNALIGNED the low
+    address bits are ignored.  read_latency is the number of cycles from
+    an AR handshake to the first R beat, write_latency from the last W
+    beat to B; both include the memory itself.
+    """
+    def __init__(self, params=None, read_latency=2, write_latency=2):
+        params = dict(DEFAULTS, **(params or {}))
+
+        self.byte_lanes = params["AXI_DATA_WIDTH"] // 8
+        self.max_burst_bytes = params["AXI_MAX_BURST_LEN"] * self.byte_lanes
+        self.unaligned = bool(params["ENABLE_UNALIGNED"])
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+
+    def align(self, addr):
+        return addr if self.unaligned else addr & ~(self.byte_lanes-1)
+
+    def bursts(self, addr, length):
+        """(addr, length, beats) of the AXI bursts for an operation"""
+        bursts = []
+        while length > 0:
+            n = self.max_burst_bytes - (addr & (self.byte_lanes-1))
+            n = min(length, n, 0x1000 - (addr & 0xfff))
+            beats = ((addr & (self.byte_lanes-1)) + n + self.byte_lanes-1) // self.byte_lanes
+            bursts.append((addr, n, beats))
+            addr += n
+            length -= n
+        return bursts
+
+
+class _ReadPath:
+    """AXI read path: one AR per cycle, R beats in order after read_latency"""
+    def __init__(self, kernel, timing):
+        self.kernel = kernel
+        self.timing = timing
+        self.ar = Mutex(kernel)
+        self.r_free = 0
+
+    def transfer(self, addr, length):
+        """Generator: issue the bursts, return the cycle of each burst's last beat"""
+        yield self.ar.acquire()
+        ends = []
+        for addr, n, beats in self.timing.bursts(addr, length):
+            start = max(self.kernel.now + self.timing.read_latency, self.r_free)
+            self.r_free = start + beats
+            ends.append(self.r_free)
+            yield Timeout(1)
+        self.ar.release()
+        return ends
+
+
+class _WritePath:
+    """AXI write path: W beats stream back to back, B write_latency after the last beat"""
+    def __init__(self, kernel, timing):
+        self.kernel = kernel
+        self.timing = timing
+        self.lock = Mutex(kernel)
+        self.w_free = 0
+
+    def transfer(self, addr, length, ready=None):
+        """
+        Generator: issue the bursts, return the cycle of each B response
+
+        ready, if given, is the cycle by which the data of each burst is
+        available (for example from a read path); the path is held until
+        the last W beat, as the RTL write state machines are.
+        """
+        yield self.lock.acquire()
+        b_times = []
+        for k, (addr, n, beats) in enumerate(self.timing.bursts(addr, length)):
+            start = max(self.kernel.now + 1, self.w_free)
+            if ready is not None:
+                start = max(start, ready[k] - beats + 1)
+            self.w_free = start + beats
+            b_times.append(self.w_free + self.timing.write_latency)
+        yield Timeout(self.w_free - self.kernel.now)
+        self.lock.release()
+        return b_times
+
+
+class _ModelBase:
+    def __init__(self, mem, params=None, read_latency=2, write_latency=2, kernel=None):
+        self.mem = mem
+        self.params = dict(DEFAULTS, **(params or {}))
+        self.kernel = kernel or Kernel()
+        self.timing = DmaTiming(self.params, read_latency, write_latency)
+
+    def _in_range(self, addr, length):
+        return addr + length <= self.mem.size
+
+    def _until(self, time):
+        return Timeout(time - self.kernel.now)
+
+    def execute(self, gen):
+        """Run a model generator to completion on the kernel, return its result"""
+        proc = self.kernel.spawn(gen)
+        self.kernel.run()
+        return proc.done.value
+
+
+class _Enable:
+    """Descriptor input enable (read_enable, write_enable, enable)"""
+    def __init__(self, kernel):
+        self.value = True
+        self.cond = Condition(kernel)
+
+    def set(self, value):
+        self.value = bool(value)
+        self.cond.notify()
+
+    def wait(self):
+        yield from self.cond.wait_for(lambda: self.value)
+
+
+class AxiDmaModel(_ModelBase):
+    """
+    Transaction-level model of axi_dma
+
+    Accepts the descriptors of axi_dma (addr, len, tag, id, dest, user,
+    as DescTransaction objects or dicts) and performs them on mem, any
+    memory with read(addr, length), write(addr, data) and size, such as a
+    cocotbext-axi Memory or the AxiRam of a testbench.  Read descriptors
+    produce an AxiStreamFrame and a status, write descriptors consume a
+    frame: at most len bytes are written, the rest of the frame is
+    dropped, and the status reports the bytes written and the tid, tdest
+    and tuser of the frame.  Operations outside mem end with a decode
+    error status and no data.
+
+    read() and write() are generators for Kernel processes and model the
+    time taken from DmaTiming (times in cycles, in kernel.now); execute()
+    runs one to completion.  Read and write channels are independent, as
+    in the RTL, and each handles its descriptors in order.
+    """
+    def __init__(self, mem, params=None, read_latency=2, write_latency=2, kernel=None):
+        super().__init__(mem, params, read_latency, write_latency, kernel)
+
+        self.read_enable = _Enable(self.kernel)
+        self.write_enable = _Enable(self.kernel)
+        self._read_desc = Mutex(self.kernel)
+        self._write_desc = Mutex(self.kernel)
+        self._read_path = _ReadPath(self.kernel, self.timing)
+        self._write_path = _WritePath(self.kernel, self.timing)
+
+    def read(self, desc):
+        """Generator: perform a read descriptor, return (status, frame)"""
+        addr = self.timing.align(desc_field(desc, "addr"))
+        length = desc_field(desc, "len")
+        tag = desc_field(desc, "tag")
+
+        yield from self.read_enable.wait()
+        yield self._read_desc.acquire()
+        yield Timeout(1)
+        self._read_desc.release()
+
+        if not self._in_range(addr, length):
+            yield Timeout(1)
+            return DmaStatus(tag=tag, error=DMA_ERROR_AXI_RD_DECERR), None
+
+        data = self.mem.read(addr, length)
+        ends = yield from self._read_path.transfer(addr, length)
+        yield self._until(ends[-1] + 1)
+
+        p = self.params
+        frame = AxiStreamFrame(data,
+            tid=desc_field(desc, "id") if p["AXIS_ID_ENABLE"] else 0,
+            tdest=desc_field(desc, "dest") if p["AXIS_DEST_ENABLE"] else 0,
+            tuser=desc_field(desc, "user") if p["AXIS_USER_ENABLE"] else 0)
+
+        return DmaStatus(tag=tag, len=length), frame
+
+    def write(self, desc, frame):
+        """Generator: perform a write descriptor with the data of frame, return the status"""
+        addr = self.timing.align(desc_field(desc, "addr"))
+        length = desc_field(desc, "len")
+        tag = desc_field(desc, "tag")
+
+        data = frame.tdata if isinstance(frame, AxiStreamFrame) else frame
+        count = min(length, len(data))
+
+        yield from self.write_enable.wait()
+        yield self._write_desc.acquire()
+        yield Timeout(1)
+
+        if not self._in_range(addr, length):
+            self._write_desc.release()
+            yield Timeout(1)
+            return DmaStatus(tag=tag, error=DMA_ERROR_AXI_WR_DECERR)
+
+        b_times = yield from self._write_path.transfer(addr, length)
+        self._write_desc.release()
+
+        self.mem.write(addr, data[:count])
+        yield self._until(max(b_times) + 1)
+
+        status = DmaStatus(tag=tag, len=count)
+        if isinstance(frame, AxiStreamFrame) and count:
+            status.id = frame_field(frame, "tid", count-1)
+            status.dest = frame_field(frame, "tdest", count-1)
+            status.user = frame_field(frame, "tuser", count-1)
+        return status
+
+    def execute_read(self, desc):
+        return self.execute(self.read(desc))
+
+    def execute_write(self, desc, frame):
+        return self.execute(self.write(desc, frame))
+
+
+class AxiCdmaModel(_ModelBase):
+    """
+    Transaction-level model of axi_cdma
+
+    Accepts the descriptors of axi_cdma (read_addr, write_addr, len, tag)
+    and copies len bytes within mem, see AxiDmaModel.  Descriptors are
+    handled in order; reads are split into bursts at the source address
+    and writes at the destination address, and each write burst waits
+    for the read data it carries.
+    """
+    def __init__(self, mem, params=None, read_latency=2, write_latency=2, kernel=None):
+        super().__init__(mem, params, read_latency, write_latency, kernel)
+
+        self.enable = _Enable(self.kernel)
+        self._desc = Mutex(self.kernel)
+        self._read_path = _ReadPath(self.kernel, self.timing)
+        self._write_path = _WritePath(self.kernel, self.timing)
+
+    def copy(self, desc):
+        """Generator: perform a copy descriptor, return the status"""
+        read_addr = self.timing.align(desc_field(desc, "read_addr"))
+        write_addr = self.timing.align(desc_field(desc, "write_addr"))
+        length = desc_field(desc, "len")
+        tag = desc_field(desc, "tag")
+
+        yield from self.enable.wait()
+        yield self._desc.acquire()
+        yield Timeout(1)
+
+        if not self._in_range(read_addr, length):
+            error = DMA_ERROR_AXI_RD_DECERR
+        elif not self._in_range(write_addr, length):
+            error = DMA_ERROR_AXI_WR_DECERR
+        else:
+            error = None
+
+        if error is not None:
+            self._desc.release()
+            yield Timeout(1)
+            return DmaStatus(tag=tag, error=error)
+
+        data = self.mem.read(read_addr, length)
+
+        read_bursts = self.timing.bursts(read_addr, length)
+        read_ends = yield from self._read_path.transfer(read_addr, length)
+
+        # cycle by which the read data for each write burst has arrived
+        ready = []
+        offset = 0
+        for addr, n, beats in self.timing.bursts(write_addr, length):
+            offset += n
+            ready.append(next(end for (a, m, b), end in zip(read_bursts, read_ends) if a - read_addr + m >= offset))
+
+        b_times = yield from self._write_path.transfer(write_addr, length, ready)
+        self._desc.release()
+
+        self.mem.write(write_addr, data)
+        yield self._until(max(b_times) + 1)
+
+        return DmaStatus(tag=tag, len=length)
+
+    def execute_copy(self, desc):
+        return self.execute(self.copy(desc))
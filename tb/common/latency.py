@@ -0,0 +1,78 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import random
+
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time
+
+from common.traffic import as_distribution
+
+
+def add_latency(channel, latency, clock_period, units='ns', rng=None):
+    """
+    Add pipelined latency to a cocotbext-axi sink channel
+
+    Each transaction accepted by the channel is held back from the
+    consumer (for example the AR channel of an AxiRam) until latency clock
+    cycles after its handshake.  The channel keeps accepting transactions
+    in the meantime, so the latency overlaps with earlier transfers, as in
+    a pipelined memory.  latency is a number of cycles or a distribution
+    (see common.traffic) sampled for each transaction.
+    """
+    latency = as_distribution(latency)
+    rng = rng or random.Random(0)
+
+    sample = channel.bus.sample
+    recv = channel.recv
+
+    def timestamped_sample(obj):
+        sample(obj)
+        obj._accept_time = get_sim_time(units)
+
+    async def delayed_recv():
+        obj = await recv()
+        delay = obj._accept_time + latency.sample(rng)*clock_period - get_sim_time(units)
+        if delay > 0:
+            await Timer(delay, units)
+        return obj
+
+    channel.bus.sample = timestamped_sample
+    channel.recv = delayed_recv
+
+
+def add_ram_latency(ram, read_latency=0, write_latency=0, clock_period=10, units='ns', seed=0):
+    """
+    Add read and write access latency to an AxiRam or AxiLiteRam
+
+    Read latency is counted from the AR handshake to the first read data
+    beat, write latency from the AW handshake to the start of write
+    processing (the write response follows the last write data beat).
+    """
+    rng = random.Random(seed)
+
+    if read_latency:
+        add_latency(ram.read_if.ar_channel, read_latency, clock_period, units, random.Random(rng.getrandbits(64)))
+    if write_latency:
+        add_latency(ram.write_if.aw_channel, write_latency, clock_period, units, random.Random(rng.getrandbits(64)))
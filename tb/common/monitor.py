@@ -0,0 +1,360 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from array import array
+from collections import deque
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+from cocotbext.axi import AxiBus, AxiLiteBus
+
+from common.bench import latency_columns
+
+
+class ChannelStats:
+    """
+    Handshake counters of one valid/ready channel
+
+    Every sampled cycle is exactly one of: a beat (valid and ready), a
+    stall (valid without ready), starvation (ready without valid) or idle
+    (neither).
+    """
+    __slots__ = ("name", "valid", "ready", "on_beat", "beats", "stalls", "starved", "idle")
+
+    def __init__(self, name, valid, ready, on_beat=None):
+        self.name = name
+        self.valid = valid
+        self.ready = ready
+        self.on_beat = on_beat
+        self.clear()
+
+    def clear(self):
+        self.beats = 0
+        self.stalls = 0
+        self.starved = 0
+        self.idle = 0
+
+    def cycles(self):
+        return self.beats + self.stalls + self.starved + self.idle
+
+    def row(self):
+        return {
+            f"{self.name}_beats": self.beats,
+            f"{self.name}_stalls": self.stalls,
+            f"{self.name}_starved": self.starved,
+            f"{self.name}_idle": self.idle,
+        }
+
+
+class TransactionTracker:
+    """
+    Outstanding transactions of one direction of an interface
+
+    Transactions complete in order within an ID.  Each holds its start
+    cycle and the information passed to issue(); IDs without outstanding
+    transactions are dropped, so len(ids) is the number of active IDs.
+    """
+    __slots__ = ("ids", "count", "max_count", "latencies")
+
+    def __init__(self):
+        self.ids = {}
+        self.count = 0
+        self.max_count = 0
+        self.latencies = array('L')
+
+    def issue(self, tid, cycle, info=None):
+        q = self.ids.get(tid)
+        if q is None:
+            q = self.ids[tid] = deque()
+        q.append((cycle, info))
+        self.count += 1
+        if self.count > self.max_count:
+            self.max_count = self.count
+
+    def complete(self, tid, cycle):
+        """Complete the oldest transaction of tid, return (latency, info) or None"""
+        q = self.ids.get(tid)
+        if not q:
+            return None
+        start, info = q.popleft()
+        if not q:
+            del self.ids[tid]
+        self.count -= 1
+        latency = cycle - start
+        self.latencies.append(latency)
+        return latency, info
+
+    def depth(self, tid):
+        q = self.ids.get(tid)
+        return len(q) if q else 0
+
+    def reset(self):
+        """Drop all outstanding transactions"""
+        self.ids.clear()
+        self.count = 0
+
+    def clear(self):
+        """Clear the statistics, keeping outstanding transactions"""
+        self.max_count = self.count
+        self.latencies = array('L')
+
+
+class _Sampler:
+    """
+    One coroutine per clock sampling every monitored channel
+
+    Monitors on the same clock share the sampler, so attaching monitors to
+    many ports costs two signal reads per channel per cycle rather than a
+    coroutine per channel.
+    """
+    _samplers = {}
+
+    @classmethod
+    def get(cls, clock):
+        sampler = cls._samplers.get(clock)
+        # samplers of earlier tests were killed with the test
+        if sampler is None or sampler._run_cr._finished:
+            sampler = cls(clock)
+            cls._samplers[clock] = sampler
+        return sampler
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.cycle = 0
+        self.monitors = []
+        self._run_cr = cocotb.start_soon(self._run())
+
+    async def _run(self):
+        clock_edge = RisingEdge(self.clock)
+        while True:
+            await clock_edge
+            self.cycle += 1
+            cycle = self.cycle
+
+            for monitor in self.monitors:
+                if not monitor.active:
+                    continue
+                if monitor.reset is not None and monitor.reset.value.binstr == monitor._reset_str:
+                    monitor._in_reset()
+                    continue
+                for ch in monitor.channels:
+                    if ch.valid.value.binstr == "1":
+                        if ch.ready.value.binstr == "1":
+                            ch.beats += 1
+                            if ch.on_beat is not None:
+                                ch.on_beat(cycle)
+                        else:
+                            ch.stalls += 1
+                    elif ch.ready.value.binstr == "1":
+                        ch.starved += 1
+                    else:
+                        ch.idle += 1
+
+                if monitor.on_cycle is not None:
+                    monitor.on_cycle(cycle)
+
+
+class ChannelMonitor:
+    """
+    Base of the passive monitors: valid/ready channels sampled every cycle
+
+    Subclasses add their channels with _add(); all monitors on a clock are
+    sampled by one shared coroutine (see _Sampler), and cycles with reset
+    asserted are skipped.  on_cycle, if set, is called with the cycle
+    number after each sample.  stop() or active = False removes the
+    monitor from the sampling.
+    """
+    def __init__(self, clock, reset=None, reset_active_level=True, name=None):
+        self.clock = clock
+        self.reset = reset
+        self.name = name
+        self._reset_str = "1" if reset_active_level else "0"
+
+        self.active = True
+        self.on_cycle = None
+        self.channels = []
+
+        self._sampler = _Sampler.get(clock)
+        self._sampler.monitors.append(self)
+
+    def _add(self, name, valid, ready, on_beat=None):
+        ch = ChannelStats(name, valid, ready, on_beat)
+        self.channels.append(ch)
+        return ch
+
+    def _in_reset(self):
+        pass
+
+    @staticmethod
+    def _id(handle):
+        if handle is None:
+            return 0
+        value = handle.value
+        return value.integer if value.is_resolvable else None
+
+    def clear(self):
+        for ch in self.channels:
+            ch.clear()
+
+    def stop(self):
+        self.active = False
+        if self in self._sampler.monitors:
+            self._sampler.monitors.remove(self)
+
+
+class AxiMonitor(ChannelMonitor):
+    """
+    Passive performance monitor for an AXI or AXI lite interface
+
+    Bound to a bus from AxiBus.from_prefix() or AxiLiteBus.from_prefix(),
+    it only reads signals.  Per channel (aw, w, b, ar, r) it counts beats,
+    stalls (valid without ready), starvation (ready without valid) and
+    idle cycles, see ChannelStats.  Transactions are tracked from the
+    address handshake to the last R beat or the B beat, per ID when the
+    interface has IDs (in order within an ID, as AXI requires), giving
+    the number of outstanding transactions and their latency in cycles.
+
+    All monitors on a clock are sampled by one shared coroutine, so a
+    monitor on every port of a 16x16 crossbar is affordable (see
+    ChannelMonitor).  Subclasses can attach information to transactions
+    with _issue_info() and _completed().
+    """
+    def __init__(self, bus, clock, reset=None, reset_active_level=True, name=None):
+        super().__init__(clock, reset, reset_active_level, name)
+
+        self.bus = bus
+        self.reads = TransactionTracker()
+        self.writes = TransactionTracker()
+
+        self.aw = self.w = self.b = self.ar = self.r = None
+
+        write, read = bus.write, bus.read
+
+        if write is not None:
+            self._awid = getattr(write.aw, "awid", None)
+            self._bid = getattr(write.b, "bid", None)
+            self.aw = self._add("aw", write.aw.awvalid, write.aw.awready, self._aw_beat)
+            self.w = self._add("w", write.w.wvalid, write.w.wready)
+            self.b = self._add("b", write.b.bvalid, write.b.bready, self._b_beat)
+
+        if read is not None:
+            self._arid = getattr(read.ar, "arid", None)
+            self._rid = getattr(read.r, "rid", None)
+            self._rlast = getattr(read.r, "rlast", None)
+            self.ar = self._add("ar", read.ar.arvalid, read.ar.arready, self._ar_beat)
+            self.r = self._add("r", read.r.rvalid, read.r.rready, self._r_beat)
+
+    def _aw_beat(self, cycle):
+        self.writes.issue(self._id(self._awid), cycle, self._issue_info(self.bus.write.aw, "aw"))
+
+    def _b_beat(self, cycle):
+        done = self.writes.complete(self._id(self._bid), cycle)
+        if done is not None:
+            self._completed("write", *done)
+
+    def _ar_beat(self, cycle):
+        self.reads.issue(self._id(self._arid), cycle, self._issue_info(self.bus.read.ar, "ar"))
+
+    def _r_beat(self, cycle):
+        if self._rlast is not None and self._rlast.value.binstr != "1":
+            return
+        done = self.reads.complete(self._id(self._rid), cycle)
+        if done is not None:
+            self._completed("read", *done)
+
+    def _issue_info(self, bus, prefix):
+        """Extension point: information stored with each transaction at the address handshake"""
+        return None
+
+    def _completed(self, kind, latency, info):
+        """Extension point: called when a transaction completes"""
+        pass
+
+    def _in_reset(self):
+        self.reads.reset()
+        self.writes.reset()
+
+    @property
+    def read_latencies(self):
+        return self.reads.latencies
+
+    @property
+    def write_latencies(self):
+        return self.writes.latencies
+
+    @property
+    def max_read_outstanding(self):
+        return self.reads.max_count
+
+    @property
+    def max_write_outstanding(self):
+        return self.writes.max_count
+
+    def outstanding_reads(self):
+        return self.reads.count
+
+    def outstanding_writes(self):
+        return self.writes.count
+
+    def clear(self):
+        """Reset the counters and latencies; outstanding transactions are kept"""
+        super().clear()
+        self.reads.clear()
+        self.writes.clear()
+
+    def row(self):
+        """Benchmark columns (see common.bench.BenchResults) for this interface"""
+        row = {}
+        for ch in self.channels:
+            row.update(ch.row())
+        if self.ar is not None:
+            row["max_read_outstanding"] = self.max_read_outstanding
+            row.update(latency_columns("read_lat", sorted(self.read_latencies)))
+        if self.aw is not None:
+            row["max_write_outstanding"] = self.max_write_outstanding
+            row.update(latency_columns("write_lat", sorted(self.write_latencies)))
+        return row
+
+    def summary(self):
+        """One line description for logs"""
+        parts = []
+        for ch in self.channels:
+            cycles = ch.cycles()
+            util = ch.beats / cycles if cycles else 0
+            parts.append(f"{ch.name} {ch.beats} beats ({util:.0%}), {ch.stalls} stalled, {ch.starved} starved")
+        parts.append(f"outstanding rd {self.outstanding_reads()} (max {self.max_read_outstanding}), "
+            f"wr {self.outstanding_writes()} (max {self.max_write_outstanding})")
+        return f"{self.name or 'axi'}: " + "; ".join(parts)
+
+
+class AxiLiteMonitor(AxiMonitor):
+    """Passive performance monitor for an AXI lite interface, see AxiMonitor"""
+
+
+def attach_monitors(dut, prefixes, clock, reset=None, lite=False, **kwargs):
+    """Monitors for the interfaces with the given signal prefixes, by prefix"""
+    bus_class, monitor_class = (AxiLiteBus, AxiLiteMonitor) if lite else (AxiBus, AxiMonitor)
+    return {prefix: monitor_class(bus_class.from_prefix(dut, prefix), clock, reset, name=prefix, **kwargs)
+        for prefix in prefixes}
@@ -0,0 +1,160 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import random as _random
+
+# memoized pattern buffers by key, each grown to the longest length requested
+_cache = {}
+
+
+def _grow(length):
+    size = 256
+    while size < length:
+        size *= 2
+    return size
+
+
+class _Stream:
+    """Immutable pattern buffer, extended on demand from a byte generator"""
+    def __init__(self, generate):
+        self.generate = generate
+        self.data = b''
+
+    def get(self, length):
+        if len(self.data) < length:
+            self.data += self.generate(_grow(length) - len(self.data))
+        return memoryview(self.data)[:length]
+
+
+def _stream(key, factory, *args):
+    """Cached stream for key, the generator factory(*args) is only created for a new stream"""
+    stream = _cache.get(key)
+    if stream is None:
+        stream = _cache[key] = _Stream(factory(*args))
+    return stream
+
+
+def _incrementing_generator():
+    return lambda count: bytes(range(256))*(count//256+1)
+
+
+def _fill_generator(value):
+    return lambda count: bytes([value])*count
+
+
+def _random_generator(seed):
+    rng = _random.Random(seed)
+    return lambda count: bytes(rng.getrandbits(8) for k in range(count))
+
+
+def _lfsr_generator(state, n, m):
+    mask = (1 << n) - 1
+
+    def generate(count):
+        nonlocal state
+        out = bytearray(count)
+        s = state
+        for k in range(count):
+            b = ((s >> (n-8)) ^ (s >> (m-8))) & 0xff
+            s = ((s << 8) | b) & mask
+            out[k] = b
+        state = s
+        return bytes(out)
+
+    return generate
+
+
+def incrementing(length, start=0):
+    """Incrementing bytes (start + k) % 256, replaces bytearray([x % 256 for x in range(length)])"""
+    return _stream("incrementing", _incrementing_generator).get(length+start % 256)[start % 256:]
+
+
+def fill(length, value=0xaa):
+    """Constant bytes, replaces b'\\xaa'*length guard fills"""
+    return _stream(("fill", value), _fill_generator, value).get(length)
+
+
+def random(length, seed=0):
+    """Pseudo-random bytes from random.Random(seed), the same for every call with the same seed"""
+    return _stream(("random", seed), _random_generator, seed).get(length)
+
+
+def lfsr(length, seed=0x7fffffff, taps=(31, 28)):
+    """
+    PRBS bytes from a Fibonacci LFSR with feedback polynomial x^n + x^m + 1
+
+    taps is (n, m), defaulting to PRBS31; the first bit generated is the
+    MSB of the first byte.  Bits are generated a byte at a time, so m must
+    be at least 8 (true for PRBS15, PRBS23 and PRBS31).
+    """
+    n, m = taps
+    state = seed & ((1 << n) - 1)
+
+    if not 8 <= m < n:
+        raise ValueError(f"Unsupported LFSR taps {taps}, need 8 <= m < n")
+    if not state:
+        raise ValueError("LFSR seed must be nonzero")
+
+    return _stream(("lfsr", state, taps), _lfsr_generator, state, n, m).get(length)
+
+
+def _buffer(mem):
+    # cocotbext-axi memories (AxiRam, AxiLiteRam, Memory) keep their contents in an mmap
+    return getattr(mem, "mem", mem)
+
+
+def verify(mem, addr, pattern, guard=0, fill_value=0xaa):
+    """
+    Compare a memory region against a pattern without copying it
+
+    mem is a cocotbext-axi memory model or any bytes-like object, such as
+    the data returned by a read.  With guard, the guard bytes before addr
+    and after the pattern must also hold fill_value.
+    """
+    length = len(pattern)
+
+    if addr < guard:
+        raise ValueError("Guard region starts before the start of memory")
+
+    with memoryview(_buffer(mem)) as view:
+        if view[addr:addr+length] != pattern:
+            return False
+        if guard:
+            if view[addr-guard:addr] != fill(guard, fill_value):
+                return False
+            if view[addr+length:addr+length+guard] != fill(guard, fill_value):
+                return False
+    return True
+
+
+def mismatch(mem, addr, pattern):
+    """Offset of the first byte of a memory region that differs from pattern, or None"""
+    with memoryview(_buffer(mem)) as view:
+        region = view[addr:addr+len(pattern)]
+        if region == pattern:
+            return None
+        for k in range(len(pattern)):
+            if region[k] != pattern[k]:
+                return k
+        return len(region)
@@ -0,0 +1,293 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from common.results import load_results
+
+# simulator-side imports are deferred so the command line tools below
+# work without cocotb installed
+
+
+class _ProfileState:
+    """Counters of the test being profiled"""
+    def __init__(self, sample_interval):
+        self.python_time = 0.0
+        self.coroutines = {}
+        self.samples = 0
+        self.sim_samples = 0
+        self.self_samples = Counter()
+        self.total_samples = Counter()
+        self.sample_interval = sample_interval
+
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+
+def _location(code):
+    filename = code.co_filename
+    for marker in ["site-packages" + os.sep, os.sep + "tb" + os.sep]:
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{filename}:{code.co_name}"
+
+
+class SimProfiler:
+    """
+    Per-test simulation speed profile of a cocotb run
+
+    Installed in the simulator process (see install()), it records for
+    every test:
+
+    * simulated cycles per wall-clock second (simulation time divided by
+      clock_period)
+    * time spent in Python (the cocotb scheduler reacting to triggers,
+      timed around each reaction) and the remainder, spent in the
+      simulator and GPI
+    * time and number of resumptions per coroutine (task), by name
+    * statistical Python hotspots: a thread samples the stack of the main
+      thread every sample_interval seconds, counting the innermost function
+      (self) and every function on the stack (total); samples taken while
+      no Python code runs count as simulator samples
+
+    Results are written to <output_dir>/<test>.json when each test ends.
+    The sampling thread runs until stop(), at the end of the regression.
+    """
+    def __init__(self, output_dir, clock_period=10, sample_interval=0.001, top=25):
+        self.output_dir = output_dir
+        self.clock_period = clock_period
+        self.sample_interval = sample_interval
+        self.top = top
+
+        self.state = None
+        self._main_thread = threading.main_thread().ident
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def install(self):
+        # cocotb.scheduler is shadowed by the scheduler instance
+        from cocotb.decorators import RunningTask
+        from cocotb.regression import RegressionManager
+        from cocotb.scheduler import Scheduler
+
+        profiler = self
+
+        scheduler_cls = Scheduler
+        react = scheduler_cls._react
+
+        def timed_react(sched, trigger):
+            state = profiler.state
+            if state is None or sched._is_reacting:
+                return react(sched, trigger)
+            t = time.perf_counter()
+            try:
+                return react(sched, trigger)
+            finally:
+                state.python_time += time.perf_counter() - t
+
+        scheduler_cls._react = timed_react
+
+        task_cls = RunningTask
+        advance = task_cls._advance
+
+        def timed_advance(task, outcome):
+            state = profiler.state
+            if state is None:
+                return advance(task, outcome)
+            t = time.perf_counter()
+            try:
+                return advance(task, outcome)
+            finally:
+                dt = time.perf_counter() - t
+                name = getattr(task._coro, "__qualname__", type(task._coro).__name__)
+                entry = state.coroutines.get(name)
+                if entry is None:
+                    entry = state.coroutines[name] = [0, 0.0]
+                entry[0] += 1
+                entry[1] += dt
+
+        task_cls._advance = timed_advance
+
+        manager_cls = RegressionManager
+        start_test = manager_cls._start_test
+        record_result = manager_cls._record_result
+
+        def profiled_start_test(manager):
+            profiler.start()
+            return start_test(manager)
+
+        def profiled_record_result(manager, test, outcome, wall_time_s, sim_time_ns):
+            if profiler.state is not None:
+                profiler.finish(test.__qualname__, outcome, sim_time_ns)
+            return record_result(manager, test, outcome, wall_time_s, sim_time_ns)
+
+        tear_down = manager_cls.tear_down
+
+        def profiled_tear_down(manager):
+            profiler.stop()
+            return tear_down(manager)
+
+        manager_cls._start_test = profiled_start_test
+        manager_cls._record_result = profiled_record_result
+        manager_cls.tear_down = profiled_tear_down
+
+    def start(self):
+        self.state = _ProfileState(self.sample_interval)
+        if self.sample_interval and self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name="sim-profiler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop the sampling thread, called when the regression ends"""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self):
+        main = self._main_thread
+        while not self._stop.wait(self.sample_interval):
+            state = self.state
+            if state is None:
+                continue
+            frame = sys._current_frames().get(main)
+            state.samples += 1
+            if frame is None:
+                state.sim_samples += 1
+                continue
+            state.self_samples[_location(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                loc = _location(frame.f_code)
+                if loc not in seen:
+                    seen.add(loc)
+                    state.total_samples[loc] += 1
+                frame = frame.f_back
+
+    def finish(self, name, outcome, sim_time_ns):
+        state, self.state = self.state, None
+
+        wall = time.perf_counter() - state.wall_start
+        cycles = sim_time_ns / self.clock_period
+
+        coroutines = sorted(state.coroutines.items(), key=lambda i: -i[1][1])[:self.top]
+
+        result = {
+            "test": name,
+            "passed": None if outcome is None else _passed(outcome),
+            "wall_s": round(wall, 4),
+            "cpu_s": round(time.process_time() - state.cpu_start, 4),
+            "sim_time_ns": sim_time_ns,
+            "cycles": round(cycles),
+            "cycles_per_s": round(cycles / wall, 1) if wall else None,
+            "python_s": round(state.python_time, 4),
+            "simulator_s": round(max(0.0, wall - state.python_time), 4),
+            "python_fraction": round(state.python_time / wall, 4) if wall else None,
+            "coroutines": [{"name": n, "resumes": c, "seconds": round(t, 4),
+                "fraction": round(t / wall, 4) if wall else None} for n, (c, t) in coroutines],
+            "samples": state.samples,
+            "simulator_samples": state.sim_samples,
+            "hotspots": [{"location": loc, "self": n, "total": state.total_samples[loc]}
+                for loc, n in state.self_samples.most_common(self.top)],
+            "hotspots_total": [{"location": loc, "total": n}
+                for loc, n in state.total_samples.most_common(self.top)],
+        }
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, f"{name}.json"), 'w') as f:
+            json.dump(result, f, indent=1)
+
+        return result
+
+
+def _passed(outcome):
+    try:
+        outcome.get()
+    except BaseException:
+        return False
+    return True
+
+
+def install(output_dir=None, **kwargs):
+    """
+    Install the profiler in the simulator process, output_dir defaults to PROFILE_DIR
+
+    Called by common.sim_hooks when the runner enables profiling.
+    """
+    profiler = SimProfiler(output_dir or os.getenv("PROFILE_DIR"), **kwargs)
+    profiler.install()
+    return profiler
+
+
+def check_regression(results, baseline, threshold=0.2):
+    """Messages for tests whose cycles per second dropped by more than threshold"""
+    messages = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if not base or not base.get("cycles_per_s") or result.get("cycles_per_s") is None:
+            continue
+        change = result["cycles_per_s"] / base["cycles_per_s"] - 1
+        if change < -threshold:
+            messages.append(f"{key}: {result['cycles_per_s']:.0f} cycles/s, "
+                f"baseline {base['cycles_per_s']:.0f} ({change:+.0%})")
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize, merge and compare simulation speed profiles")
+    parser.add_argument('path', type=str, help="profile directory (--profile-dir) or merged file")
+    parser.add_argument('-o', '--output', type=str, help="write the merged results to this file (for use as a baseline)")
+    parser.add_argument('-b', '--baseline', type=str, help="baseline directory or merged file to compare with")
+    parser.add_argument('-t', '--threshold', type=float, default=0.2, help="largest accepted relative drop in cycles/s")
+
+    args = parser.parse_args()
+
+    results = load_results(args.path)
+
+    for key, result in sorted(results.items()):
+        hotspot = result["hotspots"][0]["location"] if result.get("hotspots") else "-"
+        print(f"{key}: {result['cycles_per_s']} cycles/s, {result['python_fraction']:.0%} Python, top {hotspot}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        messages = check_regression(results, load_results(args.baseline), args.threshold)
+        for msg in messages:
+            print(f"regression: {msg}")
+        if messages:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import mmap
+import random
+
+import cocotb
+from cocotb.triggers import RisingEdge
+
+from common.traffic import as_distribution
+
+
+class RegRegion:
+    """
+    Address range of a register file with its own access latency
+
+    latency is a number of cycles or a distribution (see common.traffic)
+    sampled for each access.  With wait set, reg_*_wait is held for the
+    duration of the access, which stops the axil_reg_if timeout; otherwise
+    the access is acknowledged after latency cycles without asserting wait,
+    and times out if latency exceeds the TIMEOUT of the interface.
+    """
+    def __init__(self, base, size, latency=0, wait=True, name=None):
+        self.base = base
+        self.size = size
+        self.latency = as_distribution(latency)
+        self.wait = wait
+        self.name = name or f"{base:#x}"
+
+        self.accesses = 0
+        self.timeouts = 0
+        self.latency_cycles = 0
+
+    def contains(self, addr):
+        return self.base <= addr < self.base+self.size
+
+    def clear(self):
+        self.accesses = 0
+        self.timeouts = 0
+        self.latency_cycles = 0
+
+
+class RegIfModel:
+    """
+    Register file model for the reg_* side of axil_reg_if
+
+    Storage is a flat memory of size bytes.  Each access takes the latency
+    of the first region containing its address, or the default latency and
+    wait setting outside of all regions.  Accesses beyond the end of the
+    memory are never acknowledged.
+    """
+    def __init__(self, dut, clock, size=16384, regions=None, latency=0, wait=True, seed=0):
+        self.dut = dut
+        self.clock = clock
+
+        self.mem = mmap.mmap(-1, size)
+        self.regions = list(regions or [])
+        self.default = RegRegion(0, size, latency, wait, name="default")
+        self.rng = random.Random(seed)
+
+        self.byte_lanes = len(dut.reg_wr_strb)
+
+        dut.reg_wr_wait.setimmediatevalue(0)
+        dut.reg_wr_ack.setimmediatevalue(0)
+        dut.reg_rd_data.setimmediatevalue(0)
+        dut.reg_rd_wait.setimmediatevalue(0)
+        dut.reg_rd_ack.setimmediatevalue(0)
+
+        cocotb.start_soon(self._run_read())
+        cocotb.start_soon(self._run_write())
+
+    def region(self, addr):
+        for region in self.regions:
+            if region.contains(addr):
+                return region
+        return self.default
+
+    def all_regions(self):
+        return self.regions + [self.default]
+
+    def clear(self):
+        for region in self.all_regions():
+            region.clear()
+
+    def timeouts(self):
+        return sum(region.timeouts for region in self.all_regions())
+
+    def mem_read(self, address, length):
+        self.mem.seek(address)
+        return self.mem.read(length)
+
+    def mem_write(self, address, data):
+        self.mem.seek(address)
+        self.mem.write(bytes(data))
+
+    async def _access(self, region, wait_signal, en_signal):
+        """
+        Hold the access for its latency, return False if the interface timed out
+
+        wait_signal and en_signal are the reg_*_wait and reg_*_en handles of
+        the access direction.
+        """
+        latency = region.latency.sample(self.rng)
+        region.accesses += 1
+        region.latency_cycles += latency
+
+        if latency and region.wait:
+            wait_signal.value = 1
+
+        for k in range(latency):
+            await RisingEdge(self.clock)
+            if not region.wait and not en_signal.value.integer:
+                region.timeouts += 1
+                return False
+
+        return True
+
+    async def _run_read(self):
+        while True:
+            self.dut.reg_rd_data.value = 0
+            self.dut.reg_rd_wait.value = 0
+            self.dut.reg_rd_ack.value = 0
+            await RisingEdge(self.clock)
+
+            addr = (self.dut.reg_rd_addr.value.integer // self.byte_lanes) * self.byte_lanes
+
+            if self.dut.reg_rd_en.value.integer and addr < len(self.mem):
+                if not await self._access(self.region(addr), self.dut.reg_rd_wait, self.dut.reg_rd_en):
+                    continue
+
+                self.mem.seek(addr)
+
+                data = self.mem.read(self.byte_lanes)
+
+                self.dut.reg_rd_data.value = int.from_bytes(data, 'little')
+                self.dut.reg_rd_wait.value = 0
+                self.dut.reg_rd_ack.value = 1
+                await RisingEdge(self.clock)
+
+    async def _run_write(self):
+        while True:
+            self.dut.reg_wr_wait.value = 0
+            self.dut.reg_wr_ack.value = 0
+            await RisingEdge(self.clock)
+
+            addr = (self.dut.reg_wr_addr.value.integer // self.byte_lanes) * self.byte_lanes
+            data = self.dut.reg_wr_data.value.integer
+            strb = self.dut.reg_wr_strb.value.integer
+
+            if self.dut.reg_wr_en.value.integer and addr < len(self.mem):
+                if not await self._access(self.region(addr), self.dut.reg_wr_wait, self.dut.reg_wr_en):
+                    continue
+
+                self.mem.seek(addr)
+
+                data = data.to_bytes(self.byte_lanes, 'little')
+
+                for i in range(self.byte_lanes):
+                    if strb & (1 << i):
+                        self.mem.write(data[i:i+1])
+                    else:
+                        self.mem.seek(1, 1)
+
+                self.dut.reg_wr_wait.value = 0
+                self.dut.reg_wr_ack.value = 1
+                await RisingEdge(self.clock)
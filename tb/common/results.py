@@ -0,0 +1,55 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import json
+import os
+
+
+def load_results(path, prefix=None):
+    """
+    Per-test JSON results by '<directory>/<test>' key
+
+    Reads the files written by the simulator hooks (see common.profiler and
+    common.cycles) from a directory tree, or a file of results merged with
+    -o.  prefix, if given, is prepended to each key, for results loaded from
+    the directory of a single pytest test.
+    """
+    if os.path.isfile(path):
+        with open(path) as f:
+            results = json.load(f)
+    else:
+        results = {}
+        for root, dirs, files in os.walk(path):
+            for name in sorted(files):
+                if not name.endswith(".json"):
+                    continue
+                with open(os.path.join(root, name)) as f:
+                    result = json.load(f)
+                key = os.path.relpath(os.path.join(root, name[:-5]), path)
+                results[key] = result
+
+    if prefix is not None:
+        results = {f"{prefix}/{k}": v for k, v in results.items()}
+
+    return results
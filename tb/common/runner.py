@@ -0,0 +1,422 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import logging
+import os
+import shutil
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree as ET
+
+import cocotb_test.simulator
+
+from common import cycles, profiler, waves
+from common.results import load_results
+
+# simulator-side hooks, see common.sim_hooks
+HOOKS_MODULE = "common.sim_hooks"
+
+
+def factory_test_names(factories):
+    """Names that TestFactory.generate_tests() will assign, in order"""
+    names = []
+    for factory in factories:
+        count = 1
+        for options in factory.kwargs.values():
+            count *= len(options)
+        names.extend(f"{factory.name}_{k:03d}" for k in range(1, count+1))
+    return names
+
+
+def split_testcases(testcases, jobs):
+    """Distribute testcases round-robin over at most jobs shards"""
+    shards = [testcases[k::jobs] for k in range(jobs)]
+    return [shard for shard in shards if shard]
+
+
+def check_stamp(sim_dir, name, stamp):
+    """Record the build command, return True if it differs from the last build"""
+    stamp_file = os.path.join(sim_dir, name)
+
+    if os.path.isfile(stamp_file):
+        with open(stamp_file) as f:
+            if f.read() == stamp:
+                return False
+
+    with open(stamp_file, 'w') as f:
+        f.write(stamp)
+
+    return True
+
+
+class Icarus(cocotb_test.simulator.Icarus):
+    """
+    Icarus with builds invalidated by changes to the compile command
+
+    cocotb-test only compares source timestamps, so changing parameters or
+    adding the waveform dump module would otherwise reuse a stale build.
+    """
+    def build_command(self):
+        if check_stamp(self.sim_dir, "iverilog_cmd.txt", " ".join(self.compile_command())):
+            self.force_compile = True
+
+        if self.force_compile and os.path.exists(self.sim_file):
+            os.remove(self.sim_file)
+
+        return super().build_command()
+
+
+class Verilator(cocotb_test.simulator.Verilator):
+    """
+    Verilator with cached builds and multithreaded models
+
+    The verilated model is only rebuilt when the sources are newer than the
+    executable or when the compile arguments (including parameters and
+    thread count) change.
+    """
+    def __init__(self, *argv, threads=1, **kwargs):
+        super().__init__(*argv, **kwargs)
+
+        self.compile_args = ["-Wno-SELRANGE", "-Wno-WIDTH", "-Wno-CASEINCOMPLETE"] + self.compile_args
+
+        if threads > 1:
+            self.compile_args += ["--threads", str(threads)]
+
+    def build_command(self):
+        cmd = super().build_command()
+
+        out_file = os.path.join(self.sim_dir, self.toplevel)
+
+        changed = check_stamp(self.sim_dir, "verilator_cmd.txt", " ".join(cmd[0]))
+
+        if not changed and not self.force_compile and not self.outdated(out_file, self.verilog_sources):
+            self.logger.warning("Skipping compilation:" + out_file)
+            return cmd[2:]
+
+        if os.path.exists(out_file):
+            os.remove(out_file)
+
+        return cmd
+
+
+def get_simulator(request=None):
+    if request is not None:
+        return request.config.getoption("sim")
+    return os.getenv("SIM", "icarus")
+
+
+def get_simulator_class(sim):
+    classes = {
+        "icarus": Icarus,
+        "verilator": Verilator,
+    }
+
+    if sim not in classes:
+        raise NotImplementedError(f"Unsupported simulator '{sim}', supported: {', '.join(classes)}")
+
+    return classes[sim]
+
+
+def setup_waves(sim, sim_build, kwargs, scopes=None, window=None, triggered=False, dump_file=None):
+    """Enable waveform dumping, restricted to scopes and a time window where supported"""
+    extra_env = dict(kwargs.get("extra_env") or {})
+    extra_env["WAVES"] = "1"
+    kwargs["extra_env"] = extra_env
+
+    if sim == "icarus":
+        os.makedirs(sim_build, exist_ok=True)
+        dump_module = waves.write_dump_module(os.path.join(sim_build, waves.DUMP_MODULE+".v"),
+            kwargs["toplevel"], scopes, dump_file, enabled=not triggered)
+
+        kwargs["verilog_sources"] = list(kwargs["verilog_sources"]) + [dump_module]
+        kwargs["compile_args"] = list(kwargs.get("compile_args") or []) + ["-s", waves.DUMP_MODULE]
+        kwargs["plus_args"] = list(kwargs.get("plus_args") or []) + ["-fst"] + waves.window_plusargs(window)
+        kwargs["waves"] = False
+    else:
+        if scopes or window or triggered:
+            logging.getLogger("cocotb").warning("Waveform scopes and windows are only supported with Icarus")
+        kwargs["waves"] = True
+
+
+def read_results(results_file, testcases=None, module=""):
+    results = {}
+
+    if os.path.isfile(results_file):
+        tree = ET.parse(results_file)
+        for ts in tree.iter("testsuite"):
+            seed = None
+            for prop in ts.iter("property"):
+                if prop.get("name") == "random_seed":
+                    seed = prop.get("value")
+            for tc in ts.iter("testcase"):
+                if seed is not None:
+                    tc.set("random_seed", seed)
+                results[tc.get("name")] = tc
+
+    if testcases is None:
+        if not results:
+            tc = ET.Element("testcase", name=module, classname=module)
+            ET.SubElement(tc, "failure", message="Simulation terminated abnormally, no result recorded")
+            results[module] = tc
+        return list(results.values())
+
+    # tests that never reported were lost to a simulator crash
+    for name in testcases:
+        if name not in results:
+            tc = ET.Element("testcase", name=name, classname=module)
+            ET.SubElement(tc, "failure", message="Simulation terminated abnormally, no result recorded")
+            results[name] = tc
+
+    return [results[name] for name in testcases]
+
+
+def run_testcases(sim_class, index, testcases, sim_build, **kwargs):
+    results_file = os.path.join(sim_build, f"results_{index:02d}.xml")
+    if os.path.exists(results_file):
+        os.remove(results_file)
+
+    if testcases is not None:
+        kwargs["testcase"] = ",".join(testcases)
+
+    sim = sim_class(sim_build=sim_build, **kwargs)
+    sim.env["COCOTB_RESULTS_FILE"] = results_file
+    sim.execute(sim.build_command())
+
+    # the test module, after HOOKS_MODULE if present
+    module = kwargs.get("module", "").split(",")[-1]
+
+    return read_results(results_file, testcases, module)
+
+
+def rerun_with_waves(sim, sim_class, tc, sim_build, window_ns, **kwargs):
+    """Re-run a failed testcase with the same seed, dumping waveforms just before the failure"""
+    name = tc.get("name")
+    end = int(float(tc.get("sim_time_ns", 0)))
+    window = f"{max(0, end-window_ns)}:{end}"
+
+    failure_build = os.path.join(sim_build, "waves_failure")
+    setup_waves(sim, failure_build, kwargs, window=window, dump_file=f"{name}.fst")
+
+    if tc.get("random_seed") is not None:
+        kwargs["seed"] = tc.get("random_seed")
+
+    run_testcases(sim_class, 0, [name], failure_build, **kwargs)
+
+    return os.path.join(failure_build, f"{name}.fst")
+
+
+def node_output_dir(root, request, clean=False):
+    """
+    Subdirectory of root for the outputs of a pytest test
+
+    Named after the test node, with the brackets of parametrized tests
+    replaced.  With clean, outputs of a previous run are removed.
+    """
+    path = os.path.join(os.path.abspath(root), request.node.name.replace('[', '-').replace(']', ''))
+    if clean and os.path.isdir(path):
+        shutil.rmtree(path)
+    return path
+
+
+def output_dirs(request, sim_build):
+    """
+    Per-test output directories for the simulation, by environment variable
+
+    TRACE_DIR, PROFILE_DIR and CYCLES_DIR are set from --trace-dir,
+    --profile-dir and --cycles-dir (sim_build/cycles with only
+    --cycles-baseline).  Profiles and cycle counts of a previous run are
+    removed, so that tests that no longer exist are not compared.
+    """
+    config = request.config
+    dirs = {}
+
+    if config.getoption("trace_dir"):
+        dirs["TRACE_DIR"] = node_output_dir(config.getoption("trace_dir"), request)
+    if config.getoption("profile_dir"):
+        dirs["PROFILE_DIR"] = node_output_dir(config.getoption("profile_dir"), request, clean=True)
+    if config.getoption("cycles_dir") or config.getoption("cycles_baseline"):
+        dirs["CYCLES_DIR"] = node_output_dir(config.getoption("cycles_dir") or os.path.join(sim_build, "cycles"),
+            request, clean=True)
+
+    return dirs
+
+
+def run_jobs(sim_class, testcases, sim_build, jobs=1, **kwargs):
+    """Run testcases in up to jobs simulator processes sharing one build, return their results"""
+    if jobs > 1 and not testcases:
+        warnings.warn("--sim-jobs has no effect without a list of testcases, see runner.factory_test_names()")
+
+    if jobs <= 1 or not testcases or len(testcases) < 2:
+        return run_testcases(sim_class, 0, testcases, sim_build, **kwargs)
+
+    # compile once
+    sim_class(sim_build=sim_build, compile_only=True, **kwargs).run()
+
+    shards = split_testcases(testcases, jobs)
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [executor.submit(run_testcases, sim_class, k, shard, sim_build, **kwargs)
+            for k, shard in enumerate(shards)]
+        return [tc for f in futures for tc in f.result()]
+
+
+def merge_results(tcs, sim_build):
+    """Write testcase results to sim_build/results.xml, return its path and the failed testcases"""
+    testsuites = ET.Element("testsuites", name="results")
+    testsuite = ET.SubElement(testsuites, "testsuite", name="all", package="all")
+    failed = []
+
+    for tc in tcs:
+        testsuite.append(tc)
+        if tc.find("failure") is not None:
+            failed.append(tc)
+
+    results_file = os.path.join(sim_build, "results.xml")
+    ET.ElementTree(testsuites).write(results_file, encoding="unicode")
+
+    return results_file, failed
+
+
+def check_baselines(config, profile_dir=None, cycles_dir=None):
+    """Fail on simulation speed or cycle count regressions against the baselines given to pytest"""
+    if profile_dir and config.getoption("profile_baseline") and os.path.isdir(profile_dir):
+        regressions = profiler.check_regression(load_results(profile_dir, os.path.basename(profile_dir)),
+            load_results(config.getoption("profile_baseline")), config.getoption("profile_threshold"))
+
+        assert not regressions, "simulation speed regressed: {}".format(", ".join(regressions))
+
+    if cycles_dir and config.getoption("cycles_baseline") and os.path.isdir(cycles_dir):
+        regressions = cycles.compare(load_results(cycles_dir, os.path.basename(cycles_dir)),
+            load_results(config.getoption("cycles_baseline")), config.getoption("cycles_tolerance"))
+
+        if config.getoption("cycles_warn"):
+            for msg in regressions:
+                warnings.warn(f"cycle count regressed: {msg}")
+        else:
+            assert not regressions, "cycle counts regressed: {}".format(", ".join(regressions))
+
+
+def run(request=None, testcases=None, **kwargs):
+    """
+    Run a cocotb-test simulation
+
+    The simulator is selected with --sim (or SIM), defaulting to Icarus.
+    Builds for simulators other than Icarus go in a separate sim_build
+    directory so that both can be cached side by side.  Verilator models
+    are built with --verilator-threads (or VERILATOR_THREADS) threads.
+    --sweep-depth (or SWEEP_DEPTH) sets the number of length/offset sweep
+    cases kept in flight by the testbenches (see common.sweep).
+
+    With --sim-jobs N (or SIM_JOBS=N) and a list of testcases, the design is
+    compiled once into sim_build, then the testcases are run in up to N
+    parallel simulator processes sharing that build.
+
+    --waves (or WAVES=1) dumps waveforms; with Icarus, --waves-scope,
+    --waves-window and --waves-triggered restrict the dump to hierarchy
+    scopes, a window of simulation time, or regions enabled from the
+    testbench (see common.waves.WaveControl).  --waves-on-failure N re-runs
+    each failing test with the same seed, dumping the last N ns.
+
+    --trace-dir (or TRACE_DIR) sets TRACE_DIR for the simulation to a
+    subdirectory per pytest test, for the transaction traces recorded by
+    the testbenches (see common.trace).
+
+    --profile-dir (or PROFILE_DIR) profiles the simulation speed of each
+    cocotb test into a subdirectory per pytest test (see common.profiler);
+    with --profile-baseline, the pytest test fails when the simulated
+    cycles per second of any cocotb test drop by more than
+    --profile-threshold compared to the baseline.
+
+    --cycles-dir (or CYCLES_DIR) records the simulated cycles of each cocotb
+    test and of its reference operations (see common.cycles); with
+    --cycles-baseline, the pytest test fails (or warns, with --cycles-warn)
+    when any of them grew by more than --cycles-tolerance.  Profiling and
+    cycle accounting are installed in the simulator by listing
+    common.sim_hooks first in the cocotb MODULE list.
+
+    Per-process results are merged into sim_build/results.xml and reported
+    as a single pytest test.
+    """
+    sim = get_simulator(request)
+    sim_class = get_simulator_class(sim)
+
+    sim_build = os.path.abspath(kwargs.pop("sim_build", "sim_build"))
+    if sim != "icarus":
+        sim_build = f"{sim_build}-{sim}"
+
+    jobs = 1
+    failure_window = 0
+    outputs = {}
+    kwargs["waves"] = False
+
+    if request is not None:
+        config = request.config
+
+        jobs = config.getoption("sim_jobs")
+        failure_window = config.getoption("waves_on_failure")
+        request.node.user_properties.append(("sim", sim))
+
+        if sim == "verilator":
+            kwargs.setdefault("threads", config.getoption("verilator_threads"))
+
+        outputs = output_dirs(request, sim_build)
+
+        extra_env = dict(kwargs.get("extra_env") or {})
+        extra_env.setdefault("SWEEP_DEPTH", str(config.getoption("sweep_depth")))
+        extra_env.update(outputs)
+        kwargs["extra_env"] = extra_env
+
+        if "PROFILE_DIR" in outputs or "CYCLES_DIR" in outputs:
+            # installs the profiler and cycle accounting before the tests run
+            kwargs["module"] = f"{HOOKS_MODULE},{kwargs['module']}"
+
+    base_kwargs = dict(kwargs)
+
+    if request is not None and config.getoption("waves"):
+        setup_waves(sim, sim_build, kwargs, config.getoption("waves_scope"),
+            config.getoption("waves_window"), config.getoption("waves_triggered"))
+
+    tcs = run_jobs(sim_class, testcases, sim_build, jobs, **kwargs)
+
+    results_file, failed = merge_results(tcs, sim_build)
+
+    if request is not None:
+        request.node.user_properties.append(("cocotb_testcases", len(tcs)))
+        request.node.user_properties.append(("cocotb_failed", len(failed)))
+
+    messages = []
+
+    for tc in failed:
+        msg = "{} ({})".format(tc.get("name"), tc.find("failure").get("message"))
+        if failure_window and tc.get("sim_time_ns") is not None:
+            dump = rerun_with_waves(sim, sim_class, tc, sim_build, failure_window, **base_kwargs)
+            msg += f", waveforms: {dump}"
+        messages.append(msg)
+
+    assert not failed, "{} of {} tests failed: {}".format(len(failed), len(tcs), ", ".join(messages))
+
+    if request is not None:
+        check_baselines(config, outputs.get("PROFILE_DIR"), outputs.get("CYCLES_DIR"))
+
+    return results_file
@@ -0,0 +1,115 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+
+import cocotb
+from cocotb.queue import Queue
+
+
+def get_sweep_depth():
+    """Number of sweep cases kept in flight, from SWEEP_DEPTH (default 1)"""
+    return int(os.getenv("SWEEP_DEPTH", "1"))
+
+
+class Sweep:
+    """
+    Pipelined length/offset sweep
+
+    Each (length, offset) case gets its own address slot.  Slots are spaced
+    by a multiple of align, so every case sees the same address alignment
+    (and 4 KB boundary crossings) as it would at base, and are far enough
+    apart that guard regions of guard bytes on either side of the data never
+    overlap.  Up to depth cases are in flight at once; each slot is reused
+    as soon as the case occupying it has completed and been checked.
+
+    With depth 1 the cases run back to back at base+offset, exactly like a
+    plain nested loop.
+    """
+    def __init__(self, lengths, offsets, base=0x1000, limit=2**16, align=0x1000, guard=128, depth=None):
+        self.lengths = list(lengths)
+        self.offsets = list(offsets)
+        self.base = base
+
+        span = max(self.offsets) - min(self.offsets) + max(self.lengths) + 2*guard
+        self.stride = -(-span // align) * align
+
+        slots = max(1, (limit - base - max(self.offsets) - max(self.lengths) - guard) // self.stride + 1)
+
+        if depth is None:
+            depth = get_sweep_depth()
+
+        self.depth = max(1, min(depth, slots))
+
+    def cases(self):
+        for length in self.lengths:
+            for offset in self.offsets:
+                yield length, offset
+
+    def __len__(self):
+        return len(self.lengths)*len(self.offsets)
+
+    def slot_addr(self, slot):
+        return self.base + slot*self.stride
+
+    async def run(self, op):
+        """
+        Run op(length, offset, addr) for every case
+
+        op performs and checks a single case at addr, which is offset bytes
+        into a free slot.  The first failure is raised once all cases in
+        flight have completed.
+        """
+        if self.depth == 1:
+            for length, offset in self.cases():
+                await op(length, offset, self.base+offset)
+            return
+
+        free_slots = Queue()
+        for slot in range(self.depth):
+            free_slots.put_nowait(slot)
+
+        errors = []
+
+        async def worker(slot, length, offset):
+            try:
+                await op(length, offset, self.slot_addr(slot)+offset)
+            except Exception as ex:
+                errors.append(ex)
+            finally:
+                free_slots.put_nowait(slot)
+
+        for length, offset in self.cases():
+            slot = await free_slots.get()
+            if errors:
+                free_slots.put_nowait(slot)
+                break
+            cocotb.start_soon(worker(slot, length, offset))
+
+        # wait for all cases in flight
+        for k in range(self.depth):
+            await free_slots.get()
+
+        if errors:
+            raise errors[0]
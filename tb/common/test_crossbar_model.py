@@ -0,0 +1,167 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from common.crossbar_model import AxiCrossbarModel, CrossbarConfig, calc_base_addrs, make_workload
+
+
+def port_params(s_count=4, m_count=4, threads=2, accept=16, issue=4):
+    params = {"S_COUNT": s_count, "M_COUNT": m_count, "DATA_WIDTH": 32}
+    for k in range(s_count):
+        params[f"S{k:02d}_THREADS"] = threads
+        params[f"S{k:02d}_ACCEPT"] = accept
+    for k in range(m_count):
+        params[f"M{k:02d}_ISSUE"] = issue
+    return params
+
+
+def track_addr_port(port, peaks):
+    """Record the peak outstanding transactions and active threads of an AddrPort"""
+    admit = port.admit
+
+    def wrapped(tid, m):
+        admit(tid, m)
+        peaks["count"] = max(peaks["count"], port.count)
+        peaks["threads"] = max(peaks["threads"], sum(1 for t in port.threads if t[2]))
+
+    port.admit = wrapped
+
+
+def track_master_port(port, peaks):
+    """Record the peak outstanding transactions of a MasterPort"""
+    complete = port.complete
+
+    def wrapped():
+        # outstanding only drops on completion, so its peak is seen here
+        peaks["outstanding"] = max(peaks["outstanding"], port.outstanding)
+        complete()
+
+    port.complete = wrapped
+
+
+def test_calc_base_addrs():
+    assert calc_base_addrs([24, 24, 24, 24]) == [0x0000000, 0x1000000, 0x2000000, 0x3000000]
+    # bases are aligned to the size of each region
+    assert calc_base_addrs([12, 16, 0, 12]) == [0x00000, 0x10000, 0, 0x20000]
+
+
+def test_decode():
+    cfg = CrossbarConfig(port_params())
+
+    assert cfg.m_base_addr == [0x0000000, 0x1000000, 0x2000000, 0x3000000]
+    assert cfg.decode(0x0000000) == 0
+    assert cfg.decode(0x0ffffff) == 0
+    assert cfg.decode(0x1000010) == 1
+    assert cfg.decode(0x3fffffc) == 3
+    assert cfg.decode(0x4000000) is None
+
+
+def test_make_workload():
+    cfg = CrossbarConfig(port_params())
+
+    ops = make_workload(cfg, "permutation", "write", size=100, count=16)
+
+    assert len(ops) == cfg.s_count
+    for s, queue in enumerate(ops):
+        assert len(queue) == 16
+        for kind, addr, length in queue:
+            assert kind == "write"
+            # rounded up to whole beats
+            assert length == 100 + (-100 % cfg.byte_lanes)
+            assert cfg.decode(addr) == (s+1) % cfg.m_count
+            assert addr // 4096 == (addr + length - 1) // 4096
+
+    # deterministic for a given seed
+    assert make_workload(cfg, "uniform", "mixed", seed=1) == make_workload(cfg, "uniform", "mixed", seed=1)
+    assert make_workload(cfg, "uniform", "mixed", seed=1) != make_workload(cfg, "uniform", "mixed", seed=2)
+
+
+def test_run_workload():
+    model = AxiCrossbarModel(port_params())
+    ops = make_workload(model.config, "uniform", "mixed", size=64, count=32)
+
+    stats = model.run_workload(ops, workers=2)
+
+    assert len(stats.records) == 4*32
+    assert stats.bytes() == 4*32*64
+    # every beat reaches a master port
+    assert sum(model.beats) == 4*32*64 // model.config.byte_lanes
+    assert stats.elapsed() > 0
+    for kind, length, start, end, worker in stats.records:
+        assert end > start
+
+
+def test_s_accept():
+    model = AxiCrossbarModel(port_params(s_count=1, m_count=1, threads=4, accept=3, issue=16))
+    peaks = {"count": 0, "threads": 0}
+    track_addr_port(model.s_rd[0], peaks)
+
+    ops = make_workload(model.config, "hotspot", "read", size=16, count=32)
+    model.run_workload(ops, workers=8)
+
+    assert peaks["count"] == 3
+    assert model.s_rd[0].stall_cycles > 0
+
+
+def test_s_threads():
+    # IDs rotate per operation, so each outstanding read uses a thread
+    model = AxiCrossbarModel(port_params(s_count=1, m_count=1, threads=2, accept=16, issue=16))
+    peaks = {"count": 0, "threads": 0}
+    track_addr_port(model.s_rd[0], peaks)
+
+    ops = make_workload(model.config, "hotspot", "read", size=16, count=32)
+    model.run_workload(ops, workers=8)
+
+    assert peaks["threads"] == 2
+    assert peaks["count"] == 2
+
+    # with a single ID, all reads share one thread up to S_ACCEPT
+    model = AxiCrossbarModel(port_params(s_count=1, m_count=1, threads=2, accept=4, issue=16))
+    peaks = {"count": 0, "threads": 0}
+    track_addr_port(model.s_rd[0], peaks)
+
+    model.run_workload(ops, workers=8, id_width=0)
+
+    assert peaks["threads"] == 1
+    assert peaks["count"] == 4
+
+
+def test_m_issue():
+    peak = {}
+    elapsed = {}
+
+    for issue in [1, 2]:
+        model = AxiCrossbarModel(port_params(s_count=4, m_count=1, threads=4, accept=16, issue=issue),
+            slave_read_latency=16)
+        peaks = {"outstanding": 0}
+        track_master_port(model.m_rd[0], peaks)
+
+        ops = make_workload(model.config, "hotspot", "read", size=16, count=16)
+        stats = model.run_workload(ops, workers=4)
+
+        peak[issue] = peaks["outstanding"]
+        elapsed[issue] = stats.elapsed()
+
+    assert peak == {1: 1, 2: 2}
+    # a second outstanding read hides part of the slave latency
+    assert elapsed[2] < elapsed[1]
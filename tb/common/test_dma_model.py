@@ -0,0 +1,174 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import pytest
+
+from cocotbext.axi import AxiStreamFrame
+from cocotbext.axi.memory import Memory
+
+from common.dma_model import (AxiDmaModel, AxiCdmaModel, DmaTiming,
+    DMA_ERROR_NONE, DMA_ERROR_AXI_RD_DECERR, DMA_ERROR_AXI_WR_DECERR)
+
+
+def fill(mem):
+    mem.write(0, bytes(k % 251 for k in range(mem.size)))
+
+
+def test_bursts_max_burst_len():
+    timing = DmaTiming({"AXI_DATA_WIDTH": 32, "AXI_MAX_BURST_LEN": 16})
+
+    assert timing.bursts(0x0000, 200) == [(0x0000, 64, 16), (0x0040, 64, 16), (0x0080, 64, 16), (0x00c0, 8, 2)]
+    assert timing.bursts(0x0100, 64) == [(0x0100, 64, 16)]
+    assert timing.bursts(0x0100, 0) == []
+
+
+def test_bursts_4k_boundary():
+    timing = DmaTiming({"AXI_DATA_WIDTH": 32, "AXI_MAX_BURST_LEN": 256})
+
+    assert timing.bursts(0x0ff0, 64) == [(0x0ff0, 16, 4), (0x1000, 48, 12)]
+    assert timing.bursts(0x0000, 0x2000) == [(0x0000, 0x400, 256), (0x0400, 0x400, 256), (0x0800, 0x400, 256),
+        (0x0c00, 0x400, 256), (0x1000, 0x400, 256), (0x1400, 0x400, 256), (0x1800, 0x400, 256), (0x1c00, 0x400, 256)]
+
+
+@pytest.mark.parametrize("max_burst_len", [1, 16, 256])
+def test_bursts_limits(max_burst_len):
+    timing = DmaTiming({"AXI_DATA_WIDTH": 64, "AXI_MAX_BURST_LEN": max_burst_len, "ENABLE_UNALIGNED": 1})
+
+    for addr in [0x0000, 0x0003, 0x0ff9, 0x1ffc]:
+        for length in [1, 7, 100, 3000]:
+            bursts = timing.bursts(addr, length)
+
+            assert sum(n for a, n, beats in bursts) == length
+            assert bursts[0][0] == addr
+            for (a, n, beats), nxt in zip(bursts, bursts[1:]+[None]):
+                assert 1 <= beats <= max_burst_len
+                assert a // 0x1000 == (a + n - 1) // 0x1000
+                assert beats == -(-((a & 7) + n) // 8)
+                if nxt is not None:
+                    assert nxt[0] == a + n
+
+
+def test_bursts_unaligned_start():
+    timing = DmaTiming({"AXI_DATA_WIDTH": 32, "AXI_MAX_BURST_LEN": 16, "ENABLE_UNALIGNED": 1})
+
+    # the first burst is shortened by the offset within a maximum size burst
+    assert timing.bursts(0x0002, 100) == [(0x0002, 62, 16), (0x0040, 38, 10)]
+    assert timing.align(0x0013) == 0x0013
+
+    assert DmaTiming({"AXI_DATA_WIDTH": 32}).align(0x0013) == 0x0010
+
+
+def test_dma_read_status():
+    mem = Memory(size=4096)
+    fill(mem)
+    model = AxiDmaModel(mem, {"AXIS_ID_ENABLE": 1, "AXIS_DEST_ENABLE": 1, "AXIS_USER_ENABLE": 1})
+
+    status, frame = model.execute_read({"addr": 0x100, "len": 100, "tag": 5, "id": 3, "dest": 2, "user": 1})
+
+    assert status.error == DMA_ERROR_NONE
+    assert (status.tag, status.len) == (5, 100)
+    assert frame.tdata == mem.read(0x100, 100)
+    assert (frame.tid, frame.tdest, frame.tuser) == (3, 2, 1)
+
+    # disabled sideband signals are zero
+    model = AxiDmaModel(mem, {"AXIS_ID_ENABLE": 0, "AXIS_DEST_ENABLE": 0, "AXIS_USER_ENABLE": 0})
+    status, frame = model.execute_read({"addr": 0x100, "len": 4, "tag": 6, "id": 3, "dest": 2, "user": 1})
+    assert (frame.tid, frame.tdest, frame.tuser) == (0, 0, 0)
+
+    status, frame = model.execute_read({"addr": 4090, "len": 16, "tag": 7})
+    assert status.error == DMA_ERROR_AXI_RD_DECERR
+    assert status.tag == 7
+    assert frame is None
+
+
+@pytest.mark.parametrize("unaligned", [0, 1])
+def test_dma_read_unaligned(unaligned):
+    mem = Memory(size=4096)
+    fill(mem)
+    model = AxiDmaModel(mem, {"ENABLE_UNALIGNED": unaligned})
+
+    status, frame = model.execute_read({"addr": 0x203, "len": 37})
+
+    assert status.len == 37
+    assert frame.tdata == mem.read(0x203 if unaligned else 0x200, 37)
+
+
+def test_dma_write_status():
+    mem = Memory(size=4096)
+    model = AxiDmaModel(mem)
+
+    frame = AxiStreamFrame(bytes(range(1, 41)), tid=4, tdest=5, tuser=1)
+    status = model.execute_write({"addr": 0x100, "len": 32, "tag": 9}, frame)
+
+    # at most len bytes are written, the rest of the frame is dropped
+    assert status.error == DMA_ERROR_NONE
+    assert (status.tag, status.len) == (9, 32)
+    assert (status.id, status.dest, status.user) == (4, 5, 1)
+    assert mem.read(0x100, 34) == bytes(range(1, 33)) + b"\x00\x00"
+
+    # short frames end the transfer early
+    status = model.execute_write({"addr": 0x200, "len": 32, "tag": 10}, AxiStreamFrame(b"\x55"*8))
+    assert status.len == 8
+    assert mem.read(0x200, 10) == b"\x55"*8 + b"\x00\x00"
+
+    status = model.execute_write({"addr": 4090, "len": 16, "tag": 11}, AxiStreamFrame(bytes(16)))
+    assert status.error == DMA_ERROR_AXI_WR_DECERR
+    assert status.tag == 11
+
+
+@pytest.mark.parametrize("unaligned", [0, 1])
+def test_dma_write_unaligned(unaligned):
+    mem = Memory(size=4096)
+    model = AxiDmaModel(mem, {"ENABLE_UNALIGNED": unaligned})
+
+    data = bytes(range(1, 38))
+    status = model.execute_write({"addr": 0x303, "len": len(data)}, AxiStreamFrame(data))
+
+    addr = 0x303 if unaligned else 0x300
+    assert status.len == len(data)
+    assert mem.read(addr, len(data)) == data
+    assert mem.read(addr-1, 1) == b"\x00"
+    assert mem.read(addr+len(data), 1) == b"\x00"
+
+
+@pytest.mark.parametrize("unaligned", [0, 1])
+def test_cdma_copy(unaligned):
+    mem = Memory(size=16384)
+    fill(mem)
+    model = AxiCdmaModel(mem, {"ENABLE_UNALIGNED": unaligned})
+
+    expected = mem.read(0x0f81 if unaligned else 0x0f80, 300)
+
+    # source and destination both cross a 4 KB boundary
+    status = model.execute_copy({"read_addr": 0x0f81, "write_addr": 0x2f02, "len": 300, "tag": 3})
+
+    assert status.error == DMA_ERROR_NONE
+    assert (status.tag, status.len) == (3, 300)
+    assert mem.read(0x2f02 if unaligned else 0x2f00, 300) == expected
+
+    status = model.execute_copy({"read_addr": 16380, "write_addr": 0, "len": 16, "tag": 4})
+    assert (status.tag, status.error) == (4, DMA_ERROR_AXI_RD_DECERR)
+
+    status = model.execute_copy({"read_addr": 0, "write_addr": 16380, "len": 16, "tag": 5})
+    assert (status.tag, status.error) == (5, DMA_ERROR_AXI_WR_DECERR)
@@ -0,0 +1,210 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+from common.tlm import Kernel, Event, Condition, Mutex, RoundRobinArbiter, Timeout
+
+
+def test_kernel_order():
+    kernel = Kernel()
+    log = []
+
+    def proc(name, delay):
+        yield Timeout(delay)
+        log.append((kernel.now, name))
+
+    kernel.spawn(proc("a", 2))
+    kernel.spawn(proc("b", 1))
+    kernel.spawn(proc("c", 2))
+    kernel.spawn(proc("d", -1))
+
+    # same time callbacks run by priority, then in scheduling order
+    kernel.call_at(2, lambda v: log.append((kernel.now, v)), "arb", priority=1)
+    kernel.call_at(2, lambda v: log.append((kernel.now, v)), "early", priority=-1)
+
+    kernel.run()
+
+    assert log == [(0, "d"), (1, "b"), (2, "early"), (2, "a"), (2, "c"), (2, "arb")]
+
+
+def test_kernel_run_until():
+    kernel = Kernel()
+    log = []
+
+    def proc():
+        for k in range(4):
+            yield Timeout(3)
+            log.append(kernel.now)
+
+    kernel.spawn(proc())
+
+    kernel.run(until=7)
+    assert kernel.now == 7
+    assert log == [3, 6]
+
+    kernel.run()
+    assert kernel.now == 12
+    assert log == [3, 6, 9, 12]
+
+
+def test_process_join():
+    kernel = Kernel()
+    log = []
+
+    def child():
+        yield Timeout(5)
+        return "result"
+
+    def parent():
+        proc = kernel.spawn(child())
+        value = yield proc.join()
+        log.append((kernel.now, value))
+        # joining a finished process resumes immediately
+        value = yield proc.join()
+        log.append((kernel.now, value))
+
+    kernel.spawn(parent())
+    kernel.run()
+
+    assert log == [(5, "result"), (5, "result")]
+
+
+def test_event():
+    kernel = Kernel()
+    event = Event(kernel)
+    log = []
+
+    def waiter(name, delay):
+        yield Timeout(delay)
+        value = yield event.wait()
+        log.append((kernel.now, name, value))
+
+    def firer():
+        yield Timeout(4)
+        event.fire("go")
+
+    kernel.spawn(waiter("early", 1))
+    kernel.spawn(waiter("late", 6))
+    kernel.spawn(firer())
+    kernel.run()
+
+    assert log == [(4, "early", "go"), (6, "late", "go")]
+
+
+def test_condition():
+    kernel = Kernel()
+    cond = Condition(kernel)
+    state = {"count": 0}
+    log = []
+
+    def waiter(name, target):
+        yield from cond.wait_for(lambda: state["count"] >= target)
+        log.append((kernel.now, name))
+
+    def notifier():
+        for k in range(3):
+            yield Timeout(2)
+            state["count"] += 1
+            cond.notify()
+
+    kernel.spawn(waiter("one", 1))
+    kernel.spawn(waiter("three", 3))
+    kernel.spawn(waiter("zero", 0))
+    kernel.spawn(notifier())
+    kernel.run()
+
+    # every waiter is woken on each notify and re-checks its predicate
+    assert log == [(0, "zero"), (2, "one"), (6, "three")]
+
+
+def test_mutex():
+    kernel = Kernel()
+    mutex = Mutex(kernel)
+    log = []
+
+    def user(name, delay, hold):
+        yield Timeout(delay)
+        yield mutex.acquire()
+        log.append((kernel.now, name))
+        yield Timeout(hold)
+        mutex.release()
+
+    kernel.spawn(user("a", 0, 5))
+    kernel.spawn(user("c", 2, 1))
+    kernel.spawn(user("b", 1, 2))
+    kernel.run()
+
+    # granted one at a time, in request order
+    assert log == [(0, "a"), (5, "b"), (7, "c")]
+    assert not mutex.busy
+
+
+def test_round_robin_arbiter():
+    kernel = Kernel()
+    arb = RoundRobinArbiter(kernel, 3)
+    log = []
+
+    def requester(port, count):
+        for k in range(count):
+            yield arb.acquire(port)
+            log.append((kernel.now, port))
+            yield Timeout(1)
+            arb.release()
+
+    for port in range(3):
+        kernel.spawn(requester(port, 4))
+    kernel.run()
+
+    # registered grant: requests made in cycle 0 are granted from cycle 1
+    assert log[0] == (1, 0)
+
+    # one grant at a time, rotating through the requesting ports
+    times = [t for t, p in log]
+    assert len(set(times)) == len(times)
+    assert [p for t, p in log] == [0, 1, 2]*4
+    assert arb.grants == [4, 4, 4]
+
+
+def test_round_robin_arbiter_available():
+    kernel = Kernel()
+    state = {"open": False}
+    arb = RoundRobinArbiter(kernel, 2, lambda: state["open"])
+    log = []
+
+    def requester(port):
+        yield arb.acquire(port)
+        log.append((kernel.now, port))
+        yield Timeout(1)
+        arb.release()
+
+    def opener():
+        yield Timeout(10)
+        state["open"] = True
+        arb.kick()
+
+    kernel.spawn(requester(1))
+    kernel.spawn(opener())
+    kernel.run()
+
+    # masked requests are only granted after kick()
+    assert log == [(10, 1)]
@@ -0,0 +1,250 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import heapq
+import itertools
+
+
+class Kernel:
+    """
+    Minimal discrete event kernel for transaction-level models
+
+    Time is an integer number of clock cycles.  Processes are generators
+    that yield waitables (Timeout, Event.wait(), resource requests); the
+    value sent back into the generator is the value the waitable resolved
+    with.  Callbacks at the same time run in order of priority, then in
+    the order they were scheduled, so arbiters (priority 1) see every
+    request made by processes (priority 0) in the same cycle.
+    """
+    def __init__(self):
+        self.now = 0
+        self._queue = []
+        self._seq = itertools.count()
+
+    def call_at(self, time, fn, value=None, priority=0):
+        heapq.heappush(self._queue, (time, priority, next(self._seq), fn, value))
+
+    def spawn(self, gen):
+        return Process(self, gen)
+
+    def run(self, until=None):
+        while self._queue:
+            if until is not None and self._queue[0][0] > until:
+                self.now = until
+                return
+            time, priority, seq, fn, value = heapq.heappop(self._queue)
+            self.now = time
+            fn(value)
+
+
+class Process:
+    def __init__(self, kernel, gen):
+        self.kernel = kernel
+        self.gen = gen
+        self.done = Event(kernel)
+        kernel.call_at(kernel.now, self._step)
+
+    def _step(self, value=None):
+        try:
+            waitable = self.gen.send(value)
+        except StopIteration as ex:
+            self.done.fire(ex.value)
+            return
+        waitable.wait(self.kernel, self._step)
+
+    def join(self):
+        return self.done.wait()
+
+
+class Timeout:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def wait(self, kernel, resume):
+        kernel.call_at(kernel.now + max(0, self.delay), resume)
+
+
+class Event:
+    """One-shot event; waiting on a fired event resumes immediately"""
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.fired = False
+        self.value = None
+        self._waiters = []
+
+    def fire(self, value=None):
+        self.fired = True
+        self.value = value
+        for resume in self._waiters:
+            self.kernel.call_at(self.kernel.now, resume, value)
+        self._waiters = []
+
+    def wait(self):
+        return _EventWait(self)
+
+
+class _EventWait:
+    def __init__(self, event):
+        self.event = event
+
+    def wait(self, kernel, resume):
+        if self.event.fired:
+            kernel.call_at(kernel.now, resume, self.event.value)
+        else:
+            self.event._waiters.append(resume)
+
+
+class Condition:
+    """Wakes every waiting process on notify(); waiters re-check their predicate"""
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self._waiters = []
+
+    def notify(self):
+        for resume in self._waiters:
+            self.kernel.call_at(self.kernel.now, resume)
+        self._waiters = []
+
+    def wait(self):
+        return _ConditionWait(self)
+
+    def wait_for(self, predicate):
+        """Generator: 'yield from cond.wait_for(pred)' blocks until pred() is true"""
+        while not predicate():
+            yield self.wait()
+
+
+class _ConditionWait:
+    def __init__(self, cond):
+        self.cond = cond
+
+    def wait(self, kernel, resume):
+        self.cond._waiters.append(resume)
+
+
+class Mutex:
+    """Resource granted to one process at a time, in request order"""
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.busy = False
+        self._waiters = []
+
+    def acquire(self):
+        return _MutexRequest(self)
+
+    def release(self):
+        if self._waiters:
+            self.kernel.call_at(self.kernel.now, self._waiters.pop(0))
+        else:
+            self.busy = False
+
+
+class _MutexRequest:
+    def __init__(self, mutex):
+        self.mutex = mutex
+
+    def wait(self, kernel, resume):
+        if self.mutex.busy:
+            self.mutex._waiters.append(resume)
+        else:
+            self.mutex.busy = True
+            kernel.call_at(kernel.now, resume)
+
+
+class RoundRobinArbiter:
+    """
+    Round robin arbiter with a registered grant, as rtl/arbiter.v
+
+    A request made in cycle t is granted at the earliest in cycle t+1, and
+    the port after the last granted one (wrapping, lowest index first) has
+    priority.  The grant is held until release(); the released port is
+    not eligible again in the same cycle.  available, if given, is a
+    predicate that masks all requests (for example an issue limit);
+    call kick() when its result may have changed.
+    """
+    def __init__(self, kernel, ports, available=None):
+        self.kernel = kernel
+        self.ports = ports
+        self.available = available
+
+        self.busy = False
+        self.last = ports - 1
+        self.released = None
+        self.grants = [0]*ports
+        self._requests = {}
+        self._scheduled = None
+
+    def acquire(self, port):
+        return _ArbiterRequest(self, port)
+
+    def release(self):
+        self.busy = False
+        self.released = (self.last, self.kernel.now)
+        self._schedule(self.kernel.now)
+
+    def kick(self):
+        self._schedule(self.kernel.now)
+
+    def _schedule(self, time):
+        if self._scheduled is not None and self._scheduled <= time:
+            return
+        self._scheduled = time
+        self.kernel.call_at(time, self._arbitrate, priority=1)
+
+    def _arbitrate(self, value=None):
+        now = self.kernel.now
+        if self._scheduled != now:
+            return
+        self._scheduled = None
+
+        if self.busy or not self._requests:
+            return
+
+        if self.available is not None and not self.available():
+            return
+
+        eligible = [p for p, (t, resume) in self._requests.items()
+            if t < now and not (self.released == (p, now))]
+
+        if not eligible:
+            self._schedule(now+1)
+            return
+
+        port = min(eligible, key=lambda p: (p - self.last - 1) % self.ports)
+
+        t, resume = self._requests.pop(port)
+        self.busy = True
+        self.last = port
+        self.grants[port] += 1
+        self.kernel.call_at(now, resume)
+
+
+class _ArbiterRequest:
+    def __init__(self, arbiter, port):
+        self.arbiter = arbiter
+        self.port = port
+
+    def wait(self, kernel, resume):
+        self.arbiter._requests[self.port] = (kernel.now, resume)
+        self.arbiter._schedule(kernel.now+1)
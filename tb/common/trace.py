@@ -0,0 +1,264 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import json
+import os
+
+from cocotb.utils import get_sim_time
+
+from common.monitor import AxiMonitor, ChannelMonitor
+
+
+class TraceWriter:
+    """
+    Streams Chrome Trace Event Format JSON to a file
+
+    The file opens in chrome://tracing and https://ui.perfetto.dev.  Each
+    process (an interface) has named tracks; slices on a track that
+    overlap in time are spread over numbered lanes ("ar id 3", "ar id 3
+    #2", ...) so every lane is properly nested.  Times are in ns of
+    simulation time.  Events are buffered and written in chunks of
+    chunk_size; a file that was not closed is still readable by both
+    viewers, they accept a missing closing bracket.
+    """
+    def __init__(self, path, chunk_size=10000):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.events = 0
+
+        self._file = open(path, 'w')
+        self._file.write("[\n")
+        self._first = True
+        self._buffer = []
+        self._pids = {}
+        self._tids = {}
+        self._lanes = {}
+
+    def _emit(self, event):
+        self._buffer.append(json.dumps(event, separators=(',', ':')))
+        self.events += 1
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def _pid(self, process):
+        pid = self._pids.get(process)
+        if pid is None:
+            pid = self._pids[process] = len(self._pids)+1
+            self._emit({"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": process}})
+        return pid
+
+    def _tid(self, pid, track):
+        key = (pid, track)
+        tid = self._tids.get(key)
+        if tid is None:
+            tid = self._tids[key] = len(self._tids)+1
+            self._emit({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": track}})
+            self._emit({"ph": "M", "name": "thread_sort_index", "pid": pid, "tid": tid, "args": {"sort_index": tid}})
+        return tid
+
+    def complete(self, process, track, name, start, end, args=None, cat=None):
+        """Slice from start to end (ns), events must be added in order of end time per track"""
+        pid = self._pid(process)
+
+        lanes = self._lanes.setdefault((pid, track), [])
+        for lane, lane_end in enumerate(lanes):
+            if lane_end <= start:
+                break
+        else:
+            lane = len(lanes)
+            lanes.append(0)
+        lanes[lane] = end
+
+        tid = self._tid(pid, track if lane == 0 else f"{track} #{lane+1}")
+
+        event = {"ph": "X", "name": name, "pid": pid, "tid": tid, "ts": start/1000, "dur": (end-start)/1000}
+        if cat:
+            event["cat"] = cat
+        if args:
+            event["args"] = args
+        self._emit(event)
+
+    def counter(self, process, name, time, values):
+        """Counter track sample, values is a dict of series"""
+        self._emit({"ph": "C", "name": name, "pid": self._pid(process), "ts": time/1000, "args": values})
+
+    def flush(self):
+        if not self._buffer:
+            return
+        text = ",\n".join(self._buffer)
+        self._file.write(text if self._first else ",\n" + text)
+        self._first = False
+        self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.write("\n]\n")
+        self._file.close()
+
+
+def open_trace(name, chunk_size=10000):
+    """TraceWriter for <TRACE_DIR>/<name>.json when tracing is enabled (--trace-dir), else None"""
+    trace_dir = os.getenv("TRACE_DIR")
+    if not trace_dir:
+        return None
+    os.makedirs(trace_dir, exist_ok=True)
+    return TraceWriter(os.path.join(trace_dir, f"{name}.json"), chunk_size)
+
+
+def _value(handle, default=0):
+    if handle is None:
+        return default
+    value = handle.value
+    return value.integer if value.is_resolvable else default
+
+
+class _StallTracer:
+    """Slices for runs of stall cycles (valid without ready) on the channels of a monitor"""
+    def __init__(self, monitor, trace, process):
+        self.monitor = monitor
+        self.trace = trace
+        self.process = process
+        self._last = [ch.stalls for ch in monitor.channels]
+        self._start = [None]*len(monitor.channels)
+
+    def __call__(self, cycle):
+        for k, ch in enumerate(self.monitor.channels):
+            stalled = ch.stalls != self._last[k]
+            self._last[k] = ch.stalls
+            if stalled:
+                if self._start[k] is None:
+                    self._start[k] = get_sim_time('ns')
+            elif self._start[k] is not None:
+                self.trace.complete(self.process, f"{ch.name} stall", "stall", self._start[k], get_sim_time('ns'))
+                self._start[k] = None
+
+
+class AxiTracer(AxiMonitor):
+    """
+    Records AXI and AXI lite transactions to a TraceWriter
+
+    Each burst is a slice from the address handshake to the last R beat
+    or B, on a track per direction and ID ("read id 3").  With stalls,
+    runs of cycles with valid asserted and ready deasserted are recorded
+    on a track per channel ("ar stall").
+    """
+    def __init__(self, bus, clock, trace, reset=None, name=None, stalls=True, **kwargs):
+        super().__init__(bus, clock, reset, name=name, **kwargs)
+        self.trace = trace
+        self.process = name or "axi"
+        if stalls:
+            self.on_cycle = _StallTracer(self, trace, self.process)
+
+    def _issue_info(self, bus, prefix):
+        return (get_sim_time('ns'), _value(getattr(bus, f"{prefix}id", None)),
+            _value(getattr(bus, f"{prefix}addr")), _value(getattr(bus, f"{prefix}len", None)) + 1)
+
+    def _completed(self, kind, latency, info):
+        start, tid, addr, beats = info
+        self.trace.complete(self.process, f"{kind} id {tid}", f"{kind} 0x{addr:x}", start, get_sim_time('ns'),
+            {"addr": addr, "beats": beats, "cycles": latency}, cat=kind)
+
+
+class AxiStreamTracer(ChannelMonitor):
+    """
+    Records AXI stream frames to a TraceWriter
+
+    Each frame is a slice from its first to its last beat, on a track per
+    tid ("frame id 0"); frames without tlast are single beats.
+    """
+    def __init__(self, bus, clock, trace, reset=None, name=None, stalls=True, **kwargs):
+        super().__init__(clock, reset, name=name, **kwargs)
+        self.bus = bus
+        self.trace = trace
+        self.process = name or "axis"
+
+        self._tid = getattr(bus, "tid", None)
+        self._tdest = getattr(bus, "tdest", None)
+        self._tlast = getattr(bus, "tlast", None)
+        self._frame = None
+
+        self.t = self._add("t", bus.tvalid, bus.tready, self._beat)
+
+        if stalls:
+            self.on_cycle = _StallTracer(self, trace, self.process)
+
+    def _beat(self, cycle):
+        if self._frame is None:
+            self._frame = [get_sim_time('ns'), 0]
+        self._frame[1] += 1
+        if self._tlast is None or self._tlast.value.binstr == "1":
+            start, beats = self._frame
+            tid = _value(self._tid)
+            self.trace.complete(self.process, f"frame id {tid}", "frame", start, get_sim_time('ns'),
+                {"beats": beats, "tid": tid, "tdest": _value(self._tdest)}, cat="frame")
+            self._frame = None
+
+    def _in_reset(self):
+        self._frame = None
+
+
+class DescriptorTracer(ChannelMonitor):
+    """
+    Records DMA descriptors to a TraceWriter
+
+    desc_bus and status_bus are the descriptor and status buses of
+    axi_dma, axi_dma_rd/wr or axi_cdma (from define_stream()).  Each
+    descriptor is a slice from its handshake to the status with the same
+    tag, on a "desc" track (overlapping descriptors go to extra lanes).
+    """
+    def __init__(self, desc_bus, status_bus, clock, trace, reset=None, name=None, **kwargs):
+        super().__init__(clock, reset, name=name, **kwargs)
+        self.desc_bus = desc_bus
+        self.status_bus = status_bus
+        self.trace = trace
+        self.process = name or "desc"
+
+        self._fields = [f for f in ["addr", "read_addr", "write_addr", "len", "id", "dest", "user"]
+            if getattr(desc_bus, f, None) is not None]
+        self._pending = {}
+
+        self.desc = self._add("desc", desc_bus.valid, desc_bus.ready, self._desc_beat)
+        self.on_cycle = self._status
+
+    def _desc_beat(self, cycle):
+        args = {f: _value(getattr(self.desc_bus, f)) for f in self._fields}
+        self._pending.setdefault(_value(self.desc_bus.tag), []).append((get_sim_time('ns'), args))
+
+    def _status(self, cycle):
+        if self.status_bus.valid.value.binstr != "1":
+            return
+        tag = _value(self.status_bus.tag)
+        pending = self._pending.get(tag)
+        if not pending:
+            return
+        start, args = pending.pop(0)
+        args["tag"] = tag
+        args["error"] = _value(self.status_bus.error)
+        self.trace.complete(self.process, "desc", f"desc {tag}", start, get_sim_time('ns'), args, cat="desc")
+
+    def _in_reset(self):
+        self._pending.clear()
@@ -0,0 +1,406 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import json
+import logging
+import math
+import os
+import random
+
+import cocotb
+from cocotb.triggers import Timer
+from cocotb.utils import get_sim_time
+
+
+# distributions
+
+class Fixed:
+    def __init__(self, value):
+        self.value = value
+
+    def sample(self, rng):
+        return self.value
+
+    def __repr__(self):
+        return f"Fixed({self.value})"
+
+
+class Uniform:
+    """Uniformly distributed integer in [lo, hi]"""
+    def __init__(self, lo, hi):
+        self.lo = lo
+        self.hi = hi
+
+    def sample(self, rng):
+        return rng.randint(self.lo, self.hi)
+
+    def __repr__(self):
+        return f"Uniform({self.lo}, {self.hi})"
+
+
+class Choice:
+    """One of a list of values, optionally weighted"""
+    def __init__(self, values, weights=None):
+        self.values = list(values)
+        self.weights = weights
+
+    def sample(self, rng):
+        return rng.choices(self.values, self.weights)[0]
+
+    def __repr__(self):
+        return f"Choice({self.values}, {self.weights})"
+
+
+class Exponential:
+    """
+    Exponentially distributed integer with the given mean
+
+    As an inter-arrival gap, this models Poisson arrivals.
+    """
+    def __init__(self, mean, lo=0, hi=None):
+        self.mean = mean
+        self.lo = lo
+        self.hi = hi
+
+    def sample(self, rng):
+        v = max(self.lo, int(round(rng.expovariate(1/self.mean))))
+        if self.hi is not None:
+            v = min(v, self.hi)
+        return v
+
+    def __repr__(self):
+        return f"Exponential({self.mean})"
+
+
+def as_distribution(value):
+    if value is None or hasattr(value, "sample"):
+        return value
+    if isinstance(value, tuple):
+        return Uniform(*value)
+    if isinstance(value, (list, range)):
+        return Choice(value)
+    return Fixed(value)
+
+
+# address locality models
+
+class UniformLocality:
+    """Uniformly distributed addresses over the whole aperture"""
+    def __init__(self, align=1):
+        self.align = align
+
+    def next_offset(self, rng, aperture, length):
+        return rng.randrange(0, aperture-length+1, self.align)
+
+
+class SequentialLocality:
+    """Streaming access, each operation starts where the previous one ended"""
+    def __init__(self, align=1):
+        self.align = align
+        self.ptr = 0
+
+    def next_offset(self, rng, aperture, length):
+        if self.ptr + length > aperture:
+            self.ptr = 0
+        offset = self.ptr
+        self.ptr = -(-(offset + length) // self.align) * self.align
+        return offset
+
+
+class StridedLocality:
+    """Fixed stride between operation start addresses, wrapping at the aperture"""
+    def __init__(self, stride):
+        self.stride = stride
+        self.ptr = 0
+
+    def next_offset(self, rng, aperture, length):
+        if self.ptr + length > aperture:
+            self.ptr = 0
+        offset = self.ptr
+        self.ptr += self.stride
+        return offset
+
+
+class HotspotLocality:
+    """A fraction of the aperture receives most of the accesses"""
+    def __init__(self, hot_fraction=0.125, hot_probability=0.9):
+        self.hot_fraction = hot_fraction
+        self.hot_probability = hot_probability
+
+    def next_offset(self, rng, aperture, length):
+        hot_size = max(length, int(aperture*self.hot_fraction))
+        if rng.random() < self.hot_probability:
+            return rng.randint(0, hot_size-length)
+        return rng.randint(0, aperture-length)
+
+
+LOCALITY_MODELS = {
+    "uniform": UniformLocality,
+    "sequential": SequentialLocality,
+    "hotspot": HotspotLocality,
+}
+
+
+# statistics
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    k = max(0, math.ceil(p/100*len(values))-1)
+    return values[k]
+
+
+class TrafficStats:
+    def __init__(self, clock_period=None):
+        self.clock_period = clock_period
+        self.records = []
+        self.start_time = None
+        self.end_time = None
+
+    def record(self, kind, length, start, end, worker=0):
+        self.records.append((kind, length, start, end, worker))
+
+    def latencies(self, kind=None):
+        return sorted(end-start for k, length, start, end, w in self.records if kind is None or k == kind)
+
+    def bytes(self, kind=None):
+        return sum(length for k, length, start, end, w in self.records if kind is None or k == kind)
+
+    def elapsed(self):
+        if self.start_time is None or self.end_time is None:
+            return 0
+        return self.end_time - self.start_time
+
+    def summary(self):
+        elapsed = self.elapsed()
+        summary = {
+            "operations": len(self.records),
+            "elapsed_ns": elapsed,
+        }
+
+        if self.clock_period:
+            summary["elapsed_cycles"] = elapsed / self.clock_period
+
+        for kind in ["read", "write"]:
+            lat = self.latencies(kind)
+            total = self.bytes(kind)
+            summary[f"{kind}_ops"] = len(lat)
+            summary[f"{kind}_bytes"] = total
+            summary[f"{kind}_bytes_per_ns"] = total / elapsed if elapsed else 0
+            if self.clock_period:
+                summary[f"{kind}_bytes_per_cycle"] = total / elapsed * self.clock_period if elapsed else 0
+            for p in [50, 90, 99, 100]:
+                v = percentile(lat, p)
+                summary[f"{kind}_lat_p{p}_ns"] = v
+                if self.clock_period and v is not None:
+                    summary[f"{kind}_lat_p{p}_cycles"] = v / self.clock_period
+
+        return summary
+
+    def log_summary(self, log):
+        s = self.summary()
+        log.info("Traffic: %d operations in %d ns", s["operations"], s["elapsed_ns"])
+        for kind in ["read", "write"]:
+            if not s[f"{kind}_ops"]:
+                continue
+            bw = f"{s[f'{kind}_bytes_per_ns']*1000:.1f} MB/s"
+            if self.clock_period:
+                bw += f", {s[f'{kind}_bytes_per_cycle']:.3f} bytes/cycle"
+            log.info("  %s: %d ops, %d bytes, %s", kind, s[f"{kind}_ops"], s[f"{kind}_bytes"], bw)
+            log.info("  %s latency (ns): p50 %s, p90 %s, p99 %s, max %s", kind,
+                s[f"{kind}_lat_p50_ns"], s[f"{kind}_lat_p90_ns"], s[f"{kind}_lat_p99_ns"], s[f"{kind}_lat_p100_ns"])
+
+
+# traffic generator
+
+class TrafficWorker:
+    def __init__(self, gen, index, master, offset, aperture, regions, count):
+        self.gen = gen
+        self.index = index
+        self.master = master
+        self.offset = offset
+        self.aperture = aperture
+        self.regions = regions
+        self.count = count
+
+        self.rng = random.Random(gen.rng.getrandbits(64))
+        self.locality = gen.locality()
+
+        # shadow copy of the aperture in each region, for checking reads
+        self.shadow = {r: bytearray(aperture) for r in regions}
+        self.valid = {r: bytearray(aperture) for r in regions}
+
+    async def gap(self):
+        if self.gen.gap is not None:
+            t = self.gen.gap.sample(self.rng)
+            if t > 0:
+                await Timer(t, 'ns')
+
+    async def write(self, region, offset, length):
+        addr = self.offset + offset + region
+        test_data = bytearray(self.rng.getrandbits(8) for k in range(length))
+
+        start = get_sim_time('ns')
+        await self.master.write(addr, test_data, **self.gen.op_kwargs)
+        self.gen.stats.record("write", length, start, get_sim_time('ns'), self.index)
+
+        self.shadow[region][offset:offset+length] = test_data
+        self.valid[region][offset:offset+length] = b'\x01'*length
+
+    async def read(self, region, offset, length):
+        addr = self.offset + offset + region
+
+        start = get_sim_time('ns')
+        data = await self.master.read(addr, length, **self.gen.op_kwargs)
+        self.gen.stats.record("read", length, start, get_sim_time('ns'), self.index)
+
+        if self.gen.verify:
+            shadow = self.shadow[region]
+            valid = self.valid[region]
+            for k in range(length):
+                if valid[offset+k]:
+                    assert data.data[k] == shadow[offset+k], \
+                        f"worker {self.index}: mismatch at 0x{addr+k:x}: read 0x{data.data[k]:02x}, expected 0x{shadow[offset+k]:02x}"
+
+    async def run(self):
+        for k in range(self.count):
+            region = self.rng.choice(self.regions)
+            length = min(self.gen.size.sample(self.rng), self.aperture)
+            offset = self.locality.next_offset(self.rng, self.aperture, length)
+
+            if self.gen.log_ops:
+                self.gen.log.info("worker %d offset 0x%x, aperture 0x%x, length %d, addr 0x%x",
+                    self.index, self.offset, self.aperture, length, self.offset+offset+region)
+
+            if self.gen.read_ratio is None:
+                # write, then read back and check
+                await self.gap()
+                await self.write(region, offset, length)
+                await self.gap()
+                await self.read(region, offset, length)
+            else:
+                await self.gap()
+                if self.rng.random() < self.gen.read_ratio:
+                    await self.read(region, offset, length)
+                else:
+                    await self.write(region, offset, length)
+
+
+class TrafficGenerator:
+    """
+    Reproducible AXI/AXI lite traffic generator
+
+    Workers are bound to a master and a private address range (offset,
+    aperture), optionally replicated across several regions (for example
+    one per crossbar output).  Each worker issues count operations, one at a
+    time, with sizes drawn from size and inter-arrival gaps (in ns) drawn
+    from gap.  With read_ratio None each operation is a write followed by a
+    read back of the same range; otherwise each operation is independently
+    a read with probability read_ratio.  Reads are checked against the
+    data previously written by the same worker.  burst_size, if set, is the
+    AXI burst size (log2 bytes per beat) of all operations, for narrow
+    bursts; AXI lite masters do not take it.
+
+    All randomness comes from a single generator seeded with seed, which
+    defaults to TRAFFIC_SEED or to cocotb's RANDOM_SEED.  TRAFFIC_WORKERS
+    and TRAFFIC_OPS scale the load of add_workers() without editing the
+    testbench.  Achieved bandwidth and latency percentiles are logged and
+    available from stats after run(); if TRAFFIC_REPORT is set, the summary
+    is also appended to that file as a line of JSON.
+    """
+    def __init__(self, size=(1, 512), gap=(1, 100), read_ratio=None, locality="uniform",
+            seed=None, verify=True, clock_period=None, burst_size=None, log_ops=False, log=None):
+
+        if seed is None:
+            seed = int(os.getenv("TRAFFIC_SEED", cocotb.RANDOM_SEED or 0))
+
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        self.size = as_distribution(size)
+        self.gap = as_distribution(gap)
+        self.read_ratio = read_ratio
+        self.locality = LOCALITY_MODELS.get(locality, locality)
+        self.verify = verify
+        self.op_kwargs = {} if burst_size is None else {"size": burst_size}
+        self.log_ops = log_ops
+        self.log = log or logging.getLogger("cocotb.tb")
+
+        self.stats = TrafficStats(clock_period)
+        self.workers = []
+
+    def add_worker(self, master, offset, aperture, regions=None, count=16):
+        regions = list(regions) if regions is not None else [0]
+        count = int(os.getenv("TRAFFIC_OPS", count))
+        worker = TrafficWorker(self, len(self.workers), master, offset, aperture, regions, count)
+        self.workers.append(worker)
+        return worker
+
+    def add_workers(self, masters, aperture=0x1000, workers=16, regions=None, count=16, span=0x10000):
+        """
+        Add workers with consecutive apertures, assigned round-robin to masters
+
+        The apertures of all workers fit in span bytes from the start of
+        each region (the size of the memory behind it); when they would not,
+        for example with a large TRAFFIC_WORKERS, the aperture is reduced to
+        span divided by the number of workers.
+        """
+        if not isinstance(masters, (list, tuple)):
+            masters = [masters]
+
+        workers = int(os.getenv("TRAFFIC_WORKERS", workers))
+
+        if workers*aperture > span:
+            aperture = span // workers & ~0xf
+            if not aperture:
+                raise ValueError(f"{workers} traffic workers do not fit in a span of 0x{span:x} bytes")
+            self.log.info("Reduced traffic worker aperture to 0x%x to fit %d workers in 0x%x bytes",
+                aperture, workers, span)
+
+        for k in range(workers):
+            self.add_worker(masters[k % len(masters)], k*aperture, aperture, regions, count)
+
+    async def run(self):
+        self.log.info("Traffic seed %d, %d workers, size %s, gap %s, read ratio %s",
+            self.seed, len(self.workers), self.size, self.gap, self.read_ratio)
+
+        self.stats.start_time = get_sim_time('ns')
+
+        tasks = [cocotb.start_soon(w.run()) for w in self.workers]
+
+        while tasks:
+            await tasks.pop(0).join()
+
+        self.stats.end_time = get_sim_time('ns')
+        self.stats.log_summary(self.log)
+
+        report_file = os.getenv("TRAFFIC_REPORT")
+        if report_file:
+            summary = {"toplevel": os.getenv("TOPLEVEL"), "seed": self.seed, "workers": len(self.workers)}
+            summary.update(self.stats.summary())
+            with open(report_file, 'a') as f:
+                f.write(json.dumps(summary)+"\n")
+
+        return self.stats
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import argparse
+import logging
+import os
+
+import cocotb
+from cocotb.handle import SimHandle
+from cocotb.triggers import RisingEdge, Timer
+
+
+DUMP_MODULE = "iverilog_dump"
+
+
+def dump_module_source(toplevel, scopes=None, dump_file=None, enabled=True):
+    """
+    Icarus waveform dump module
+
+    Dumps the given hierarchy scopes (relative to toplevel, default the
+    whole design) to an FST file.  Dumping can be switched on and off at
+    run time by writing dump_enable from cocotb (see WaveControl), and the
+    +dump_start=<ns> and +dump_stop=<ns> plusargs restrict dumping to a
+    window of simulation time.
+    """
+    if dump_file is None:
+        dump_file = f"{toplevel}.fst"
+
+    if not scopes:
+        scopes = [""]
+
+    lines = [
+        "`timescale 1ns / 1ps",
+        f"module {DUMP_MODULE}();",
+        "",
+        f"reg dump_enable = 1'b{int(bool(enabled))};",
+        "integer dump_start;",
+        "integer dump_stop;",
+        "",
+        "initial begin",
+        f"    $dumpfile(\"{dump_file}\");",
+    ]
+
+    for scope in scopes:
+        path = f"{toplevel}.{scope}" if scope else toplevel
+        lines.append(f"    $dumpvars(0, {path});")
+
+    lines += [
+        "    if (!dump_enable) $dumpoff;",
+        "",
+        "    if ($value$plusargs(\"dump_start=%d\", dump_start)) begin",
+        "        // not through the always block, which may not be waiting yet at time 0",
+        "        dump_enable = 1'b0;",
+        "        $dumpoff;",
+        "        #(dump_start);",
+        "        dump_enable = 1'b1;",
+        "        $dumpon;",
+        "    end",
+        "end",
+        "",
+        "initial begin",
+        "    if ($value$plusargs(\"dump_stop=%d\", dump_stop)) begin",
+        "        #(dump_stop) dump_enable = 1'b0;",
+        "    end",
+        "end",
+        "",
+        "always @(dump_enable) begin",
+        "    if (dump_enable) $dumpon;",
+        "    else $dumpoff;",
+        "end",
+        "",
+        "endmodule",
+        "",
+    ]
+
+    return "\n".join(lines)
+
+
+def write_dump_module(output, toplevel, scopes=None, dump_file=None, enabled=True):
+    src = dump_module_source(toplevel, scopes, dump_file, enabled)
+
+    # only touch the file if it changed, so cached builds stay valid
+    if os.path.isfile(output):
+        with open(output) as f:
+            if f.read() == src:
+                return output
+
+    with open(output, 'w') as f:
+        f.write(src)
+
+    return output
+
+
+def parse_window(window):
+    """Parse a 'start:stop' window in ns, either end may be omitted"""
+    if not window:
+        return None, None
+    start, _, stop = window.partition(":")
+    return (int(start) if start else None), (int(stop) if stop else None)
+
+
+def window_plusargs(window):
+    start, stop = parse_window(window)
+    args = []
+    if start is not None:
+        args.append(f"+dump_start={start}")
+    if stop is not None:
+        args.append(f"+dump_stop={stop}")
+    return args
+
+
+class WaveControl:
+    """
+    Run time control of waveform dumping from cocotb
+
+    Drives dump_enable in the Icarus dump module.  When waveforms are not
+    enabled (or the simulator does not support dump control), all methods
+    are no-ops, so testbenches can leave the calls in place unconditionally.
+    """
+    def __init__(self, log=None):
+        self.log = log or logging.getLogger("cocotb.tb")
+        self.enable_signal = None
+
+        if int(os.getenv("WAVES", "0")) and cocotb.SIM_NAME and "icarus" in cocotb.SIM_NAME.lower():
+            root = cocotb.simulator.get_root_handle(DUMP_MODULE)
+            if root is not None:
+                self.enable_signal = SimHandle(root).dump_enable
+
+        if self.enable_signal is None:
+            self.log.debug("Waveform dump control not available")
+
+    @property
+    def available(self):
+        return self.enable_signal is not None
+
+    def start(self):
+        if self.enable_signal is not None:
+            self.log.info("Waveform dump on")
+            self.enable_signal.value = 1
+
+    def stop(self):
+        if self.enable_signal is not None:
+            self.log.info("Waveform dump off")
+            self.enable_signal.value = 0
+
+    async def dump_time(self, start, stop, units='ns'):
+        """Dump from start until stop (absolute simulation time)"""
+        now = cocotb.utils.get_sim_time(units)
+        if start > now:
+            await Timer(start-now, units)
+        self.start()
+        now = cocotb.utils.get_sim_time(units)
+        if stop > now:
+            await Timer(stop-now, units)
+        self.stop()
+
+    async def dump_cycles(self, clk, start, stop):
+        """Dump from clock cycle start until clock cycle stop, counted from now"""
+        for k in range(start):
+            await RisingEdge(clk)
+        self.start()
+        for k in range(stop-start):
+            await RisingEdge(clk)
+        self.stop()
+
+    async def dump_on_match(self, clk, signal, value, valid, ready=None, post_cycles=100, count=1):
+        """
+        Dump around transfers where signal matches value
+
+        Watches a valid/ready handshake (for example arvalid/arready with
+        signal arid) and dumps from the cycle in which a matching transfer
+        starts until post_cycles after the last match.  To see the cycles
+        leading up to a match, use log_failure_window() or
+        --waves-on-failure instead, which dump a window of a re-run.
+        """
+        remaining = 0
+        matches = 0
+
+        while matches < count or remaining:
+            await RisingEdge(clk)
+
+            if not valid.value.is_resolvable or not int(valid.value):
+                hit = False
+            elif ready is not None and (not ready.value.is_resolvable or not int(ready.value)):
+                hit = False
+            else:
+                hit = signal.value.is_resolvable and int(signal.value) == value
+
+            if hit and matches < count:
+                matches += 1
+                if not remaining:
+                    self.start()
+                remaining = post_cycles
+            elif remaining:
+                remaining -= 1
+                if not remaining:
+                    self.stop()
+
+    def log_failure_window(self, log_window=1000):
+        """
+        Log and return a waveform window covering the last log_window ns
+
+        Dumps cannot be produced retroactively, but simulations are
+        deterministic for a given seed, so the failing region can be dumped
+        by re-running with --waves-window (or WAVES_WINDOW) set to the
+        logged window.
+        """
+        now = int(cocotb.utils.get_sim_time('ns'))
+        window = f"{max(0, now-log_window)}:{now+log_window//10}"
+        self.log.error("Re-run with WAVES=1 WAVES_WINDOW=%s to dump waveforms around this failure", window)
+        return window
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates an Icarus waveform dump module")
+    parser.add_argument('-t', '--toplevel', type=str, help="toplevel module name")
+    parser.add_argument('-s', '--scopes',   type=str, default="", help="comma-separated hierarchy scopes to dump, relative to the toplevel")
+    parser.add_argument('-f', '--file',     type=str, help="dump file name")
+    parser.add_argument('--off', action='store_true', help="start with dumping disabled")
+    parser.add_argument('-w', '--window',   type=str, help="print simulator plusargs for a start:stop ns dump window and exit")
+    parser.add_argument('-o', '--output',   type=str, default=DUMP_MODULE+".v", help="output file name")
+
+    args = parser.parse_args()
+
+    if args.window is not None:
+        print(" ".join(window_plusargs(args.window)))
+        return
+
+    if not args.toplevel:
+        parser.error("the following arguments are required: -t/--toplevel")
+
+    scopes = [s for s in args.scopes.split(",") if s]
+    write_dump_module(args.output, args.toplevel, scopes, args.file, not args.off)
+
+
+if __name__ == "__main__":
+    main()
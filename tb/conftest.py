@@ -0,0 +1,92 @@
+"""
+
+Copyright (c) 2020 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+import sys
+
+import pytest
+
+# make shared testbench code in tb/common importable from all testbenches
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("cocotb")
+    group.addoption("--sim", action="store", default=os.getenv("SIM", "icarus"),
+        choices=["icarus", "verilator"], help="simulator used to run the cocotb testbenches")
+    group.addoption("--verilator-threads", action="store", type=int, default=int(os.getenv("VERILATOR_THREADS", "1")),
+        help="number of threads for verilated models")
+    group.addoption("--sim-jobs", action="store", type=int, default=int(os.getenv("SIM_JOBS", "1")),
+        help="split cocotb tests of each testbench over this many parallel simulator processes")
+    group.addoption("--sweep-depth", action="store", type=int, default=int(os.getenv("SWEEP_DEPTH", "1")),
+        help="number of length/offset sweep cases kept in flight by the testbenches")
+
+    group.addoption("--waves", action="store_true", default=bool(int(os.getenv("WAVES", "0"))),
+        help="dump waveforms")
+    group.addoption("--waves-scope", action="append", default=[s for s in os.getenv("WAVES_SCOPES", "").split(",") if s],
+        help="only dump this hierarchy scope, relative to the toplevel (Icarus, may be repeated)")
+    group.addoption("--waves-window", action="store", default=os.getenv("WAVES_WINDOW"),
+        help="only dump waveforms within start:stop ns of simulation time (Icarus)")
+    group.addoption("--waves-triggered", action="store_true", default=bool(int(os.getenv("WAVES_TRIGGERED", "0"))),
+        help="start with dumping off, testbenches enable it with WaveControl (Icarus)")
+    group.addoption("--waves-on-failure", action="store", type=int, default=int(os.getenv("WAVES_ON_FAILURE", "0")),
+        help="re-run failing tests with the same seed, dumping waveforms for the last N ns (Icarus)")
+
+    group.addoption("--trace-dir", action="store", default=os.getenv("TRACE_DIR"),
+        help="record transactions of the benchmarks to Chrome trace JSON files in this directory")
+
+    group.addoption("--profile-dir", action="store", default=os.getenv("PROFILE_DIR"),
+        help="write a simulation speed profile of each cocotb test to this directory")
+    group.addoption("--profile-baseline", action="store", default=os.getenv("PROFILE_BASELINE"),
+        help="fail tests whose simulated cycles per second dropped compared to this profile directory or file")
+    group.addoption("--profile-threshold", action="store", type=float, default=float(os.getenv("PROFILE_THRESHOLD", "0.2")),
+        help="largest accepted relative drop in cycles per second against --profile-baseline")
+
+    group.addoption("--cycles-dir", action="store", default=os.getenv("CYCLES_DIR"),
+        help="record the simulated cycles of each cocotb test and its reference operations to this directory")
+    group.addoption("--cycles-baseline", action="store", default=os.getenv("CYCLES_BASELINE"),
+        help="fail tests whose cycle counts grew compared to this cycles directory or file")
+    group.addoption("--cycles-tolerance", action="store", type=float, default=float(os.getenv("CYCLES_TOLERANCE", "0.1")),
+        help="largest accepted relative increase in cycles against --cycles-baseline")
+    group.addoption("--cycles-warn", action="store_true", default=bool(int(os.getenv("CYCLES_WARN", "0"))),
+        help="warn instead of failing on cycle count regressions")
+
+    group.addoption("--bench", action="store_true", default=bool(int(os.getenv("BENCH", "0"))),
+        help="run the benchmarks (bench_*.py), which are skipped by default")
+    group.addoption("--bench-dir", action="store", default=os.getenv("BENCH_DIR", "bench_results"),
+        help="directory for benchmark result CSV files")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: performance benchmark, only run with --bench")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("bench"):
+        return
+
+    skip = pytest.mark.skip(reason="benchmarks only run with --bench")
+    for item in items:
+        if "bench" in item.keywords:
+            item.add_marker(skip)
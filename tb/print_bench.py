@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Prints benchmark results CSV files (see tb/common/bench.py) as aligned
+tables, optionally filtered and restricted to a set of columns
+"""
+
+import argparse
+import csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-c', '--columns', type=str, help="comma-separated columns to show (default all)")
+    parser.add_argument('-w', '--where',   type=str, action='append', default=[], help="only rows with column=value (may be repeated)")
+    parser.add_argument('-s', '--sort',    type=str, help="comma-separated columns to sort by")
+    parser.add_argument('--markdown', action='store_true', help="print a markdown table")
+    parser.add_argument('csv_file', type=str, help="benchmark results file")
+
+    args = parser.parse_args()
+
+    with open(args.csv_file, newline='') as f:
+        reader = csv.DictReader(f)
+        columns = reader.fieldnames
+        rows = list(reader)
+
+    for cond in args.where:
+        col, value = cond.split('=', 1)
+        rows = [row for row in rows if row.get(col) == value]
+
+    if args.columns:
+        columns = args.columns.split(',')
+
+    if args.sort:
+        keys = args.sort.split(',')
+        rows.sort(key=lambda row: [sort_key(row.get(k, '')) for k in keys])
+
+    print_table(columns, [[row.get(col, '') for col in columns] for row in rows], args.markdown)
+
+
+def sort_key(value):
+    try:
+        return (0, float(value), '')
+    except ValueError:
+        return (1, 0, value)
+
+
+def print_table(columns, rows, markdown=False):
+    widths = [max([len(col)]+[len(row[k]) for row in rows]) for k, col in enumerate(columns)]
+
+    if markdown:
+        print("| " + " | ".join(f"{col:<{w}}" for col, w in zip(columns, widths)) + " |")
+        print("| " + " | ".join("-"*w for w in widths) + " |")
+        for row in rows:
+            print("| " + " | ".join(f"{v:>{w}}" for v, w in zip(row, widths)) + " |")
+    else:
+        print("  ".join(f"{col:>{w}}" for col, w in zip(columns, widths)))
+        for row in rows:
+            print("  ".join(f"{v:>{w}}" for v, w in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Runs the cocotb testbenches under several simulators and compares the
+wall-clock time of each test side by side
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+from xml.etree import ElementTree as ET
+
+repo_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-s', '--sim',    type=str, action='append', choices=["icarus", "verilator"],
+        help="simulator to compare (may be repeated, default icarus and verilator)")
+    parser.add_argument('-o', '--output', type=str, help="CSV output file name")
+    parser.add_argument('pytest_args', nargs='*', help="extra arguments for pytest (test selection, -n, ...)")
+
+    args = parser.parse_args()
+
+    if not args.sim:
+        args.sim = ["icarus", "verilator"]
+
+    times = {}
+
+    for sim in args.sim:
+        times[sim] = run_pytest(sim, args.pytest_args)
+
+    rows = compare(times, args.sim)
+
+    print_table(rows, args.sim)
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(["test"]+[f"{sim}_s" for sim in args.sim]+["fastest", "speedup"])
+            for row in rows:
+                w.writerow(row)
+
+
+def run_pytest(sim, pytest_args):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        junit_file = os.path.join(tmp_dir, f"{sim}.xml")
+
+        subprocess.run(
+            [sys.executable, "-m", "pytest", f"--sim={sim}", f"--junitxml={junit_file}"] + pytest_args,
+            cwd=repo_dir
+        )
+
+        return read_junit(junit_file)
+
+
+def read_junit(junit_file):
+    times = {}
+
+    if not os.path.isfile(junit_file):
+        return times
+
+    for tc in ET.parse(junit_file).iter("testcase"):
+        if tc.find("skipped") is not None:
+            continue
+        name = f"{tc.get('classname')}::{tc.get('name')}"
+        times[name] = None if tc.find("failure") is not None or tc.find("error") is not None else float(tc.get("time"))
+
+    return times
+
+
+def compare(times, sims):
+    rows = []
+
+    names = sorted(set().union(*(t.keys() for t in times.values())))
+
+    for name in names:
+        t = [times[sim].get(name) for sim in sims]
+        valid = [(v, sim) for v, sim in zip(t, sims) if v is not None]
+
+        if valid:
+            fastest = min(valid)
+            slowest = max(valid)
+            speedup = slowest[0] / fastest[0] if fastest[0] > 0 else 0
+            rows.append([name]+t+[fastest[1], round(speedup, 2)])
+        else:
+            rows.append([name]+t+[None, None])
+
+    return rows
+
+
+def print_table(rows, sims):
+    width = max([len(row[0]) for row in rows]+[4])
+
+    print(f"{'test':<{width}}  " + "  ".join(f"{sim:>10}" for sim in sims) + "     fastest  speedup")
+
+    for row in rows:
+        t = ["failed" if v is None else f"{v:.1f}" for v in row[1:1+len(sims)]]
+        print(f"{row[0]:<{width}}  " + "  ".join(f"{v:>10}" for v in t) + f"  {str(row[-2]):>10}  {str(row[-1]):>7}")
+
+
+if __name__ == "__main__":
+    main()